@@ -0,0 +1,142 @@
+"""Baseline schema
+
+Tables as created by ``create_tables()`` before migrations were introduced.
+Tables that already exist are left alone, so databases created by
+``create_tables()`` can run ``alembic upgrade head`` directly.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "patients" not in existing:
+        op.create_table(
+            "patients",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("patient_id", sa.String(50), nullable=False),
+            sa.Column("first_name", sa.String(100), nullable=False),
+            sa.Column("last_name", sa.String(100), nullable=False),
+            sa.Column("age", sa.Integer()),
+            sa.Column("gender", sa.String(10)),
+            sa.Column("phone", sa.String(20)),
+            sa.Column("email", sa.String(100)),
+            sa.Column("address", sa.Text()),
+            sa.Column("medical_record_number", sa.String(50)),
+            sa.Column("emergency_contact", sa.JSON()),
+            sa.Column("insurance_info", sa.JSON()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_patients_id", "patients", ["id"])
+        op.create_index("ix_patients_patient_id", "patients", ["patient_id"], unique=True)
+
+    if "predictions" not in existing:
+        op.create_table(
+            "predictions",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+            sa.Column("image_filename", sa.String(255), nullable=False),
+            sa.Column("original_filename", sa.String(255)),
+            sa.Column("image_path", sa.String(500)),
+            sa.Column("prediction", sa.String(20), nullable=False),
+            sa.Column("confidence", sa.Float(), nullable=False),
+            sa.Column("confidence_scores", sa.JSON()),
+            sa.Column("inference_time", sa.Float()),
+            sa.Column("image_size", sa.JSON()),
+            sa.Column("clinical_notes", sa.Text()),
+            sa.Column("reviewed", sa.Boolean()),
+            sa.Column("reviewed_by", sa.String(100)),
+            sa.Column("reviewed_at", sa.DateTime(timezone=True)),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_predictions_id", "predictions", ["id"])
+
+    if "prediction_jobs" not in existing:
+        op.create_table(
+            "prediction_jobs",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+            sa.Column("image_filename", sa.String(255), nullable=False),
+            sa.Column("original_filename", sa.String(255)),
+            sa.Column("image_path", sa.String(500), nullable=False),
+            sa.Column("clinical_notes", sa.Text()),
+            sa.Column("prediction_id", sa.String(36), sa.ForeignKey("predictions.id"), nullable=True),
+            sa.Column("error", sa.Text()),
+            sa.Column("attempts", sa.Integer()),
+            sa.Column("worker_id", sa.String(100)),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("started_at", sa.DateTime(timezone=True)),
+            sa.Column("finished_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_prediction_jobs_id", "prediction_jobs", ["id"])
+        op.create_index("ix_prediction_jobs_status", "prediction_jobs", ["status"])
+
+    if "audit_logs" not in existing:
+        op.create_table(
+            "audit_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.String(100), nullable=False),
+            sa.Column("action_type", sa.String(50), nullable=False),
+            sa.Column("entity_type", sa.String(50)),
+            sa.Column("entity_id", sa.String(50)),
+            sa.Column("details", sa.JSON()),
+            sa.Column("ip_address", sa.String(45)),
+            sa.Column("user_agent", sa.Text()),
+            sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_audit_logs_id", "audit_logs", ["id"])
+
+    if "system_stats" not in existing:
+        op.create_table(
+            "system_stats",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("date", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("total_patients", sa.Integer()),
+            sa.Column("total_predictions", sa.Integer()),
+            sa.Column("predictions_today", sa.Integer()),
+            sa.Column("pneumonia_cases", sa.Integer()),
+            sa.Column("normal_cases", sa.Integer()),
+            sa.Column("average_confidence", sa.Float()),
+            sa.Column("model_accuracy", sa.Float()),
+            sa.Column("active_users", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_system_stats_id", "system_stats", ["id"])
+
+    if "weekly_stats" not in existing:
+        op.create_table(
+            "weekly_stats",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("week_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("week_end", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("predictions_count", sa.Integer()),
+            sa.Column("accuracy_rate", sa.Float()),
+            sa.Column("pneumonia_detected", sa.Integer()),
+            sa.Column("normal_cases", sa.Integer()),
+            sa.Column("unique_patients", sa.Integer()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_weekly_stats_id", "weekly_stats", ["id"])
+
+
+def downgrade():
+    op.drop_table("weekly_stats")
+    op.drop_table("system_stats")
+    op.drop_table("audit_logs")
+    op.drop_table("prediction_jobs")
+    op.drop_table("predictions")
+    op.drop_table("patients")
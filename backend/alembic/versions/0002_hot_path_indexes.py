@@ -0,0 +1,61 @@
+"""Indexes for prediction, patient and audit log access paths
+
+- predictions: newest-first listings (created_at), per-type counts over a
+  time range (prediction, created_at) and patient history
+  (patient_id, created_at)
+- audit_logs: time-range listings and retention cleanup (timestamp),
+  narrowed by user or action (user_id / action_type, timestamp)
+- patients: created_at range filters
+- system_stats: daily lookups on date
+
+Day filters compare the raw timestamp with [start, end) bounds
+(app/utils/date_ranges.py) instead of wrapping it in date(), so plain
+btree indexes serve them. On PostgreSQL the indexes are built
+CONCURRENTLY so writes are not blocked during the upgrade.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_predictions_created_at", "predictions", ["created_at"]),
+    ("ix_predictions_prediction_created_at", "predictions", ["prediction", "created_at"]),
+    ("ix_predictions_patient_id_created_at", "predictions", ["patient_id", "created_at"]),
+    ("ix_audit_logs_timestamp", "audit_logs", ["timestamp"]),
+    ("ix_audit_logs_user_id_timestamp", "audit_logs", ["user_id", "timestamp"]),
+    ("ix_audit_logs_action_type_timestamp", "audit_logs", ["action_type", "timestamp"]),
+    ("ix_patients_created_at", "patients", ["created_at"]),
+    ("ix_system_stats_date", "system_stats", ["date"]),
+]
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True,
+                postgresql_concurrently=concurrently,
+            )
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                if_exists=True,
+                postgresql_concurrently=concurrently,
+            )
@@ -0,0 +1,44 @@
+"""Composite (timestamp, id) indexes for keyset pagination
+
+Cursor pages are ordered on (created_at, id) / (timestamp, id) and filtered
+with a row comparison on the same pair. Extending the single-column
+timestamp indexes with id lets the database read each page straight from
+the index; the extended indexes still serve plain time-range filters, so
+the old ones are dropped.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# (old index, new index, table, new columns)
+REPLACEMENTS = [
+    ("ix_predictions_created_at", "ix_predictions_created_at_id", "predictions", ["created_at", "id"]),
+    ("ix_audit_logs_timestamp", "ix_audit_logs_timestamp_id", "audit_logs", ["timestamp", "id"]),
+    ("ix_patients_created_at", "ix_patients_created_at_id", "patients", ["created_at", "id"]),
+]
+
+
+def upgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for old_name, new_name, table, columns in REPLACEMENTS:
+            op.create_index(new_name, table, columns, if_not_exists=True, postgresql_concurrently=concurrently)
+            op.drop_index(old_name, table_name=table, if_exists=True, postgresql_concurrently=concurrently)
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for old_name, new_name, table, columns in REPLACEMENTS:
+            op.create_index(old_name, table, columns[:1], if_not_exists=True, postgresql_concurrently=concurrently)
+            op.drop_index(new_name, table_name=table, if_exists=True, postgresql_concurrently=concurrently)
@@ -0,0 +1,46 @@
+"""Prediction statistics rollup table
+
+Per-day and per-week prediction counters maintained transactionally by
+every prediction write. Fill it for existing predictions with
+``python scripts/rebuild_stats_rollups.py`` after upgrading.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 13:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_tables() may already have created it
+    if sa.inspect(op.get_bind()).has_table("prediction_rollups"):
+        return
+
+    op.create_table(
+        "prediction_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("period", sa.String(10), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("predictions_count", sa.Integer(), nullable=False),
+        sa.Column("pneumonia_count", sa.Integer(), nullable=False),
+        sa.Column("normal_count", sa.Integer(), nullable=False),
+        sa.Column("reviewed_count", sa.Integer(), nullable=False),
+        sa.Column("confidence_sum", sa.Float(), nullable=False),
+        sa.Column("patients_sketch", sa.LargeBinary()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("period", "period_start", name="uq_prediction_rollups_period_start"),
+    )
+    op.create_index("ix_prediction_rollups_id", "prediction_rollups", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_prediction_rollups_id", table_name="prediction_rollups")
+    op.drop_table("prediction_rollups")
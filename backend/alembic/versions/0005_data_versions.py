@@ -0,0 +1,35 @@
+"""Data version counters for HTTP conditional requests
+
+One row per data set, incremented by every write in the same transaction.
+List and stats endpoints derive their ETag from these counters.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_tables() may already have created it
+    if sa.inspect(op.get_bind()).has_table("data_versions"):
+        return
+
+    op.create_table(
+        "data_versions",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("data_versions")
@@ -0,0 +1,47 @@
+"""Trigram index for patient search (PostgreSQL)
+
+Patient search filters the lower-cased concatenation of names, patient ID
+and medical record number with LIKE '%term%' and prefix patterns. A
+pg_trgm GIN index on that expression serves both without scanning the
+table. The expression must stay identical to
+``app.models.database.patient_search_document``. Other databases keep
+scanning, so this migration is a no-op there.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 15:00:00
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+SEARCH_DOCUMENT = (
+    "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' "
+    "|| coalesce(patient_id, '') || ' ' || coalesce(medical_record_number, ''))"
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_patients_search_trgm "
+            f"ON patients USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_patients_search_trgm")
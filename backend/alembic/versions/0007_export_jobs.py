@@ -0,0 +1,59 @@
+"""Background export jobs
+
+Queued CSV/Excel exports and the artifacts they produced in the export
+directory, looked up by request key for dedupe and by expiry for garbage
+collection.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_tables() may already have created it
+    if sa.inspect(op.get_bind()).has_table("export_jobs"):
+        return
+
+    op.create_table(
+        "export_jobs",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("export_type", sa.String(30), nullable=False),
+        sa.Column("parameters", sa.JSON()),
+        sa.Column("compress", sa.Boolean()),
+        sa.Column("request_key", sa.String(64), nullable=False),
+        sa.Column("filename", sa.String(255)),
+        sa.Column("file_path", sa.String(500)),
+        sa.Column("media_type", sa.String(100)),
+        sa.Column("file_size", sa.Integer()),
+        sa.Column("record_count", sa.Integer()),
+        sa.Column("error", sa.Text()),
+        sa.Column("attempts", sa.Integer()),
+        sa.Column("worker_id", sa.String(100)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_export_jobs_id", "export_jobs", ["id"])
+    op.create_index("ix_export_jobs_status", "export_jobs", ["status"])
+    op.create_index("ix_export_jobs_request_key_created_at", "export_jobs", ["request_key", "created_at"])
+    op.create_index("ix_export_jobs_expires_at", "export_jobs", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_export_jobs_expires_at", table_name="export_jobs")
+    op.drop_index("ix_export_jobs_request_key_created_at", table_name="export_jobs")
+    op.drop_index("ix_export_jobs_status", table_name="export_jobs")
+    op.drop_index("ix_export_jobs_id", table_name="export_jobs")
+    op.drop_table("export_jobs")
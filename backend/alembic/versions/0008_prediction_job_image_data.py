@@ -0,0 +1,33 @@
+"""Uploaded image bytes in prediction jobs
+
+Workers read the image from the job row instead of the API's uploads
+directory, so they can run on other hosts. Jobs queued before this
+revision keep reading their image file.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_tables() may already have created it
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("prediction_jobs")}
+    if "image_data" in columns:
+        return
+
+    op.add_column("prediction_jobs", sa.Column("image_data", sa.LargeBinary()))
+
+
+def downgrade():
+    with op.batch_alter_table("prediction_jobs") as batch_op:
+        batch_op.drop_column("image_data")
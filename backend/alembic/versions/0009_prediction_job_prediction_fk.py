@@ -0,0 +1,59 @@
+"""Keep prediction jobs when their prediction is deleted (PostgreSQL)
+
+``prediction_jobs.prediction_id`` referenced predictions without an
+ON DELETE rule, so deleting a prediction created by a job failed with a
+foreign key violation. The job now keeps its history with the reference
+cleared. SQLite does not enforce the constraint unless foreign keys are
+switched on, and tables created from the models already carry the rule,
+so this migration is a no-op there.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 14:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT = "prediction_jobs_prediction_id_fkey"
+
+
+def _prediction_fk():
+    """The foreign key of prediction_jobs.prediction_id as reflected from the database."""
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys("prediction_jobs"):
+        if foreign_key["constrained_columns"] == ["prediction_id"]:
+            return foreign_key
+    return None
+
+
+def _replace_fk(ondelete):
+    existing = _prediction_fk()
+    if existing is not None:
+        if (existing.get("options") or {}).get("ondelete") == ondelete:
+            return
+        op.drop_constraint(existing["name"], "prediction_jobs", type_="foreignkey")
+    op.create_foreign_key(
+        CONSTRAINT, "prediction_jobs", "predictions",
+        ["prediction_id"], ["id"], ondelete=ondelete
+    )
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # create_tables() may already have created it with the rule
+    _replace_fk("SET NULL")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    _replace_fk(None)
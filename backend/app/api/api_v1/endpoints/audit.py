@@ -2,62 +2,85 @@
 Audit logging and system monitoring endpoints
 """
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_
-from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, and_, select, delete
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, date, timedelta
 
-from app.core.database import get_db
-from app.models.database import AuditLog, Patient, Prediction, SystemStats, WeeklyStats
+from app.core.config import settings
+from app.core.database import get_async_db, count_rows
+from app.utils.date_ranges import day_range
+from app.models.database import AuditLog, Patient, Prediction, SystemStats
 from app.models.schemas import (
     AuditLogResponse, PaginatedResponse, 
     SystemStatsResponse, WeeklyStatsResponse,
     DashboardStats, OverviewStats, PredictionResponse,
-    MonthlyAccuracy
+    MonthlyAccuracy, CursorPage, PaginationModeEnum, TotalModeEnum
 )
+from app.services.pagination import InvalidCursorError, paginate_keyset
+from app.services.data_versions import bump_data_versions, conditional_request
+from app.services.response_cache import (
+    PATIENTS_TAG, PREDICTIONS_TAG, SYSTEM_STATS_TAG, cached_response
+)
+from app.services.prediction_queries import predictions_from_rows, select_predictions_with_patient_info
+from app.services.stats_aggregation import get_overview_aggregates
+from app.services.stats_rollups import get_rollup_totals, get_weekly_rollups, weekly_stats_response
 
 router = APIRouter()
 
-@router.get("/logs", response_model=PaginatedResponse[AuditLogResponse])
+@router.get("/logs", response_model=Union[PaginatedResponse[AuditLogResponse], CursorPage[AuditLogResponse]])
 async def get_audit_logs(
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=100),
+    pagination: PaginationModeEnum = Query(PaginationModeEnum.OFFSET),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (cursor pagination)"),
+    total_mode: TotalModeEnum = Query(TotalModeEnum.NONE, description="Total to include with cursor pagination"),
     user_id: Optional[str] = Query(None),
     action: Optional[str] = Query(None),
     resource_type: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get paginated audit logs with filters"""
+    """
+    Get paginated audit logs with filters
+    
+    Offset pagination (default) returns an exact total. With
+    ``pagination=cursor`` pages are keyed on (timestamp, id), newest first.
+    """
     try:
-        query = db.query(AuditLog)
+        query = select(AuditLog)
         
         # Apply filters
         if user_id:
-            query = query.filter(AuditLog.user_id == user_id)
+            query = query.where(AuditLog.user_id == user_id)
         
         if action:
-            query = query.filter(AuditLog.action_type == action)
+            query = query.where(AuditLog.action_type == action)
         
         if resource_type:
-            query = query.filter(AuditLog.entity_type == resource_type)
+            query = query.where(AuditLog.entity_type == resource_type)
         
         if start_date:
-            query = query.filter(AuditLog.timestamp >= start_date)
+            query = query.where(AuditLog.timestamp >= start_date)
         
         if end_date:
-            query = query.filter(AuditLog.timestamp <= end_date)
+            query = query.where(AuditLog.timestamp <= end_date)
+        
+        if pagination == PaginationModeEnum.CURSOR or cursor:
+            return CursorPage[AuditLogResponse](
+                **await paginate_keyset(db, query, AuditLog.timestamp, AuditLog.id, size, cursor, total_mode)
+            )
         
         # Order by most recent
         query = query.order_by(desc(AuditLog.timestamp))
         
         # Get total count
-        total = query.count()
+        total = await count_rows(db, query)
         
         # Apply pagination
         offset = (page - 1) * size
-        logs = query.offset(offset).limit(size).all()
+        logs = (await db.scalars(query.offset(offset).limit(size))).all()
         
         # Calculate pages
         pages = (total + size - 1) // size
@@ -70,14 +93,16 @@ async def get_audit_logs(
             pages=pages
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving audit logs: {str(e)}")
 
 @router.get("/logs/{log_id}", response_model=AuditLogResponse)
-async def get_audit_log(log_id: int, db: Session = Depends(get_db)):
+async def get_audit_log(log_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get specific audit log by ID"""
     try:
-        log = db.query(AuditLog).filter(AuditLog.id == log_id).first()
+        log = await db.get(AuditLog, log_id)
         if not log:
             raise HTTPException(status_code=404, detail="Audit log not found")
         return log
@@ -87,10 +112,10 @@ async def get_audit_log(log_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error retrieving audit log: {str(e)}")
 
 @router.get("/logs/actions")
-async def get_audit_actions(db: Session = Depends(get_db)):
+async def get_audit_actions(db: AsyncSession = Depends(get_async_db)):
     """Get list of all available audit actions"""
     try:
-        actions = db.query(AuditLog.action_type).distinct().all()
+        actions = (await db.execute(select(AuditLog.action_type).distinct())).all()
         return {
             "actions": [action[0] for action in actions if action[0]],
             "total": len(actions)
@@ -99,10 +124,10 @@ async def get_audit_actions(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error retrieving audit actions: {str(e)}")
 
 @router.get("/logs/users")
-async def get_audit_users(db: Session = Depends(get_db)):
+async def get_audit_users(db: AsyncSession = Depends(get_async_db)):
     """Get list of all users who have audit logs"""
     try:
-        users = db.query(AuditLog.user_id).distinct().all()
+        users = (await db.execute(select(AuditLog.user_id).distinct())).all()
         return {
             "users": [user[0] for user in users if user[0]],
             "total": len(users)
@@ -113,7 +138,7 @@ async def get_audit_users(db: Session = Depends(get_db)):
 @router.get("/logs/stats")
 async def get_audit_statistics(
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get audit log statistics for the specified number of days"""
     try:
@@ -121,37 +146,37 @@ async def get_audit_statistics(
         start_date = end_date - timedelta(days=days)
         
         # Total logs in period
-        total_logs = db.query(AuditLog).filter(
+        total_logs = await db.scalar(select(func.count(AuditLog.id)).where(
             AuditLog.timestamp >= start_date,
             AuditLog.timestamp <= end_date
-        ).count()
+        ))
         
         # Logs by action
-        action_stats = db.query(
+        action_stats = (await db.execute(select(
             AuditLog.action_type,
             func.count(AuditLog.id).label('count')
-        ).filter(
+        ).where(
             AuditLog.timestamp >= start_date,
             AuditLog.timestamp <= end_date
-        ).group_by(AuditLog.action_type).all()
+        ).group_by(AuditLog.action_type))).all()
         
         # Logs by user
-        user_stats = db.query(
+        user_stats = (await db.execute(select(
             AuditLog.user_id,
             func.count(AuditLog.id).label('count')
-        ).filter(
+        ).where(
             AuditLog.timestamp >= start_date,
             AuditLog.timestamp <= end_date
-        ).group_by(AuditLog.user_id).all()
+        ).group_by(AuditLog.user_id))).all()
         
         # Daily activity
-        daily_stats = db.query(
+        daily_stats = (await db.execute(select(
             func.date(AuditLog.timestamp).label('date'),
             func.count(AuditLog.id).label('count')
-        ).filter(
+        ).where(
             AuditLog.timestamp >= start_date,
             AuditLog.timestamp <= end_date
-        ).group_by(func.date(AuditLog.timestamp)).all()
+        ).group_by(func.date(AuditLog.timestamp)))).all()
         
         return {
             "period_days": days,
@@ -166,109 +191,88 @@ async def get_audit_statistics(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating audit statistics: {str(e)}")
 
-@router.get("/system/stats", response_model=SystemStatsResponse)
-async def get_system_stats(db: Session = Depends(get_db)):
-    """Get latest system statistics"""
+async def _current_system_stats(db: AsyncSession) -> Dict[str, Any]:
+    """System statistics from the day rollups plus the patient count"""
+    today = datetime.utcnow().date()
+    totals = await get_rollup_totals(db, today)
+    total_patients = await db.scalar(select(func.count(Patient.id)))
+    
+    return {
+        "total_patients": total_patients,
+        "total_predictions": totals.total_predictions,
+        "predictions_today": totals.predictions_today,
+        "pneumonia_cases": totals.pneumonia_cases,
+        "normal_cases": totals.normal_cases,
+        "average_confidence": round(totals.average_confidence, 3),
+    }
+
+@router.get(
+    "/system/stats", response_model=SystemStatsResponse,
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG, PATIENTS_TAG, SYSTEM_STATS_TAG))]
+)
+async def get_system_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get current system statistics"""
     try:
-        # Get latest system stats
-        latest_stats = db.query(SystemStats).order_by(desc(SystemStats.date)).first()
-        
-        if not latest_stats:
-            # Return default stats if none exist
-            return SystemStatsResponse(
-                date=datetime.utcnow().date(),
-                total_patients=0,
-                total_predictions=0,
-                daily_predictions=0,
-                model_accuracy=0.94,
-                system_uptime=0,
-                memory_usage=0,
-                cpu_usage=0,
-                disk_usage=0
-            )
+        current = await _current_system_stats(db)
         
-        return latest_stats
+        # Model accuracy is recorded by the stats update job
+        model_accuracy = await db.scalar(select(SystemStats.model_accuracy).order_by(desc(SystemStats.date)).limit(1))
+        
+        return SystemStatsResponse(
+            date=datetime.utcnow(),
+            model_accuracy=model_accuracy if model_accuracy is not None else 0.945,
+            active_users=5,  # Mock active users
+            **current
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving system stats: {str(e)}")
 
-@router.get("/system/weekly", response_model=List[WeeklyStatsResponse])
+@router.get(
+    "/system/weekly", response_model=List[WeeklyStatsResponse],
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG))]
+)
 async def get_weekly_stats(
     weeks: int = Query(12, ge=1, le=52),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get weekly statistics for the specified number of weeks"""
     try:
-        end_date = datetime.utcnow().date()
-        start_date = end_date - timedelta(weeks=weeks)
+        # One pre-aggregated row per week
+        weekly_rollups = await get_weekly_rollups(db, weeks)
         
-        weekly_stats = db.query(WeeklyStats).filter(
-            WeeklyStats.week_start >= start_date,
-            WeeklyStats.week_start <= end_date
-        ).order_by(desc(WeeklyStats.week_start)).all()
-        
-        return weekly_stats
+        return [weekly_stats_response(rollup) for rollup in weekly_rollups]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving weekly stats: {str(e)}")
 
-@router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(db: Session = Depends(get_db)):
+@router.get(
+    "/dashboard/stats", response_model=DashboardStats,
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG, PATIENTS_TAG))]
+)
+@cached_response("audit:dashboard-stats", settings.response_cache_dashboard_ttl_seconds, [PREDICTIONS_TAG, PATIENTS_TAG])
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_db)):
     """Get comprehensive dashboard statistics"""
     try:
-        # Date ranges
-        today = datetime.utcnow().date()
-        week_start = today - timedelta(days=today.weekday())
-        month_start = today.replace(day=1)
-        
-        # Patient stats
-        total_patients = db.query(Patient).count()
-        patients_this_week = db.query(Patient).filter(
-            func.date(Patient.created_at) >= week_start
-        ).count()
-        patients_this_month = db.query(Patient).filter(
-            func.date(Patient.created_at) >= month_start
-        ).count()
-        
-        # Prediction stats
-        total_predictions = db.query(Prediction).count()
-        predictions_today = db.query(Prediction).filter(
-            func.date(Prediction.created_at) == today
-        ).count()
-        predictions_this_week = db.query(Prediction).filter(
-            func.date(Prediction.created_at) >= week_start
-        ).count()
-        predictions_this_month = db.query(Prediction).filter(
-            func.date(Prediction.created_at) >= month_start
-        ).count()
-        
-        # Prediction type breakdown
-        pneumonia_cases = db.query(Prediction).filter(
-            Prediction.prediction == "PNEUMONIA"
-        ).count()
-        normal_cases = db.query(Prediction).filter(
-            Prediction.prediction == "NORMAL"
-        ).count()
-        
-        # Accuracy and confidence
-        avg_confidence_result = db.query(func.avg(Prediction.confidence)).scalar()
-        average_confidence = float(avg_confidence_result) if avg_confidence_result else 0
+        # All counts and the average confidence in one statement
+        aggregates = await get_overview_aggregates(db)
         
         # Recent activity
-        recent_patients = db.query(Patient).order_by(desc(Patient.created_at)).limit(5).all()
-        recent_predictions = db.query(Prediction).order_by(desc(Prediction.created_at)).limit(5).all()
+        recent_predictions = predictions_from_rows((await db.execute(
+            select_predictions_with_patient_info().order_by(desc(Prediction.created_at)).limit(5)
+        )).all())
         
         # System performance (mock data)
         model_accuracy = 0.945
         
         # Create proper OverviewStats object
         overview_stats = OverviewStats(
-            total_patients=total_patients,
-            total_predictions=total_predictions,
-            predictions_today=predictions_today,
-            pneumonia_cases=pneumonia_cases,
-            normal_cases=normal_cases,
-            average_confidence=round(average_confidence, 3),
+            total_patients=aggregates.total_patients,
+            total_predictions=aggregates.total_predictions,
+            predictions_today=aggregates.predictions_today,
+            pneumonia_cases=aggregates.pneumonia_cases,
+            normal_cases=aggregates.normal_cases,
+            average_confidence=round(aggregates.average_confidence, 3),
             model_accuracy=model_accuracy,
             active_users=5  # Mock active users
         )
@@ -292,9 +296,9 @@ async def get_dashboard_stats(db: Session = Depends(get_db)):
                 reviewed_at=p.reviewed_at,
                 created_at=p.created_at,
                 patient_info={
-                    "first_name": p.patient.first_name if p.patient else "Unknown",
-                    "last_name": p.patient.last_name if p.patient else "Patient"
-                } if p.patient else None
+                    "first_name": p.patient_info["first_name"],
+                    "last_name": p.patient_info["last_name"]
+                } if p.patient_info else None
             )
             recent_predictions_list.append(pred_response)
         
@@ -315,64 +319,59 @@ async def get_dashboard_stats(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error retrieving dashboard stats: {str(e)}")
 
 @router.post("/system/update-stats")
-async def update_system_stats(db: Session = Depends(get_db)):
-    """Update system statistics (typically called by a scheduled job)"""
+async def update_system_stats(db: AsyncSession = Depends(get_async_db)):
+    """Snapshot today's system statistics (typically called by a scheduled job)"""
     try:
         today = datetime.utcnow().date()
+        today_start, today_end = day_range(today)
         
-        # Calculate current stats
-        total_patients = db.query(Patient).count()
-        total_predictions = db.query(Prediction).count()
-        daily_predictions = db.query(Prediction).filter(
-            func.date(Prediction.created_at) == today
-        ).count()
+        # Calculate current stats from the rollups
+        current = await _current_system_stats(db)
         
         # Check if stats for today already exist
-        existing_stats = db.query(SystemStats).filter(SystemStats.date == today).first()
+        existing_stats = await db.scalar(select(SystemStats).where(
+            SystemStats.date >= today_start,
+            SystemStats.date < today_end
+        ).limit(1))
         
         if existing_stats:
             # Update existing
-            existing_stats.total_patients = total_patients
-            existing_stats.total_predictions = total_predictions
-            existing_stats.daily_predictions = daily_predictions
+            for name, value in current.items():
+                setattr(existing_stats, name, value)
         else:
             # Create new
             new_stats = SystemStats(
-                date=today,
-                total_patients=total_patients,
-                total_predictions=total_predictions,
-                daily_predictions=daily_predictions,
+                date=today_start,
                 model_accuracy=0.945,  # Mock value
-                system_uptime=99.8,    # Mock value
-                memory_usage=45.2,     # Mock value
-                cpu_usage=23.1,        # Mock value
-                disk_usage=67.8        # Mock value
+                active_users=5,        # Mock value
+                **current
             )
             db.add(new_stats)
         
-        db.commit()
+        await bump_data_versions(db, SYSTEM_STATS_TAG)
+        await db.commit()
         
         return {"message": "System statistics updated successfully", "date": today}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating system stats: {str(e)}")
 
 @router.delete("/logs/cleanup")
 async def cleanup_old_logs(
     days: int = Query(90, ge=30, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Clean up audit logs older than specified days"""
     try:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
         # Count logs to be deleted
-        count = db.query(AuditLog).filter(AuditLog.timestamp < cutoff_date).count()
+        count = await db.scalar(select(func.count(AuditLog.id)).where(AuditLog.timestamp < cutoff_date))
         
         # Delete old logs
-        db.query(AuditLog).filter(AuditLog.timestamp < cutoff_date).delete()
-        db.commit()
+        await db.execute(delete(AuditLog).where(AuditLog.timestamp < cutoff_date))
+        await db.commit()
         
         return {
             "message": f"Cleaned up {count} audit logs older than {days} days",
@@ -381,5 +380,5 @@ async def cleanup_old_logs(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error cleaning up logs: {str(e)}")
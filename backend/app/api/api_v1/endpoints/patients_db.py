@@ -2,63 +2,75 @@
 Database-backed Patient Management with comprehensive CRUD operations
 """
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
-from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, select
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, date
 
-from app.core.database import get_db
+from app.core.database import get_async_db, count_rows
 from app.models.database import Patient, Prediction, AuditLog
 from app.models.schemas import (
-    PatientCreate, PatientUpdate, PatientResponse,
-    PaginatedResponse, PatientFilters
+    PatientCreate, PatientUpdate, PatientResponse, PatientSuggestion,
+    PaginatedResponse, PatientFilters, CursorPage, PaginationModeEnum, TotalModeEnum
 )
+from app.services.pagination import InvalidCursorError, paginate_keyset
+from app.services.patient_search import contains_filter, search_statement, typeahead_statement
+from app.services.data_versions import bump_data_versions, conditional_request
+from app.services.response_cache import PATIENTS_TAG
 
 router = APIRouter()
 
 # CRUD Operations
 
-@router.get("/", response_model=PaginatedResponse[PatientResponse])
+@router.get(
+    "/", response_model=Union[PaginatedResponse[PatientResponse], CursorPage[PatientResponse]],
+    dependencies=[Depends(conditional_request(PATIENTS_TAG))]
+)
 async def get_patients(
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=100),
+    pagination: PaginationModeEnum = Query(PaginationModeEnum.OFFSET),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (cursor pagination)"),
+    total_mode: TotalModeEnum = Query(TotalModeEnum.NONE, description="Total to include with cursor pagination"),
     search: Optional[str] = Query(None),
     gender: Optional[str] = Query(None),
     created_after: Optional[date] = Query(None),
     created_before: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get paginated list of patients with filters"""
+    """
+    Get paginated list of patients with filters
+    
+    Offset pagination (default) returns an exact total. With
+    ``pagination=cursor`` pages are keyed on (created_at, id), newest first.
+    """
     try:
-        query = db.query(Patient)
+        query = select(Patient)
         
         # Apply filters
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    Patient.first_name.ilike(search_term),
-                    Patient.last_name.ilike(search_term),
-                    Patient.patient_id.ilike(search_term),
-                    Patient.medical_record_number.ilike(search_term)
-                )
-            )
+            query = query.where(contains_filter(search))
         
         if gender:
-            query = query.filter(Patient.gender == gender)
+            query = query.where(Patient.gender == gender)
             
         if created_after:
-            query = query.filter(Patient.created_at >= created_after)
+            query = query.where(Patient.created_at >= created_after)
             
         if created_before:
-            query = query.filter(Patient.created_at <= created_before)
+            query = query.where(Patient.created_at <= created_before)
+        
+        if pagination == PaginationModeEnum.CURSOR or cursor:
+            return CursorPage[PatientResponse](
+                **await paginate_keyset(db, query, Patient.created_at, Patient.id, size, cursor, total_mode)
+            )
         
         # Get total count
-        total = query.count()
+        total = await count_rows(db, query)
         
         # Apply pagination
         offset = (page - 1) * size
-        patients = query.offset(offset).limit(size).all()
+        patients = (await db.scalars(query.offset(offset).limit(size))).all()
         
         # Calculate pages
         pages = (total + size - 1) // size
@@ -71,26 +83,29 @@ async def get_patients(
             pages=pages
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving patients: {str(e)}")
 
 @router.post("/", response_model=PatientResponse)
 async def create_patient(
     patient_data: PatientCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new patient"""
     try:
         # Check if patient_id already exists
-        existing = db.query(Patient).filter(Patient.patient_id == patient_data.patient_id).first()
+        existing = await db.scalar(select(Patient).where(Patient.patient_id == patient_data.patient_id))
         if existing:
             raise HTTPException(status_code=400, detail="Patient ID already exists")
         
         # Create new patient
         patient = Patient(**patient_data.dict())
         db.add(patient)
-        db.commit()
-        db.refresh(patient)
+        await bump_data_versions(db, PATIENTS_TAG)
+        await db.commit()
+        await db.refresh(patient)
         
         # Log audit trail
         audit = AuditLog(
@@ -101,21 +116,39 @@ async def create_patient(
             details={"patient_id": patient.patient_id, "name": f"{patient.first_name} {patient.last_name}"}
         )
         db.add(audit)
-        db.commit()
+        await db.commit()
         
         return patient
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating patient: {str(e)}")
 
+@router.get("/typeahead", response_model=List[PatientSuggestion])
+async def typeahead_patients(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Suggest patients while typing
+
+    Every word of ``q`` must start a word of the patient's name, patient ID
+    or medical record number. Returns only the fields a suggestion shows.
+    """
+    try:
+        rows = (await db.execute(typeahead_statement(q, db.bind.dialect.name, limit))).all()
+        return [PatientSuggestion.model_validate(row) for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching patients: {str(e)}")
+
 @router.get("/{patient_id}", response_model=PatientResponse)
-async def get_patient(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get patient by ID"""
     try:
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         return patient
@@ -128,11 +161,11 @@ async def get_patient(patient_id: int, db: Session = Depends(get_db)):
 async def update_patient(
     patient_id: int,
     patient_update: PatientUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update patient information"""
     try:
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         
@@ -142,8 +175,9 @@ async def update_patient(
             setattr(patient, field, value)
         
         patient.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(patient)
+        await bump_data_versions(db, PATIENTS_TAG)
+        await db.commit()
+        await db.refresh(patient)
         
         # Log audit trail
         audit = AuditLog(
@@ -154,26 +188,26 @@ async def update_patient(
             details={"updated_fields": list(update_data.keys())}
         )
         db.add(audit)
-        db.commit()
+        await db.commit()
         
         return patient
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating patient: {str(e)}")
 
 @router.delete("/{patient_id}")
-async def delete_patient(patient_id: int, db: Session = Depends(get_db)):
+async def delete_patient(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete patient (soft delete by setting deleted_at)"""
     try:
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         
         # Check if patient has predictions
-        prediction_count = db.query(Prediction).filter(Prediction.patient_id == patient_id).count()
+        prediction_count = await count_rows(db, select(Prediction.id).where(Prediction.patient_id == patient_id))
         
         if prediction_count > 0:
             raise HTTPException(
@@ -182,8 +216,9 @@ async def delete_patient(patient_id: int, db: Session = Depends(get_db)):
             )
         
         # Delete patient
-        db.delete(patient)
-        db.commit()
+        await db.delete(patient)
+        await bump_data_versions(db, PATIENTS_TAG)
+        await db.commit()
         
         # Log audit trail
         audit = AuditLog(
@@ -194,33 +229,30 @@ async def delete_patient(patient_id: int, db: Session = Depends(get_db)):
             details={"patient_id": patient.patient_id, "name": f"{patient.first_name} {patient.last_name}"}
         )
         db.add(audit)
-        db.commit()
+        await db.commit()
         
         return {"message": "Patient deleted successfully", "patient_id": patient_id}
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting patient: {str(e)}")
 
 @router.get("/search/{query}")
 async def search_patients(
     query: str,
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Search patients by name, patient_id, or medical record number"""
+    """
+    Search patients by name, patient_id, or medical record number
+
+    Every word must occur in one of those fields; exact ID matches and
+    word-prefix matches rank first.
+    """
     try:
-        search_term = f"%{query}%"
-        patients = db.query(Patient).filter(
-            or_(
-                Patient.first_name.ilike(search_term),
-                Patient.last_name.ilike(search_term),
-                Patient.patient_id.ilike(search_term),
-                Patient.medical_record_number.ilike(search_term)
-            )
-        ).limit(limit).all()
+        patients = (await db.scalars(search_statement(query, db.bind.dialect.name, limit))).all()
         
         return patients
         
@@ -230,17 +262,17 @@ async def search_patients(
 @router.get("/{patient_id}/predictions")
 async def get_patient_predictions(
     patient_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all predictions for a specific patient"""
     try:
         # Verify patient exists
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         
         # Get predictions with patient info
-        predictions = db.query(Prediction).filter(Prediction.patient_id == patient_id).all()
+        predictions = (await db.scalars(select(Prediction).where(Prediction.patient_id == patient_id))).all()
         
         return {
             "patient": patient,
@@ -255,15 +287,15 @@ async def get_patient_predictions(
         raise HTTPException(status_code=500, detail=f"Error retrieving patient predictions: {str(e)}")
 
 @router.get("/{patient_id}/stats")
-async def get_patient_stats(patient_id: int, db: Session = Depends(get_db)):
+async def get_patient_stats(patient_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get statistics for a specific patient"""
     try:
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         
         # Calculate stats
-        predictions = db.query(Prediction).filter(Prediction.patient_id == patient_id).all()
+        predictions = (await db.scalars(select(Prediction).where(Prediction.patient_id == patient_id))).all()
         total_predictions = len(predictions)
         pneumonia_count = len([p for p in predictions if p.prediction == "PNEUMONIA"])
         normal_count = total_predictions - pneumonia_count
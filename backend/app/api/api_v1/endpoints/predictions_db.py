@@ -2,38 +2,71 @@
 Database-backed Predictions Management with ML Integration
 """
 from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from PIL import Image
-import io
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import desc, insert, select
+from fastapi.responses import StreamingResponse
+from typing import BinaryIO, List, Optional, Dict, Any, Tuple, Union
+from datetime import datetime
+import asyncio
+import json
 import os
-import uuid
 import logging
+import mimetypes
+import time
+import zipfile
 
-from app.core.database import get_db
-from app.models.database import Patient, Prediction, AuditLog
+from app.core.config import settings
+from app.core.database import get_async_db, AsyncSessionLocal, count_rows
+from app.models.database import Patient, Prediction, AuditLog, PredictionJob
 from app.models.schemas import (
-    PredictionCreate, PredictionResponse, 
-    PaginatedResponse, OverviewStats
+    PredictionCreate, PredictionResponse, PredictionJobResponse,
+    PaginatedResponse, OverviewStats, CursorPage, PaginationModeEnum, TotalModeEnum
 )
-from app.ml.model_service import ModelService
+from app.ml.model_service import model_service
+from app.ml.executor import InferenceSaturatedError
+from app.utils.image_storage import PREDICTIONS_UPLOAD_DIR, save_prediction_image
+from app.services.prediction_persistence import (
+    build_prediction_records, prediction_response, save_prediction, prediction_writer
+)
+from app.services.pagination import InvalidCursorError, paginate_keyset
+from app.services.stats_aggregation import get_overview_aggregates
+from app.services.data_versions import bump_data_versions, conditional_request
+from app.services.response_cache import PATIENTS_TAG, PREDICTIONS_TAG
+from app.services.stats_rollups import RollupChanges, apply_rollup_changes
+from app.services.prediction_queries import (
+    patient_info_from_row, predictions_from_rows, select_predictions_with_patient_info, with_patient_info
+)
+from app.services.prediction_jobs import prediction_job_queue, JOB_COMPLETED, TERMINAL_STATUSES
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize model service
-model_service = ModelService()
-
 # File upload configuration
-UPLOAD_DIR = "uploads/predictions"
+UPLOAD_DIR = PREDICTIONS_UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Image types accepted inside bulk zip uploads
+BULK_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# How often a long-polling job status request re-reads the job row
+JOB_POLL_INTERVAL_SECONDS = 0.25
+
+async def _save_upload(content: bytes, original_filename: Optional[str]) -> Tuple[str, str, str]:
+    """Save uploaded image bytes under a new UUID, returning (file_id, filename, file_path)"""
+    return await asyncio.to_thread(save_prediction_image, content, original_filename, UPLOAD_DIR)
+
+def _validate_image_upload(filename: str, content_type: Optional[str], content: bytes) -> None:
+    """Apply the single-upload checks (image type, maximum size) to one file"""
+    if not content_type or not content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail=f"{filename} must be an image")
+    if len(content) > settings.max_file_size:
+        raise HTTPException(status_code=400, detail=f"{filename} exceeds the maximum file size")
+
 @router.post("/predict", response_model=PredictionResponse)
 async def create_simple_prediction(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Simple prediction endpoint without patient association"""
     try:
@@ -41,69 +74,42 @@ async def create_simple_prediction(
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Load model if not loaded
+        # Load model if startup did not (MODEL_EAGER_LOAD=false or startup failure)
         if not model_service.is_loaded():
             success = await model_service.load_model()
             if not success:
                 raise HTTPException(status_code=500, detail="Failed to load model")
         
-        # Read and process image
+        # Read image; decoding happens in the inference pool
         content = await file.read()
-        image = Image.open(io.BytesIO(content))
         
         # Make prediction
-        result = await model_service.predict_from_image(image)
+        result = await model_service.predict_from_bytes(content)
         if not result:
             raise HTTPException(status_code=500, detail="Prediction failed")
         
         # Save file
-        file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-        filename = f"{file_id}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Create prediction record (no patient)
-        prediction = Prediction(
-            id=file_id,
-            patient_id=None,  # No patient for simple prediction
-            image_filename=filename,
+        file_id, filename, file_path = await _save_upload(content, file.filename)
+        
+        # Store prediction (no patient) and its audit record in one transaction
+        prediction_row, audit_row = build_prediction_records(
+            prediction_id=file_id,
+            filename=filename,
             original_filename=file.filename,
             image_path=file_path,
-            prediction=result['prediction'],
-            confidence=result['confidence'],
-            confidence_scores=result['probabilities'],
-            inference_time=result.get('inference_time'),
-            image_size=result.get('image_size'),
+            result=result
         )
+        await save_prediction(db, prediction_row, audit_row)
         
-        db.add(prediction)
-        db.commit()
-        db.refresh(prediction)
-        
-        # Log audit trail
-        audit = AuditLog(
-            user_id="system",
-            action_type="PREDICTION",
-            entity_type="Prediction",
-            entity_id=prediction.id,
-            details={
-                "prediction": result['prediction'],
-                "confidence": result['confidence'],
-                "filename": file.filename
-            }
-        )
-        db.add(audit)
-        db.commit()
-        
-        return prediction
+        return prediction_response(prediction_row)
         
     except HTTPException:
         raise
+    except InferenceSaturatedError as e:
+        logger.warning(f"Rejecting prediction request: {e}")
+        raise HTTPException(status_code=503, detail="Inference service is busy, please retry", headers={"Retry-After": "1"})
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error in simple prediction: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
@@ -112,12 +118,12 @@ async def create_prediction_with_patient(
     patient_id: int = Form(...),
     file: UploadFile = File(...),
     clinical_notes: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create prediction for a specific patient"""
     try:
         # Verify patient exists
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         
@@ -125,51 +131,25 @@ async def create_prediction_with_patient(
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Load model if not loaded
+        # Load model if startup did not (MODEL_EAGER_LOAD=false or startup failure)
         if not model_service.is_loaded():
             success = await model_service.load_model()
             if not success:
                 raise HTTPException(status_code=500, detail="Failed to load model")
         
-        # Read and process image
+        # Read image; decoding happens in the inference pool
         content = await file.read()
-        image = Image.open(io.BytesIO(content))
         
         # Make prediction
-        result = await model_service.predict_from_image(image)
+        result = await model_service.predict_from_bytes(content)
         if not result:
             raise HTTPException(status_code=500, detail="Prediction failed")
         
         # Save file
-        file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-        filename = f"{file_id}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Create prediction record
-        prediction = Prediction(
-            id=file_id,
-            patient_id=patient_id,
-            image_filename=filename,
-            original_filename=file.filename,
-            image_path=file_path,
-            prediction=result['prediction'],
-            confidence=result['confidence'],
-            confidence_scores=result['probabilities'],
-            inference_time=result.get('inference_time'),
-            image_size=result.get('image_size'),
-            clinical_notes=clinical_notes
-        )
-        
-        db.add(prediction)
-        db.commit()
-        db.refresh(prediction)
+        file_id, filename, file_path = await _save_upload(content, file.filename)
         
-        # Set patient info for response
-        prediction.patient_info = {
+        # Set patient info for response before the session is committed
+        patient_info = {
             "patient_id": patient.patient_id,
             "first_name": patient.first_name,
             "last_name": patient.last_name,
@@ -177,70 +157,369 @@ async def create_prediction_with_patient(
             "gender": patient.gender
         }
         
-        # Log audit trail
-        audit = AuditLog(
-            user_id="system",
-            action_type="PREDICTION",
-            entity_type="Prediction",
-            entity_id=prediction.id,
-            details={
-                "patient_id": patient_id,
-                "prediction": result['prediction'],
-                "confidence": result['confidence'],
-                "filename": file.filename
-            }
+        # Store prediction and its audit record in one transaction
+        prediction_row, audit_row = build_prediction_records(
+            prediction_id=file_id,
+            filename=filename,
+            original_filename=file.filename,
+            image_path=file_path,
+            result=result,
+            patient_id=patient_id,
+            clinical_notes=clinical_notes
         )
-        db.add(audit)
-        db.commit()
+        await save_prediction(db, prediction_row, audit_row)
         
-        return prediction
+        return prediction_response(prediction_row, patient_info)
         
     except HTTPException:
         raise
+    except InferenceSaturatedError as e:
+        logger.warning(f"Rejecting prediction request: {e}")
+        raise HTTPException(status_code=503, detail="Inference service is busy, please retry", headers={"Retry-After": "1"})
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating prediction with patient: {e}")
         raise HTTPException(status_code=500, detail=f"Error creating prediction: {str(e)}")
 
-@router.get("/predictions", response_model=PaginatedResponse[PredictionResponse])
+def _read_zip_member(archive: zipfile.ZipFile, member: zipfile.ZipInfo) -> bytes:
+    """Decompress one member, stopping once it exceeds the maximum file size whatever its header declares"""
+    with archive.open(member) as f:
+        content = f.read(settings.max_file_size + 1)
+    if len(content) > settings.max_file_size:
+        raise HTTPException(status_code=400, detail=f"{member.filename} exceeds the maximum file size")
+    return content
+
+def _expand_bulk_uploads(uploads: List[Tuple[str, Optional[str], BinaryIO]]) -> List[Tuple[str, bytes]]:
+    """
+    Expand zip archives into their image members, keeping plain image uploads as-is.
+    
+    Uploads are read from their spooled files one image at a time, so the
+    image count and total size limits apply before the rest is read. Every
+    resulting image gets the single-upload validation. Blocking; run in a
+    worker thread.
+    """
+    items = []
+    total_size = 0
+    
+    def add(filename: str, content: bytes) -> None:
+        nonlocal total_size
+        if len(items) >= settings.bulk_prediction_max_files:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many images; maximum is {settings.bulk_prediction_max_files}"
+            )
+        total_size += len(content)
+        if total_size > settings.bulk_prediction_max_total_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Images exceed the maximum total size of {settings.bulk_prediction_max_total_size} bytes"
+            )
+        items.append((filename, content))
+    
+    for filename, content_type, upload in uploads:
+        upload.seek(0)
+        if not zipfile.is_zipfile(upload):
+            upload.seek(0)
+            content = upload.read(settings.max_file_size + 1)
+            _validate_image_upload(filename, content_type, content)
+            add(filename, content)
+            continue
+        
+        try:
+            with zipfile.ZipFile(upload) as archive:
+                for member in archive.infolist():
+                    name = member.filename
+                    if member.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                        continue
+                    if os.path.splitext(name)[1].lower() not in BULK_IMAGE_EXTENSIONS:
+                        continue
+                    member_content = _read_zip_member(archive, member)
+                    _validate_image_upload(name, mimetypes.guess_type(name)[0], member_content)
+                    add(os.path.basename(name), member_content)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, EOFError) as e:
+            raise HTTPException(status_code=400, detail=f"{filename} is not a readable zip archive: {e}")
+    
+    return items
+
+async def _predict_bulk_item(
+    index: int,
+    filename: str,
+    content: bytes,
+    semaphore: asyncio.Semaphore
+) -> Tuple[int, str, bytes, Optional[Dict[str, Any]], Optional[str]]:
+    """Run one bulk image through inference, yielding to interactive traffic when the pool is full"""
+    async with semaphore:
+        for attempt in range(1, 51):
+            try:
+                result = await model_service.predict_from_bytes(content)
+                if result is None:
+                    return index, filename, content, None, "Prediction failed"
+                return index, filename, content, result, None
+            except InferenceSaturatedError:
+                await asyncio.sleep(min(0.05 * attempt, 1.0))
+        return index, filename, content, None, "Inference service is busy"
+
+@router.post("/predict-bulk")
+async def create_bulk_predictions(
+    files: List[UploadFile] = File(...),
+    patient_id: Optional[int] = Form(None),
+    clinical_notes: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Predict many images (or zip archives of images) in one request.
+    
+    Images are decoded and inferred concurrently (and batched when
+    INFERENCE_BATCHING_ENABLED), Prediction and AuditLog rows are inserted
+    in bulk every BULK_PREDICTION_COMMIT_SIZE results or
+    BULK_PREDICTION_FLUSH_INTERVAL_MS after the oldest uncommitted one, and
+    one NDJSON line per image is streamed back as soon as its row is
+    committed, followed by a summary line.
+    """
+    if patient_id is not None:
+        patient = await db.get(Patient, patient_id)
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient not found")
+    
+    if not model_service.is_loaded():
+        success = await model_service.load_model()
+        if not success:
+            raise HTTPException(status_code=500, detail="Failed to load model")
+    
+    uploads = [(file.filename or "upload", file.content_type, file.file) for file in files]
+    items = await asyncio.to_thread(_expand_bulk_uploads, uploads)
+    if not items:
+        raise HTTPException(status_code=400, detail="No images found in upload")
+    
+    async def stream_results():
+        semaphore = asyncio.Semaphore(settings.bulk_prediction_concurrency)
+        tasks = [
+            asyncio.create_task(_predict_bulk_item(index, filename, content, semaphore))
+            for index, (filename, content) in enumerate(items)
+        ]
+        session = AsyncSessionLocal()
+        prediction_rows: List[Dict[str, Any]] = []
+        audit_rows: List[Dict[str, Any]] = []
+        lines: List[str] = []
+        succeeded = failed = 0
+        flush_interval = settings.bulk_prediction_flush_interval_ms / 1000
+        oldest_unflushed: Optional[float] = None
+        
+        async def flush() -> List[str]:
+            """Insert buffered rows in one transaction and release their result lines"""
+            if prediction_rows:
+                await session.execute(insert(Prediction), prediction_rows)
+                await session.execute(insert(AuditLog), audit_rows)
+                await apply_rollup_changes(session, RollupChanges.for_new_predictions(prediction_rows))
+                await bump_data_versions(session, PREDICTIONS_TAG)
+                await session.commit()
+                prediction_rows.clear()
+                audit_rows.clear()
+            released = lines[:]
+            lines.clear()
+            return released
+        
+        try:
+            pending = set(tasks)
+            while pending:
+                # Wake up to commit buffered results once the oldest has waited flush_interval
+                timeout = None
+                if oldest_unflushed is not None:
+                    timeout = max(0.0, oldest_unflushed + flush_interval - time.perf_counter())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                for completed in done:
+                    index, filename, content, result, error = completed.result()
+                    
+                    if error is not None:
+                        failed += 1
+                        lines.append(json.dumps({"index": index, "filename": filename, "status": "error", "detail": error}) + "\n")
+                        continue
+                    
+                    succeeded += 1
+                    file_id, stored_filename, file_path = await _save_upload(content, filename)
+                    prediction_row, audit_row = build_prediction_records(
+                        prediction_id=file_id,
+                        filename=stored_filename,
+                        original_filename=filename,
+                        image_path=file_path,
+                        result=result,
+                        patient_id=patient_id,
+                        clinical_notes=clinical_notes,
+                        audit_details={"bulk": True}
+                    )
+                    prediction_rows.append(prediction_row)
+                    audit_rows.append(audit_row)
+                    lines.append(json.dumps({
+                        "index": index,
+                        "filename": filename,
+                        "status": "success",
+                        "id": file_id,
+                        "prediction": result['prediction'],
+                        "confidence": result['confidence'],
+                        "confidence_scores": result['probabilities'],
+                        "cache_hit": result.get('cache_hit', False)
+                    }) + "\n")
+                    if oldest_unflushed is None:
+                        oldest_unflushed = time.perf_counter()
+                
+                if (
+                    not prediction_rows
+                    or len(prediction_rows) >= settings.bulk_prediction_commit_size
+                    or time.perf_counter() - oldest_unflushed >= flush_interval
+                ):
+                    for line in await flush():
+                        yield line
+                    oldest_unflushed = None
+            
+            for line in await flush():
+                yield line
+            yield json.dumps({"status": "complete", "total": len(items), "succeeded": succeeded, "failed": failed}) + "\n"
+            
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error in bulk prediction: {e}")
+            yield json.dumps({"status": "error", "detail": f"Bulk prediction failed: {str(e)}"}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            await session.close()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+def _job_response(job: PredictionJob) -> PredictionJobResponse:
+    """Build the job status payload, embedding the prediction once it exists"""
+    response = PredictionJobResponse.model_validate(job)
+    if job.status == JOB_COMPLETED and job.prediction is not None:
+        prediction = job.prediction
+        if prediction.patient:
+            prediction.patient_info = {
+                "patient_id": prediction.patient.patient_id,
+                "first_name": prediction.patient.first_name,
+                "last_name": prediction.patient.last_name,
+                "age": prediction.patient.age,
+                "gender": prediction.patient.gender
+            }
+        response.prediction = PredictionResponse.model_validate(prediction)
+    return response
+
+@router.post("/predictions/jobs", response_model=PredictionJobResponse, status_code=202)
+async def create_prediction_job(
+    file: UploadFile = File(...),
+    patient_id: Optional[int] = Form(None),
+    clinical_notes: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue a prediction and return immediately with a job id.
+    
+    The image is stored and a queued job row is committed before the
+    response is sent, so the job survives restarts. Poll
+    GET /predictions/jobs/{job_id} for the result.
+    """
+    try:
+        if patient_id is not None:
+            patient = await db.get(Patient, patient_id)
+            if not patient:
+                raise HTTPException(status_code=404, detail="Patient not found")
+        
+        if not file.content_type or not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+        
+        content = await file.read()
+        if len(content) > settings.max_file_size:
+            raise HTTPException(status_code=400, detail="File exceeds the maximum file size")
+        
+        job = await prediction_job_queue.submit(db, content, file.filename, patient_id, clinical_notes)
+        await prediction_job_queue.notify()
+        
+        return _job_response(job)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error queueing prediction job: {e}")
+        raise HTTPException(status_code=500, detail=f"Error queueing prediction: {str(e)}")
+
+@router.get("/predictions/jobs/{job_id}", response_model=PredictionJobResponse)
+async def get_prediction_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the job to finish"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get prediction job status, optionally long-polling until it completes or fails"""
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            job = await db.scalar(
+                select(PredictionJob)
+                .options(selectinload(PredictionJob.prediction).selectinload(Prediction.patient))
+                .where(PredictionJob.id == job_id)
+                .execution_options(populate_existing=True)
+            )
+            if not job:
+                raise HTTPException(status_code=404, detail="Prediction job not found")
+            if job.status in TERMINAL_STATUSES or loop.time() >= deadline:
+                return _job_response(job)
+            
+            # End the read transaction so the next poll sees the worker's commit
+            await db.rollback()
+            await asyncio.sleep(min(JOB_POLL_INTERVAL_SECONDS, max(0.0, deadline - loop.time())))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving prediction job: {str(e)}")
+
+@router.get(
+    "/predictions", response_model=Union[PaginatedResponse[PredictionResponse], CursorPage[PredictionResponse]],
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG, PATIENTS_TAG))]
+)
 async def get_predictions(
     page: int = Query(1, ge=1),
     size: int = Query(50, ge=1, le=100),
+    pagination: PaginationModeEnum = Query(PaginationModeEnum.OFFSET),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (cursor pagination)"),
+    total_mode: TotalModeEnum = Query(TotalModeEnum.NONE, description="Total to include with cursor pagination"),
     patient_id: Optional[int] = Query(None),
     prediction_type: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get paginated list of predictions with filters"""
+    """
+    Get paginated list of predictions with filters
+    
+    Offset pagination (default) returns an exact total. With
+    ``pagination=cursor`` pages are keyed on (created_at, id), newest first.
+    """
     try:
-        query = db.query(Prediction).join(Patient, Prediction.patient_id == Patient.id, isouter=True)
+        query = select(Prediction)
         
         # Apply filters
         if patient_id:
-            query = query.filter(Prediction.patient_id == patient_id)
+            query = query.where(Prediction.patient_id == patient_id)
         
         if prediction_type:
-            query = query.filter(Prediction.prediction == prediction_type.upper())
+            query = query.where(Prediction.prediction == prediction_type.upper())
+        
+        if pagination == PaginationModeEnum.CURSOR or cursor:
+            page_data = await paginate_keyset(
+                db, with_patient_info(query), Prediction.created_at, Prediction.id, size, cursor, total_mode
+            )
+            page_data['items'] = predictions_from_rows(page_data['items'])
+            return CursorPage[PredictionResponse](**page_data)
         
         # Order by most recent
         query = query.order_by(desc(Prediction.created_at))
         
         # Get total count
-        total = query.count()
+        total = await count_rows(db, query)
         
         # Apply pagination
         offset = (page - 1) * size
-        predictions = query.offset(offset).limit(size).all()
-        
-        # Add patient info to each prediction
-        for prediction in predictions:
-            if prediction.patient:
-                prediction.patient_info = {
-                    "patient_id": prediction.patient.patient_id,
-                    "first_name": prediction.patient.first_name,
-                    "last_name": prediction.patient.last_name,
-                    "age": prediction.patient.age,
-                    "gender": prediction.patient.gender
-                }
+        rows = (await db.execute(with_patient_info(query).offset(offset).limit(size))).all()
+        predictions = predictions_from_rows(rows)
         
         # Calculate pages
         pages = (total + size - 1) // size
@@ -253,27 +532,23 @@ async def get_predictions(
             pages=pages
         )
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving predictions: {str(e)}")
 
 @router.get("/predictions/{prediction_id}", response_model=PredictionResponse)
-async def get_prediction(prediction_id: str, db: Session = Depends(get_db)):
+async def get_prediction(prediction_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get specific prediction by ID"""
     try:
-        prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
-        if not prediction:
+        row = (await db.execute(
+            select_predictions_with_patient_info().where(Prediction.id == prediction_id)
+        )).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Prediction not found")
         
-        # Add patient info if available
-        if prediction.patient:
-            prediction.patient_info = {
-                "patient_id": prediction.patient.patient_id,
-                "first_name": prediction.patient.first_name,
-                "last_name": prediction.patient.last_name,
-                "age": prediction.patient.age,
-                "gender": prediction.patient.gender
-            }
-        
+        prediction = row[0]
+        prediction.patient_info = patient_info_from_row(row)
         return prediction
         
     except HTTPException:
@@ -284,19 +559,19 @@ async def get_prediction(prediction_id: str, db: Session = Depends(get_db)):
 @router.get("/predictions/patient/{patient_id}")
 async def get_patient_predictions(
     patient_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all predictions for a specific patient"""
     try:
         # Verify patient exists
-        patient = db.query(Patient).filter(Patient.id == patient_id).first()
+        patient = await db.get(Patient, patient_id)
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
         
         # Get predictions
-        predictions = db.query(Prediction).filter(
+        predictions = (await db.scalars(select(Prediction).where(
             Prediction.patient_id == patient_id
-        ).order_by(desc(Prediction.created_at)).all()
+        ).order_by(desc(Prediction.created_at)))).all()
         
         # Add patient info to each prediction
         for prediction in predictions:
@@ -320,34 +595,15 @@ async def get_patient_predictions(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving patient predictions: {str(e)}")
 
-@router.get("/stats/overview", response_model=OverviewStats)
-async def get_overview_stats(db: Session = Depends(get_db)):
+@router.get(
+    "/stats/overview", response_model=OverviewStats,
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG, PATIENTS_TAG))]
+)
+async def get_overview_stats(db: AsyncSession = Depends(get_async_db)):
     """Get comprehensive overview statistics"""
     try:
-        # Get date ranges
-        today = datetime.utcnow().date()
-        week_ago = today - timedelta(days=7)
-        
-        # Patient stats
-        total_patients = db.query(Patient).count()
-        
-        # Prediction stats
-        total_predictions = db.query(Prediction).count()
-        predictions_today = db.query(Prediction).filter(
-            func.date(Prediction.created_at) == today
-        ).count()
-        
-        pneumonia_cases = db.query(Prediction).filter(
-            Prediction.prediction == "PNEUMONIA"
-        ).count()
-        
-        normal_cases = db.query(Prediction).filter(
-            Prediction.prediction == "NORMAL"
-        ).count()
-        
-        # Average confidence
-        avg_confidence_result = db.query(func.avg(Prediction.confidence)).scalar()
-        average_confidence = float(avg_confidence_result) if avg_confidence_result else 0
+        # All counts and the average confidence in one statement
+        aggregates = await get_overview_aggregates(db)
         
         # Mock model accuracy (you can implement actual accuracy tracking)
         model_accuracy = 0.94  # 94% mock accuracy
@@ -356,12 +612,12 @@ async def get_overview_stats(db: Session = Depends(get_db)):
         active_users = 5
         
         return OverviewStats(
-            total_patients=total_patients,
-            total_predictions=total_predictions,
-            predictions_today=predictions_today,
-            pneumonia_cases=pneumonia_cases,
-            normal_cases=normal_cases,
-            average_confidence=round(average_confidence, 3),
+            total_patients=aggregates.total_patients,
+            total_predictions=aggregates.total_predictions,
+            predictions_today=aggregates.predictions_today,
+            pneumonia_cases=aggregates.pneumonia_cases,
+            normal_cases=aggregates.normal_cases,
+            average_confidence=round(aggregates.average_confidence, 3),
             model_accuracy=model_accuracy,
             active_users=active_users
         )
@@ -369,43 +625,21 @@ async def get_overview_stats(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating overview stats: {str(e)}")
 
-@router.get("/stats/predictions")
-async def get_prediction_statistics(db: Session = Depends(get_db)):
+@router.get(
+    "/stats/predictions",
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG))]
+)
+async def get_prediction_statistics(db: AsyncSession = Depends(get_async_db)):
     """Get detailed prediction statistics"""
     try:
-        total_predictions = db.query(Prediction).count()
-        
-        if total_predictions == 0:
-            return {
-                "total_predictions": 0,
-                "pneumonia_cases": 0,
-                "normal_cases": 0,
-                "unique_patients": 0,
-                "average_confidence": 0,
-                "status": "success"
-            }
-        
-        pneumonia_count = db.query(Prediction).filter(
-            Prediction.prediction == "PNEUMONIA"
-        ).count()
-        
-        normal_count = db.query(Prediction).filter(
-            Prediction.prediction == "NORMAL"
-        ).count()
-        
-        # Unique patients with predictions
-        unique_patients = db.query(Prediction.patient_id).distinct().count()
-        
-        # Average confidence
-        avg_confidence_result = db.query(func.avg(Prediction.confidence)).scalar()
-        avg_confidence = float(avg_confidence_result) if avg_confidence_result else 0
+        aggregates = await get_overview_aggregates(db, unique_patients=True)
         
         return {
-            "total_predictions": total_predictions,
-            "pneumonia_cases": pneumonia_count,
-            "normal_cases": normal_count,
-            "unique_patients": unique_patients,
-            "average_confidence": round(avg_confidence, 3),
+            "total_predictions": aggregates.total_predictions,
+            "pneumonia_cases": aggregates.pneumonia_cases,
+            "normal_cases": aggregates.normal_cases,
+            "unique_patients": aggregates.unique_patients,
+            "average_confidence": round(aggregates.average_confidence, 3),
             "status": "success"
         }
         
@@ -417,14 +651,19 @@ async def review_prediction(
     prediction_id: str,
     reviewed_by: str = Form(...),
     notes: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark prediction as reviewed by a medical professional"""
     try:
-        prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
+        prediction = await db.get(Prediction, prediction_id)
         if not prediction:
             raise HTTPException(status_code=404, detail="Prediction not found")
         
+        if not prediction.reviewed:
+            changes = RollupChanges()
+            changes.add_review(prediction.created_at)
+            await apply_rollup_changes(db, changes)
+        
         prediction.reviewed = True
         prediction.reviewed_by = reviewed_by
         prediction.reviewed_at = datetime.utcnow()
@@ -432,8 +671,9 @@ async def review_prediction(
         if notes:
             prediction.clinical_notes = notes
         
-        db.commit()
-        db.refresh(prediction)
+        await bump_data_versions(db, PREDICTIONS_TAG)
+        await db.commit()
+        await db.refresh(prediction)
         
         # Log audit trail
         audit = AuditLog(
@@ -444,21 +684,21 @@ async def review_prediction(
             details={"reviewed_by": reviewed_by, "notes": notes}
         )
         db.add(audit)
-        db.commit()
+        await db.commit()
         
         return {"message": "Prediction reviewed successfully", "prediction_id": prediction_id}
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error reviewing prediction: {str(e)}")
 
 @router.delete("/predictions/{prediction_id}")
-async def delete_prediction(prediction_id: str, db: Session = Depends(get_db)):
+async def delete_prediction(prediction_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a prediction"""
     try:
-        prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
+        prediction = await db.get(Prediction, prediction_id)
         if not prediction:
             raise HTTPException(status_code=404, detail="Prediction not found")
         
@@ -466,9 +706,13 @@ async def delete_prediction(prediction_id: str, db: Session = Depends(get_db)):
         if prediction.image_path and os.path.exists(prediction.image_path):
             os.remove(prediction.image_path)
         
-        # Delete prediction
-        db.delete(prediction)
-        db.commit()
+        # Delete prediction and uncount it from the rollups
+        changes = RollupChanges()
+        changes.remove_prediction(prediction.created_at, prediction.prediction, prediction.confidence, bool(prediction.reviewed))
+        await db.delete(prediction)
+        await apply_rollup_changes(db, changes)
+        await bump_data_versions(db, PREDICTIONS_TAG)
+        await db.commit()
         
         # Log audit trail
         audit = AuditLog(
@@ -479,16 +723,27 @@ async def delete_prediction(prediction_id: str, db: Session = Depends(get_db)):
             details={"prediction": prediction.prediction, "filename": prediction.original_filename}
         )
         db.add(audit)
-        db.commit()
+        await db.commit()
         
         return {"message": "Prediction deleted successfully", "prediction_id": prediction_id}
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting prediction: {str(e)}")
 
+@router.get("/inference/metrics")
+async def get_inference_metrics():
+    """Get inference batching, executor pool, result cache and prediction write metrics"""
+    return {
+        "model_loaded": model_service.is_loaded(),
+        "batching": model_service.get_batching_metrics(),
+        "executor": model_service.executor.get_metrics(),
+        "result_cache": model_service.get_cache_metrics(),
+        "group_commit": prediction_writer.get_metrics() if settings.prediction_group_commit_enabled else None
+    }
+
 @router.get("/health")
 async def health_check():
     """Health check for predictions endpoint"""
@@ -498,6 +753,7 @@ async def health_check():
             "status": "ok",
             "message": "Predictions endpoint is working",
             "model_loaded": model_loaded,
+            "model_ready": model_service.is_ready(),
             "upload_dir": UPLOAD_DIR,
             "upload_dir_exists": os.path.exists(UPLOAD_DIR)
         }
@@ -2,14 +2,24 @@
 Statistics and Analytics endpoints
 """
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, and_, or_, case, select
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, date
 import logging
 
-from app.core.database import get_db
-from app.models.database import Patient, Prediction, WeeklyStats, SystemStats
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.services.data_versions import bump_data_versions, conditional_request
+from app.services.response_cache import (
+    PATIENTS_TAG, PREDICTIONS_TAG, SYSTEM_STATS_TAG, cached_response
+)
+from app.services.stats_aggregation import get_overview_aggregates
+from app.services.stats_rollups import (
+    average_confidence, get_daily_rollups, get_weekly_rollups, weekly_stats_response
+)
+from app.utils.date_ranges import day_range
+from app.models.database import Patient, Prediction, SystemStats
 from app.models.schemas import (
     OverviewStats, WeeklyStatsResponse, DailyStats, 
     MonthlyAccuracy, APIResponse
@@ -18,47 +28,31 @@ from app.models.schemas import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/overview", response_model=OverviewStats)
-async def get_overview_stats(db: Session = Depends(get_db)):
+@router.get(
+    "/overview", response_model=OverviewStats,
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG, PATIENTS_TAG, SYSTEM_STATS_TAG))]
+)
+@cached_response("stats:overview", settings.response_cache_overview_ttl_seconds, [PREDICTIONS_TAG, PATIENTS_TAG, SYSTEM_STATS_TAG])
+async def get_overview_stats(db: AsyncSession = Depends(get_async_db)):
     """Get overview statistics for dashboard"""
     try:
-        # Basic counts
-        total_patients = db.query(Patient).count()
-        total_predictions = db.query(Prediction).count()
-        
-        # Today's predictions
-        today = datetime.utcnow().date()
-        predictions_today = db.query(Prediction).filter(
-            func.date(Prediction.created_at) == today
-        ).count()
-        
-        # Prediction type counts
-        pneumonia_cases = db.query(Prediction).filter(
-            Prediction.prediction == "PNEUMONIA"
-        ).count()
-        
-        normal_cases = db.query(Prediction).filter(
-            Prediction.prediction == "NORMAL"
-        ).count()
-        
-        # Average confidence
-        avg_confidence_result = db.query(func.avg(Prediction.confidence)).scalar()
-        average_confidence = float(avg_confidence_result) if avg_confidence_result else 0.0
+        # All counts and the average confidence in one statement
+        aggregates = await get_overview_aggregates(db)
         
         # Get latest system stats for model accuracy
-        latest_stats = db.query(SystemStats).order_by(desc(SystemStats.date)).first()
+        latest_stats = await db.scalar(select(SystemStats).order_by(desc(SystemStats.date)).limit(1))
         model_accuracy = latest_stats.model_accuracy if latest_stats else 0.94
         
         # Active users (mock for now - would come from user sessions)
         active_users = 5
         
         return OverviewStats(
-            total_patients=total_patients,
-            total_predictions=total_predictions,
-            predictions_today=predictions_today,
-            pneumonia_cases=pneumonia_cases,
-            normal_cases=normal_cases,
-            average_confidence=average_confidence,
+            total_patients=aggregates.total_patients,
+            total_predictions=aggregates.total_predictions,
+            predictions_today=aggregates.predictions_today,
+            pneumonia_cases=aggregates.pneumonia_cases,
+            normal_cases=aggregates.normal_cases,
+            average_confidence=aggregates.average_confidence,
             model_accuracy=model_accuracy,
             active_users=active_users
         )
@@ -67,27 +61,33 @@ async def get_overview_stats(db: Session = Depends(get_db)):
         logger.error(f"Error getting overview stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to get overview statistics")
 
-@router.get("/weekly", response_model=List[WeeklyStatsResponse])
+@router.get(
+    "/weekly", response_model=List[WeeklyStatsResponse],
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG))]
+)
 async def get_weekly_stats(
     weeks: int = Query(12, ge=1, le=52),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get weekly statistics for the past N weeks"""
     try:
-        weekly_stats = db.query(WeeklyStats).order_by(
-            desc(WeeklyStats.week_start)
-        ).limit(weeks).all()
+        # One pre-aggregated row per week
+        weekly_rollups = await get_weekly_rollups(db, weeks)
         
-        return [WeeklyStatsResponse.from_orm(stat) for stat in weekly_stats]
+        return [weekly_stats_response(rollup) for rollup in weekly_rollups]
         
     except Exception as e:
         logger.error(f"Error getting weekly stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to get weekly statistics")
 
-@router.get("/daily", response_model=List[DailyStats])
+@router.get(
+    "/daily", response_model=List[DailyStats],
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG))]
+)
+@cached_response("stats:daily", settings.response_cache_daily_ttl_seconds, [PREDICTIONS_TAG])
 async def get_daily_stats(
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get daily prediction statistics"""
     try:
@@ -95,29 +95,16 @@ async def get_daily_stats(
         end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=days)
         
-        # Query predictions grouped by date
-        daily_data = db.query(
-            func.date(Prediction.created_at).label('date'),
-            func.count(Prediction.id).label('predictions'),
-            func.avg(Prediction.confidence).label('avg_confidence')
-        ).filter(
-            and_(
-                func.date(Prediction.created_at) >= start_date,
-                func.date(Prediction.created_at) <= end_date
-            )
-        ).group_by(
-            func.date(Prediction.created_at)
-        ).order_by(
-            func.date(Prediction.created_at)
-        ).all()
+        # One pre-aggregated row per day with predictions
+        daily_rollups = await get_daily_rollups(db, start_date, end_date)
         
         # Convert to response format
         daily_stats = []
-        for row in daily_data:
+        for rollup in daily_rollups:
             daily_stats.append(DailyStats(
-                date=row.date.isoformat(),
-                predictions=row.predictions,
-                accuracy=float(row.avg_confidence) if row.avg_confidence else 0.0
+                date=rollup.period_start.isoformat(),
+                predictions=rollup.predictions_count,
+                accuracy=average_confidence(rollup)
             ))
         
         return daily_stats
@@ -129,7 +116,7 @@ async def get_daily_stats(
 @router.get("/monthly-accuracy", response_model=List[MonthlyAccuracy])
 async def get_monthly_accuracy(
     months: int = Query(12, ge=1, le=24),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get monthly accuracy statistics"""
     try:
@@ -158,12 +145,16 @@ async def get_monthly_accuracy(
         logger.error(f"Error getting monthly accuracy: {e}")
         raise HTTPException(status_code=500, detail="Failed to get monthly accuracy")
 
-@router.get("/patient-demographics")
-async def get_patient_demographics(db: Session = Depends(get_db)):
+@router.get(
+    "/patient-demographics",
+    dependencies=[Depends(conditional_request(PATIENTS_TAG, PREDICTIONS_TAG))]
+)
+@cached_response("stats:patient-demographics", settings.response_cache_demographics_ttl_seconds, [PATIENTS_TAG, PREDICTIONS_TAG])
+async def get_patient_demographics(db: AsyncSession = Depends(get_async_db)):
     """Get patient demographic statistics"""
     try:
         # Check if we have any patients first
-        patient_count = db.query(func.count(Patient.id)).scalar()
+        patient_count = await db.scalar(select(func.count(Patient.id)))
         
         if patient_count == 0:
             # Return empty demographics if no patients
@@ -174,13 +165,13 @@ async def get_patient_demographics(db: Session = Depends(get_db)):
             }
         
         # Gender distribution
-        gender_stats = db.query(
+        gender_stats = (await db.execute(select(
             Patient.gender,
             func.count(Patient.id).label('count')
-        ).group_by(Patient.gender).all()
+        ).group_by(Patient.gender))).all()
         
         # Age groups
-        age_groups = db.query(
+        age_groups = (await db.execute(select(
             case(
                 (Patient.age < 18, 'Under 18'),
                 (and_(Patient.age >= 18, Patient.age < 35), '18-34'),
@@ -190,16 +181,16 @@ async def get_patient_demographics(db: Session = Depends(get_db)):
                 else_='Unknown'
             ).label('age_group'),
             func.count(Patient.id).label('count')
-        ).group_by('age_group').all()
+        ).group_by('age_group'))).all()
         
         # Predictions by patient gender - use left join to handle cases where there might be patients without predictions
-        prediction_by_gender = db.query(
+        prediction_by_gender = (await db.execute(select(
             Patient.gender,
             Prediction.prediction,
             func.count(Prediction.id).label('count')
         ).outerjoin(Prediction, Patient.id == Prediction.patient_id).group_by(
             Patient.gender, Prediction.prediction
-        ).all()
+        ))).all()
         
         return {
             "gender_distribution": [
@@ -224,38 +215,32 @@ async def get_patient_demographics(db: Session = Depends(get_db)):
         logger.error(f"Error getting demographics: {e}")
         raise HTTPException(status_code=500, detail="Failed to get patient demographics")
 
-@router.get("/model-performance")
-async def get_model_performance(db: Session = Depends(get_db)):
+@router.get(
+    "/model-performance",
+    dependencies=[Depends(conditional_request(PREDICTIONS_TAG))]
+)
+@cached_response("stats:model-performance", settings.response_cache_model_performance_ttl_seconds, [PREDICTIONS_TAG])
+async def get_model_performance(db: AsyncSession = Depends(get_async_db)):
     """Get model performance metrics"""
     try:
         # Confidence distribution
-        confidence_ranges = db.query(
-            func.case(
-                [(Prediction.confidence < 0.5, 'Very Low (< 50%)'),
-                 (and_(Prediction.confidence >= 0.5, Prediction.confidence < 0.7), 'Low (50-70%)'),
-                 (and_(Prediction.confidence >= 0.7, Prediction.confidence < 0.9), 'High (70-90%)'),
-                 (Prediction.confidence >= 0.9, 'Very High (90%+)')],
+        confidence_ranges = (await db.execute(select(
+            case(
+                (Prediction.confidence < 0.5, 'Very Low (< 50%)'),
+                (and_(Prediction.confidence >= 0.5, Prediction.confidence < 0.7), 'Low (50-70%)'),
+                (and_(Prediction.confidence >= 0.7, Prediction.confidence < 0.9), 'High (70-90%)'),
+                (Prediction.confidence >= 0.9, 'Very High (90%+)'),
                 else_='Unknown'
             ).label('confidence_range'),
             func.count(Prediction.id).label('count')
-        ).group_by('confidence_range').all()
+        ).group_by('confidence_range'))).all()
         
         # Average inference time
-        avg_inference_time = db.query(func.avg(Prediction.inference_time)).scalar()
+        avg_inference_time = await db.scalar(select(func.avg(Prediction.inference_time)))
         
-        # Predictions over time (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        daily_predictions = db.query(
-            func.date(Prediction.created_at).label('date'),
-            func.count(Prediction.id).label('count'),
-            func.avg(Prediction.confidence).label('avg_confidence')
-        ).filter(
-            Prediction.created_at >= thirty_days_ago
-        ).group_by(
-            func.date(Prediction.created_at)
-        ).order_by(
-            func.date(Prediction.created_at)
-        ).all()
+        # Predictions over time (last 30 days) from the day rollups
+        today = datetime.utcnow().date()
+        daily_rollups = await get_daily_rollups(db, today - timedelta(days=30), today)
         
         return {
             "confidence_distribution": [
@@ -265,11 +250,11 @@ async def get_model_performance(db: Session = Depends(get_db)):
             "average_inference_time": float(avg_inference_time) if avg_inference_time else 0.0,
             "daily_predictions": [
                 {
-                    "date": row.date.isoformat(),
-                    "count": row.count,
-                    "avg_confidence": float(row.avg_confidence) if row.avg_confidence else 0.0
+                    "date": rollup.period_start.isoformat(),
+                    "count": rollup.predictions_count,
+                    "avg_confidence": average_confidence(rollup)
                 }
-                for row in daily_predictions
+                for rollup in daily_rollups
             ]
         }
         
@@ -281,16 +266,18 @@ async def get_model_performance(db: Session = Depends(get_db)):
 async def update_system_stats(
     model_accuracy: float,
     predictions_processed: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update system statistics (admin endpoint)"""
     try:
         today = datetime.utcnow().date()
+        today_start, today_end = day_range(today)
         
         # Check if stats for today already exist
-        existing_stats = db.query(SystemStats).filter(
-            func.date(SystemStats.date) == today
-        ).first()
+        existing_stats = await db.scalar(select(SystemStats).where(
+            SystemStats.date >= today_start,
+            SystemStats.date < today_end
+        ).limit(1))
         
         if existing_stats:
             existing_stats.model_accuracy = model_accuracy
@@ -304,7 +291,8 @@ async def update_system_stats(
             )
             db.add(new_stats)
         
-        db.commit()
+        await bump_data_versions(db, SYSTEM_STATS_TAG)
+        await db.commit()
         
         return APIResponse(
             message="System statistics updated successfully",
@@ -313,5 +301,5 @@ async def update_system_stats(
         
     except Exception as e:
         logger.error(f"Error updating system stats: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to update system statistics")
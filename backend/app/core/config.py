@@ -16,6 +16,14 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = Field(..., env="DATABASE_URL")
+    database_async_driver: str = Field(default="asyncpg", env="DATABASE_ASYNC_DRIVER")  # asyncpg or psycopg
+    database_pool_size: int = Field(default=5, env="DATABASE_POOL_SIZE")
+    database_max_overflow: int = Field(default=10, env="DATABASE_MAX_OVERFLOW")
+    database_pool_timeout: float = Field(default=30.0, env="DATABASE_POOL_TIMEOUT")
+    database_pool_recycle: int = Field(default=300, env="DATABASE_POOL_RECYCLE")
+    database_pool_use_lifo: bool = Field(default=False, env="DATABASE_POOL_USE_LIFO")
+    database_pool_pre_ping: bool = Field(default=True, env="DATABASE_POOL_PRE_PING")
+    database_pgbouncer_mode: bool = Field(default=False, env="DATABASE_PGBOUNCER_MODE")  # transaction pooling
     
     # Security
     secret_key: str = Field(..., env="SECRET_KEY")
@@ -33,6 +41,81 @@ class Settings(BaseSettings):
     model_config_path: str = Field(default="model/model_config.json", env="MODEL_CONFIG_PATH")
     confidence_threshold: float = Field(default=0.7, env="CONFIDENCE_THRESHOLD")
     model_input_size: int = Field(default=256, env="MODEL_INPUT_SIZE")
+    preprocess_backend: str = Field(default="pil", env="PREPROCESS_BACKEND")  # pil or opencv
+    preprocess_resize_filter: str = Field(default="lanczos", env="PREPROCESS_RESIZE_FILTER")
+    preprocess_fast_decode: bool = Field(default=False, env="PREPROCESS_FAST_DECODE")  # JPEG DCT-domain downscaling
+    model_eager_load: bool = Field(default=True, env="MODEL_EAGER_LOAD")
+    model_warmup_iterations: int = Field(default=3, env="MODEL_WARMUP_ITERATIONS")
+    
+    # ONNX Runtime session tuning (0 threads = let ORT decide)
+    ort_graph_optimization_level: str = Field(default="all", env="ORT_GRAPH_OPTIMIZATION_LEVEL")
+    ort_intra_op_num_threads: int = Field(default=0, env="ORT_INTRA_OP_NUM_THREADS")
+    ort_inter_op_num_threads: int = Field(default=0, env="ORT_INTER_OP_NUM_THREADS")
+    ort_execution_mode: str = Field(default="sequential", env="ORT_EXECUTION_MODE")
+    ort_enable_cpu_mem_arena: bool = Field(default=True, env="ORT_ENABLE_CPU_MEM_ARENA")
+    ort_enable_mem_pattern: bool = Field(default=True, env="ORT_ENABLE_MEM_PATTERN")
+    ort_optimized_model_path: Optional[str] = Field(default=None, env="ORT_OPTIMIZED_MODEL_PATH")
+    
+    # Inference batching
+    inference_batching_enabled: bool = Field(default=False, env="INFERENCE_BATCHING_ENABLED")
+    inference_max_batch_size: int = Field(default=8, env="INFERENCE_MAX_BATCH_SIZE")
+    inference_max_wait_ms: float = Field(default=5.0, env="INFERENCE_MAX_WAIT_MS")
+    
+    # Prediction result cache (keyed by image hash, model version and preprocessing)
+    prediction_cache_enabled: bool = Field(default=True, env="PREDICTION_CACHE_ENABLED")
+    prediction_cache_max_entries: int = Field(default=1024, env="PREDICTION_CACHE_MAX_ENTRIES")
+    prediction_cache_ttl_seconds: int = Field(default=3600, env="PREDICTION_CACHE_TTL_SECONDS")
+    prediction_cache_use_redis: bool = Field(default=False, env="PREDICTION_CACHE_USE_REDIS")
+    
+    # Response cache for stats and dashboard endpoints (keyed by data versions)
+    response_cache_enabled: bool = Field(default=True, env="RESPONSE_CACHE_ENABLED")
+    response_cache_max_entries: int = Field(default=256, env="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_use_redis: bool = Field(default=False, env="RESPONSE_CACHE_USE_REDIS")
+    response_cache_overview_ttl_seconds: int = Field(default=30, env="RESPONSE_CACHE_OVERVIEW_TTL_SECONDS")
+    response_cache_daily_ttl_seconds: int = Field(default=300, env="RESPONSE_CACHE_DAILY_TTL_SECONDS")
+    response_cache_demographics_ttl_seconds: int = Field(default=600, env="RESPONSE_CACHE_DEMOGRAPHICS_TTL_SECONDS")
+    response_cache_model_performance_ttl_seconds: int = Field(default=300, env="RESPONSE_CACHE_MODEL_PERFORMANCE_TTL_SECONDS")
+    response_cache_dashboard_ttl_seconds: int = Field(default=30, env="RESPONSE_CACHE_DASHBOARD_TTL_SECONDS")
+    
+    # Bulk predictions
+    bulk_prediction_max_files: int = Field(default=500, env="BULK_PREDICTION_MAX_FILES")
+    bulk_prediction_concurrency: int = Field(default=8, env="BULK_PREDICTION_CONCURRENCY")
+    bulk_prediction_commit_size: int = Field(default=50, env="BULK_PREDICTION_COMMIT_SIZE")
+    bulk_prediction_flush_interval_ms: float = Field(default=200.0, env="BULK_PREDICTION_FLUSH_INTERVAL_MS")
+    bulk_prediction_max_total_size: int = Field(default=268435456, env="BULK_PREDICTION_MAX_TOTAL_SIZE")  # 256MB of images
+    
+    # Prediction writes (group commit shares one transaction across concurrent requests)
+    prediction_group_commit_enabled: bool = Field(default=False, env="PREDICTION_GROUP_COMMIT_ENABLED")
+    prediction_group_commit_max_size: int = Field(default=64, env="PREDICTION_GROUP_COMMIT_MAX_SIZE")
+    prediction_group_commit_max_wait_ms: float = Field(default=5.0, env="PREDICTION_GROUP_COMMIT_MAX_WAIT_MS")
+    
+    # Asynchronous prediction jobs (0 workers = API-only instance)
+    prediction_job_workers: int = Field(default=1, env="PREDICTION_JOB_WORKERS")
+    prediction_job_queue_backend: str = Field(default="database", env="PREDICTION_JOB_QUEUE_BACKEND")
+    prediction_job_poll_interval: float = Field(default=1.0, env="PREDICTION_JOB_POLL_INTERVAL")
+    prediction_job_lease_seconds: int = Field(default=300, env="PREDICTION_JOB_LEASE_SECONDS")
+    prediction_job_max_attempts: int = Field(default=3, env="PREDICTION_JOB_MAX_ATTEMPTS")
+    
+    # Data exports (rows fetched per server-side cursor batch)
+    export_batch_size: int = Field(default=2000, env="EXPORT_BATCH_SIZE")
+    export_row_group_size: int = Field(default=50000, env="EXPORT_ROW_GROUP_SIZE")  # Parquet/Arrow batches
+    
+    # PDF summary reports cached per date range and data version
+    report_cache_max_entries: int = Field(default=32, env="REPORT_CACHE_MAX_ENTRIES")
+    
+    # Background export jobs (0 workers = API-only instance)
+    export_dir: str = Field(default="exports", env="EXPORT_DIR")  # Not served; keep outside UPLOAD_DIR
+    export_job_workers: int = Field(default=1, env="EXPORT_JOB_WORKERS")
+    export_job_poll_interval: float = Field(default=2.0, env="EXPORT_JOB_POLL_INTERVAL")
+    export_job_lease_seconds: int = Field(default=3600, env="EXPORT_JOB_LEASE_SECONDS")
+    export_job_max_attempts: int = Field(default=2, env="EXPORT_JOB_MAX_ATTEMPTS")
+    export_job_dedupe_seconds: int = Field(default=600, env="EXPORT_JOB_DEDUPE_SECONDS")
+    export_artifact_retention_seconds: int = Field(default=86400, env="EXPORT_ARTIFACT_RETENTION_SECONDS")
+    export_gc_interval_seconds: int = Field(default=300, env="EXPORT_GC_INTERVAL_SECONDS")
+    
+    # Inference executor
+    inference_executor_workers: int = Field(default=2, env="INFERENCE_EXECUTOR_WORKERS")
+    inference_max_pending: int = Field(default=32, env="INFERENCE_MAX_PENDING")
     
     # File Upload
     upload_dir: str = Field(default="uploads", env="UPLOAD_DIR")
@@ -69,6 +152,60 @@ class Settings(BaseSettings):
             return v
         return v
     
+    @field_validator("database_async_driver")
+    @classmethod
+    def validate_database_async_driver(cls, v):
+        """Validate async PostgreSQL driver."""
+        v = v.lower()
+        if v not in ("asyncpg", "psycopg"):
+            raise ValueError("database_async_driver must be one of: asyncpg, psycopg")
+        return v
+    
+    @field_validator("ort_graph_optimization_level")
+    @classmethod
+    def validate_ort_graph_optimization_level(cls, v):
+        """Validate ONNX Runtime graph optimization level."""
+        v = v.lower()
+        if v not in ("disable", "basic", "extended", "all"):
+            raise ValueError("ort_graph_optimization_level must be one of: disable, basic, extended, all")
+        return v
+    
+    @field_validator("ort_execution_mode")
+    @classmethod
+    def validate_ort_execution_mode(cls, v):
+        """Validate ONNX Runtime execution mode."""
+        v = v.lower()
+        if v not in ("sequential", "parallel"):
+            raise ValueError("ort_execution_mode must be one of: sequential, parallel")
+        return v
+    
+    @field_validator("preprocess_backend")
+    @classmethod
+    def validate_preprocess_backend(cls, v):
+        """Validate image preprocessing backend."""
+        v = v.lower()
+        if v not in ("pil", "opencv"):
+            raise ValueError("preprocess_backend must be one of: pil, opencv")
+        return v
+    
+    @field_validator("preprocess_resize_filter")
+    @classmethod
+    def validate_preprocess_resize_filter(cls, v):
+        """Validate image resize filter."""
+        v = v.lower()
+        if v not in ("nearest", "bilinear", "bicubic", "lanczos", "area"):
+            raise ValueError("preprocess_resize_filter must be one of: nearest, bilinear, bicubic, lanczos, area")
+        return v
+    
+    @field_validator("prediction_job_queue_backend")
+    @classmethod
+    def validate_prediction_job_queue_backend(cls, v):
+        """Validate prediction job wake-up backend."""
+        v = v.lower()
+        if v not in ("database", "redis"):
+            raise ValueError("prediction_job_queue_backend must be one of: database, redis")
+        return v
+    
     @field_validator("allowed_extensions", mode="before")
     @classmethod
     def assemble_allowed_extensions(cls, v):
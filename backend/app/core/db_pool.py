@@ -0,0 +1,156 @@
+"""
+Connection pool classes that record checkout wait times, and pool metrics
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is unbounded
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class PoolMetrics:
+    """
+    Checkout, wait time and failure counters for one engine's pool.
+
+    Metrics are per process: every uvicorn worker has its own pools.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        self.checkouts_total = 0
+        self.checkout_timeouts_total = 0
+        self.connections_created_total = 0
+        self.invalidations_total = 0
+        self.pre_ping_failures_total = 0
+        self.pool: Optional[QueuePool] = None
+
+    def record_wait(self, seconds: float) -> None:
+        """Record how long a checkout waited for a connection."""
+        with self._lock:
+            self._wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000.0)] += 1
+            self._wait_time_total += seconds
+            self._wait_time_max = max(self._wait_time_max, seconds)
+            self.checkouts_total += 1
+
+    def record_timeout(self) -> None:
+        """Record a checkout that gave up after pool_timeout."""
+        with self._lock:
+            self.checkout_timeouts_total += 1
+
+    def attach(self, engine: Engine) -> None:
+        """Listen to the engine's connection events."""
+        self.pool = engine.pool
+        if isinstance(engine.pool, TimedPoolMixin):
+            engine.pool.metrics = self
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            self.connections_created_total += 1
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations_total += 1
+
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            if context.is_pre_ping and context.is_disconnect:
+                self.pre_ping_failures_total += 1
+
+        @event.listens_for(engine, "engine_disposed")
+        def _on_disposed(disposed_engine):
+            self.pool = disposed_engine.pool
+
+    def _pool_status(self) -> Dict[str, Any]:
+        """Current occupancy of the pool."""
+        pool = self.pool
+        if not isinstance(pool, QueuePool):
+            return {'pool_class': type(pool).__name__ if pool is not None else None}
+        return {
+            'pool_class': type(pool).__name__,
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'timeout_seconds': pool.timeout(),
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get pool occupancy, checkout wait histogram and failure counters."""
+        with self._lock:
+            buckets: List[Dict[str, Any]] = []
+            cumulative = 0
+            for upper, count in zip(WAIT_BUCKETS_MS + [None], self._wait_buckets):
+                cumulative += count
+                buckets.append({'le_ms': upper if upper is not None else "+Inf", 'count': cumulative})
+            checkouts = self.checkouts_total
+            return {
+                'name': self.name,
+                **self._pool_status(),
+                'checkouts_total': checkouts,
+                'checkout_timeouts_total': self.checkout_timeouts_total,
+                'connections_created_total': self.connections_created_total,
+                'invalidations_total': self.invalidations_total,
+                'pre_ping_failures_total': self.pre_ping_failures_total,
+                'average_wait_ms': (self._wait_time_total / checkouts * 1000.0) if checkouts else 0.0,
+                'max_wait_ms': self._wait_time_max * 1000.0,
+                'wait_histogram_ms': buckets,
+            }
+
+
+class TimedPoolMixin:
+    """Time how long ``_do_get`` waits for a free connection."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool that records checkout wait times."""
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait times."""
+
+
+# One metrics object per engine in this process
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Get metrics for the sync and async engine pools of this worker process."""
+    return {
+        'pid': os.getpid(),
+        'sync': sync_pool_metrics.get_metrics(),
+        'async': async_pool_metrics.get_metrics(),
+    }
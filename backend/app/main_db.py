@@ -4,6 +4,7 @@ Medical AI application with PostgreSQL backend
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import logging
@@ -14,8 +15,25 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Database imports
-from app.core.database import create_tables, engine
+from app.core.config import settings
+from app.core.database import create_tables, async_engine
+from app.core.db_pool import get_pool_metrics
 from app.models.database import Base
+from app.ml.model_service import model_service
+from app.services.export_jobs import export_job_queue
+from app.services.prediction_jobs import prediction_job_queue
+from app.services.prediction_persistence import prediction_writer
+from app.services.response_cache import response_cache
+
+async def load_and_warm_up_model() -> None:
+    """Load the model and run the warm-up inferences"""
+    if await model_service.load_model():
+        try:
+            await model_service.warmup(settings.model_warmup_iterations)
+        except Exception as e:
+            logger.error(f"Model warm-up failed: {e}")
+    else:
+        logger.error("Model failed to load; /ready will report not ready")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -35,10 +53,25 @@ async def lifespan(app: FastAPI):
     for directory in upload_dirs:
         os.makedirs(directory, exist_ok=True)
     
+    # Load and warm up the model before accepting traffic
+    if settings.model_eager_load:
+        await load_and_warm_up_model()
+    
+    # Start background prediction job workers (PREDICTION_JOB_WORKERS=0 for API-only instances)
+    prediction_job_queue.start(settings.prediction_job_workers)
+    
+    # Start background export job workers (EXPORT_JOB_WORKERS=0 for API-only instances)
+    export_job_queue.start(settings.export_job_workers)
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Pneumonia Detection API...")
+    await export_job_queue.stop()
+    await prediction_job_queue.stop()
+    await prediction_writer.stop()
+    await model_service.shutdown()
+    await async_engine.dispose()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -90,14 +123,32 @@ async def root():
         ]
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe - only ready once the model is loaded and warmed up
+    
+    With MODEL_EAGER_LOAD=false the first probe loads and warms up the model.
+    """
+    if not settings.model_eager_load and not model_service.is_ready():
+        await load_and_warm_up_model()
+    model_ready = model_service.is_ready()
+    body = {
+        "status": "ready" if model_ready else "not_ready",
+        "model_loaded": model_service.is_loaded(),
+        "model_ready": model_service.is_ready(),
+        "warmup": model_service.warmup_stats
+    }
+    return JSONResponse(status_code=200 if model_ready else 503, content=body)
+
 @app.get("/health")
 async def health_check():
-    """Comprehensive health check endpoint"""
+    """Liveness and dependency health check endpoint"""
     try:
         # Test database connection
         from sqlalchemy import text
-        with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1"))
+        async with async_engine.connect() as connection:
+            result = await connection.execute(text("SELECT 1"))
             db_status = "healthy" if result.fetchone() else "unhealthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -108,12 +159,7 @@ async def health_check():
     )
     
     # Check model availability
-    try:
-        from app.ml.simple_model_service import SimpleModelService
-        model_service = SimpleModelService()
-        model_status = "loaded" if model_service.is_loaded() else "not_loaded"
-    except Exception as e:
-        model_status = f"error: {str(e)}"
+    model_status = "loaded" if model_service.is_loaded() else "not_loaded"
     
     health_status = {
         "status": "healthy" if db_status == "healthy" else "degraded",
@@ -125,19 +171,27 @@ async def health_check():
     
     return health_status
 
+@app.get("/metrics/db-pool")
+async def get_db_pool_metrics():
+    """Connection pool occupancy, checkout wait times and failures for this worker process"""
+    return get_pool_metrics()
+
+@app.get("/metrics/response-cache")
+async def get_response_cache_metrics():
+    """Stats and dashboard response cache hits, misses and evictions for this worker process"""
+    return response_cache.get_metrics()
+
 @app.get("/info")
 async def get_system_info():
     """Get system information and statistics"""
     try:
+        from sqlalchemy import func, select
         from app.models.database import Patient, Prediction
-        from app.core.database import SessionLocal
+        from app.core.database import AsyncSessionLocal
         
-        db = SessionLocal()
-        try:
-            patient_count = db.query(Patient).count()
-            prediction_count = db.query(Prediction).count()
-        finally:
-            db.close()
+        async with AsyncSessionLocal() as db:
+            patient_count = await db.scalar(select(func.count(Patient.id)))
+            prediction_count = await db.scalar(select(func.count(Prediction.id)))
         
         return {
             "application": "Pneumonia Detection System",
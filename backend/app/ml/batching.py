@@ -0,0 +1,193 @@
+"""
+Dynamic micro-batching for ONNX inference
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Window used for the rolling throughput figure
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+async def collect_batch(queue: asyncio.Queue, max_batch_size: int, max_wait: float) -> List[Any]:
+    """
+    Wait for the first queued item, then fill a batch until it holds
+    ``max_batch_size`` items or the first item has waited ``max_wait`` seconds.
+
+    Items must carry an ``enqueued_at`` timestamp from ``time.perf_counter()``.
+    """
+    first = await queue.get()
+    batch = [first]
+    deadline = first.enqueued_at + max_wait
+
+    while len(batch) < max_batch_size:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+
+    return batch
+
+
+@dataclass
+class _PendingRequest:
+    """A single preprocessed image waiting to be batched."""
+    tensor: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class BatchScheduler:
+    """
+    Combine concurrent single-image requests into one batched session run.
+
+    Requests are queued and a background task drains the queue, cutting a
+    batch either when ``max_batch_size`` images are waiting or when the
+    oldest request has waited ``max_wait_ms``. Each caller receives only
+    its own output row. ``run_batch`` is awaited so the session call can
+    run in an executor rather than on the event loop.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[np.ndarray], Awaitable[np.ndarray]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._buffer: Optional[np.ndarray] = None
+
+        # Metrics
+        self.requests_total = 0
+        self.batches_total = 0
+        self.errors_total = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self._queue_wait_total = 0.0
+        self._batch_time_total = 0.0
+        self._recent: Deque[Tuple[float, int]] = deque()
+
+    def _ensure_worker(self) -> None:
+        """Start the batching task on the running event loop if needed."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, tensor: np.ndarray) -> np.ndarray:
+        """Queue a ``[1, H, W, C]`` tensor and wait for its output row."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(tensor, future, time.perf_counter()))
+
+        self.requests_total += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+        return await future
+
+    async def _run(self) -> None:
+        """Background loop that executes batches until cancelled."""
+        while True:
+            batch = await collect_batch(self._queue, self.max_batch_size, self.max_wait)
+            started = time.perf_counter()
+
+            try:
+                inputs = self._stack(batch)
+                outputs = await self.run_batch(inputs)
+            except Exception as e:
+                self.errors_total += 1
+                logger.error(f"Batched inference failed for {len(batch)} requests: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            self._record_batch(batch, started, finished)
+
+            for index, request in enumerate(batch):
+                if not request.future.done():
+                    request.future.set_result(outputs[index:index + 1])
+
+    def _stack(self, batch: List[_PendingRequest]) -> np.ndarray:
+        """
+        Copy the batch into a reusable input buffer.
+
+        Only one batch runs at a time, so the buffer is free again once
+        ``run_batch`` has returned.
+        """
+        sample = batch[0].tensor
+        if self._buffer is None or self._buffer.shape[1:] != sample.shape[1:] or self._buffer.dtype != sample.dtype:
+            self._buffer = np.empty((self.max_batch_size,) + sample.shape[1:], dtype=sample.dtype)
+        return np.concatenate([request.tensor for request in batch], axis=0, out=self._buffer[:len(batch)])
+
+    def _record_batch(self, batch: List[_PendingRequest], started: float, finished: float) -> None:
+        """Update counters after a successful batch."""
+        size = len(batch)
+        self.batches_total += 1
+        self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+        self._queue_wait_total += sum(started - request.enqueued_at for request in batch)
+        self._batch_time_total += finished - started
+
+        self._recent.append((finished, size))
+        cutoff = finished - THROUGHPUT_WINDOW_SECONDS
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+    async def stop(self) -> None:
+        """Cancel the background task and fail any requests still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                request = self._queue.get_nowait()
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get throughput, batch size and queue depth metrics."""
+        processed = sum(size * count for size, count in self.batch_size_histogram.items())
+        now = time.perf_counter()
+        recent = sum(size for ts, size in self._recent if ts >= now - THROUGHPUT_WINDOW_SECONDS)
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'requests_total': self.requests_total,
+            'batches_total': self.batches_total,
+            'errors_total': self.errors_total,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'average_batch_size': processed / self.batches_total if self.batches_total else 0.0,
+            'batch_size_histogram': dict(sorted(self.batch_size_histogram.items())),
+            'average_queue_wait_ms': (self._queue_wait_total / processed * 1000.0) if processed else 0.0,
+            'average_batch_time_ms': (self._batch_time_total / self.batches_total * 1000.0) if self.batches_total else 0.0,
+            'throughput_per_second': recent / THROUGHPUT_WINDOW_SECONDS,
+        }
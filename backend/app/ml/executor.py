@@ -0,0 +1,77 @@
+"""
+Dedicated executor pool for blocking inference work
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceSaturatedError(Exception):
+    """Raised when the inference pool already has the maximum number of pending requests."""
+
+
+class InferenceExecutor:
+    """
+    Thread pool that keeps image preprocessing and ``session.run`` off the event loop.
+
+    ONNX Runtime and PIL release the GIL for the heavy work, so threads give
+    real parallelism without pickling images or sessions across processes.
+    ``admit()`` bounds the number of in-flight requests so that a saturated
+    worker rejects new work instead of queueing it indefinitely.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference"
+        )
+
+        # Only touched from the event loop, so no lock is needed
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        """Reserve a slot for one inference request or raise ``InferenceSaturatedError``."""
+        if self.pending >= self.max_pending:
+            self.rejected_total += 1
+            raise InferenceSaturatedError(
+                f"Inference queue is full ({self.pending}/{self.max_pending} pending)"
+            )
+
+        self.pending += 1
+        self.admitted_total += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking callable in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=wait)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get pool size and backpressure counters."""
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'max_pending_seen': self.max_pending_seen,
+            'admitted_total': self.admitted_total,
+            'rejected_total': self.rejected_total,
+        }
@@ -4,19 +4,14 @@ ONNX Model Service for Pneumonia Detection
 import os
 import json
 import logging
+import asyncio
+import hashlib
+import statistics
 import time
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 import numpy as np
 from PIL import Image
 import base64
-import io
-
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
-    cv2 = None
 
 try:
     import onnxruntime as ort
@@ -26,9 +21,25 @@ except ImportError:
     ort = None
 
 from app.core.config import settings
+from app.ml.batching import BatchScheduler
+from app.ml.executor import InferenceExecutor, InferenceSaturatedError
+from app.ml.preprocessing import ImagePreprocessor
+from app.ml.result_cache import PredictionResultCache
 
 logger = logging.getLogger(__name__)
 
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': 'ORT_DISABLE_ALL',
+    'basic': 'ORT_ENABLE_BASIC',
+    'extended': 'ORT_ENABLE_EXTENDED',
+    'all': 'ORT_ENABLE_ALL',
+}
+
+EXECUTION_MODES = {
+    'sequential': 'ORT_SEQUENTIAL',
+    'parallel': 'ORT_PARALLEL',
+}
+
 
 class ModelService:
     """Service for handling ONNX model inference."""
@@ -40,8 +51,38 @@ class ModelService:
         self.class_names = ['NORMAL', 'PNEUMONIA']
         self.model_config = {}
         self.model_loaded = False
+        self.batch_scheduler: Optional[BatchScheduler] = None
+        self.preprocessor = ImagePreprocessor(
+            settings.model_input_size,
+            backend=settings.preprocess_backend,
+            resize_filter=settings.preprocess_resize_filter,
+            fast_decode=settings.preprocess_fast_decode,
+        )
+        self.executor = InferenceExecutor(
+            max_workers=settings.inference_executor_workers,
+            max_pending=settings.inference_max_pending,
+        )
+        self.result_cache: Optional[PredictionResultCache] = None
+        if settings.prediction_cache_enabled:
+            self.result_cache = PredictionResultCache(
+                max_entries=settings.prediction_cache_max_entries,
+                ttl_seconds=settings.prediction_cache_ttl_seconds,
+                redis_url=settings.redis_url if settings.prediction_cache_use_redis else None,
+            )
+        self.model_version: Optional[str] = None
+        self.ready = False
+        self.load_time: Optional[float] = None
+        self.warmup_stats: Dict[str, Any] = {}
+        self._load_lock = asyncio.Lock()
         
     async def load_model(self) -> bool:
+        """Load the ONNX model once, even when called concurrently."""
+        async with self._load_lock:
+            if self.is_loaded():
+                return True
+            return await self._load_model()
+    
+    async def _load_model(self) -> bool:
         """Load the ONNX model."""
         try:
             if not ONNX_AVAILABLE:
@@ -68,14 +109,50 @@ class ModelService:
                 if 'CUDAExecutionProvider' in available:
                     providers.insert(0, 'CUDAExecutionProvider')
             
-            self.session = ort.InferenceSession(model_path, providers=providers)
+            # Version used to key cached results; changes whenever the model file does
+            model_stat = os.stat(model_path)
+            self.model_version = (
+                f"{self.model_config.get('model_version', 'unknown')}"
+                f"-{model_stat.st_size}-{int(model_stat.st_mtime)}"
+            )
+            
+            # Reuse a previously optimized graph when one matches this model
+            session_path, session_options, cache_metadata = self._prepare_session(model_path)
+            
+            # Session creation includes graph optimization, so keep it off the event loop
+            load_start = time.perf_counter()
+            self.session = await self.executor.run(
+                ort.InferenceSession, session_path, sess_options=session_options, providers=providers
+            )
+            self.load_time = time.perf_counter() - load_start
+            
+            if cache_metadata is not None:
+                self._write_optimized_model_metadata(cache_metadata)
             
             # Get input/output names
             self.input_name = self.session.get_inputs()[0].name
             self.output_name = self.session.get_outputs()[0].name
             
+            # Batching needs a dynamic leading dimension on the model input
+            batch_dim = self.session.get_inputs()[0].shape[0]
+            if settings.inference_batching_enabled:
+                if isinstance(batch_dim, int):
+                    logger.warning(
+                        f"Model input has fixed batch dimension {batch_dim}; inference batching disabled"
+                    )
+                else:
+                    self.batch_scheduler = BatchScheduler(
+                        lambda batch: self.executor.run(self.run_batch, batch),
+                        max_batch_size=settings.inference_max_batch_size,
+                        max_wait_ms=settings.inference_max_wait_ms,
+                    )
+                    logger.info(
+                        f"Inference batching enabled (max_batch_size={settings.inference_max_batch_size}, "
+                        f"max_wait_ms={settings.inference_max_wait_ms})"
+                    )
+            
             self.model_loaded = True
-            logger.info(f"ONNX model loaded successfully from {model_path}")
+            logger.info(f"ONNX model loaded successfully from {model_path} in {self.load_time:.3f}s")
             logger.info(f"Input name: {self.input_name}, Output name: {self.output_name}")
             logger.info(f"Providers: {self.session.get_providers()}")
             
@@ -85,46 +162,147 @@ class ModelService:
             logger.error(f"Failed to load ONNX model: {e}")
             return False
     
+    def _build_session_options(self) -> "ort.SessionOptions":
+        """Build ONNX Runtime session options from settings."""
+        options = ort.SessionOptions()
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[settings.ort_graph_optimization_level]
+        )
+        options.execution_mode = getattr(ort.ExecutionMode, EXECUTION_MODES[settings.ort_execution_mode])
+        if settings.ort_intra_op_num_threads > 0:
+            options.intra_op_num_threads = settings.ort_intra_op_num_threads
+        if settings.ort_inter_op_num_threads > 0:
+            options.inter_op_num_threads = settings.ort_inter_op_num_threads
+        options.enable_cpu_mem_arena = settings.ort_enable_cpu_mem_arena
+        options.enable_mem_pattern = settings.ort_enable_mem_pattern
+        return options
+    
+    def _optimized_model_signature(self, model_path: str) -> Dict[str, Any]:
+        """Describe the inputs that an optimized model file depends on."""
+        stat = os.stat(model_path)
+        return {
+            'source_path': os.path.abspath(model_path),
+            'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime,
+            'ort_version': ort.__version__,
+            'graph_optimization_level': settings.ort_graph_optimization_level,
+        }
+    
+    def _prepare_session(self, model_path: str) -> Tuple[str, "ort.SessionOptions", Optional[Dict[str, Any]]]:
+        """
+        Decide which model file to load and with which options.
+        
+        Returns:
+            Tuple of (path to load, session options, cache metadata to write
+            once the session has been created or None)
+        """
+        options = self._build_session_options()
+        optimized_path = settings.ort_optimized_model_path
+        if not optimized_path:
+            return model_path, options, None
+        
+        signature = self._optimized_model_signature(model_path)
+        metadata_path = f"{optimized_path}.json"
+        
+        if os.path.exists(optimized_path) and os.path.exists(metadata_path):
+            try:
+                with open(metadata_path, 'r') as f:
+                    cached = json.load(f)
+                if cached == signature:
+                    # Graph is already optimized; skip the optimizer on this startup
+                    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                    logger.info(f"Using cached optimized model: {optimized_path}")
+                    return optimized_path, options, None
+                logger.info("Cached optimized model is stale; re-optimizing")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read optimized model metadata {metadata_path}: {e}")
+        
+        # Ask ORT to serialize the optimized graph while building this session
+        directory = os.path.dirname(optimized_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        options.optimized_model_filepath = optimized_path
+        return model_path, options, signature
+    
+    def _write_optimized_model_metadata(self, signature: Dict[str, Any]) -> None:
+        """Record which source model the cached optimized model was built from."""
+        optimized_path = settings.ort_optimized_model_path
+        if not os.path.exists(optimized_path):
+            logger.warning(f"ONNX Runtime did not write optimized model to {optimized_path}")
+            return
+        try:
+            with open(f"{optimized_path}.json", 'w') as f:
+                json.dump(signature, f)
+            logger.info(f"Saved optimized model to {optimized_path}")
+        except OSError as e:
+            logger.warning(f"Could not write optimized model metadata: {e}")
+    
     def is_loaded(self) -> bool:
         """Check if model is loaded."""
         return self.model_loaded and self.session is not None
     
+    def is_ready(self) -> bool:
+        """Check if model is loaded and warmed up for traffic."""
+        return self.is_loaded() and self.ready
+    
+    async def warmup(self, iterations: int = 3) -> Dict[str, Any]:
+        """
+        Run synthetic inferences so the first real request does not pay for
+        arena allocation and kernel selection.
+        
+        Args:
+            iterations: Number of single-image warm-up runs
+            
+        Returns:
+            Dictionary with the cold-start to warm latency distribution
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Model must be loaded before warm-up")
+        
+        size = settings.model_input_size
+        rng = np.random.default_rng(0)
+        sample = rng.standard_normal((1, size, size, 3), dtype=np.float32)
+        
+        latencies = []
+        for _ in range(max(1, iterations)):
+            start = time.perf_counter()
+            await self.executor.run(self.run_batch, sample)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+        
+        # Also exercise the largest batch shape the scheduler can produce
+        batch_latency = None
+        if self.batch_scheduler is not None:
+            batch = np.repeat(sample, self.batch_scheduler.max_batch_size, axis=0)
+            start = time.perf_counter()
+            await self.executor.run(self.run_batch, batch)
+            batch_latency = (time.perf_counter() - start) * 1000.0
+        
+        warm = latencies[1:] or latencies
+        self.warmup_stats = {
+            'iterations': len(latencies),
+            'load_time_ms': self.load_time * 1000.0 if self.load_time is not None else None,
+            'latencies_ms': [round(latency, 3) for latency in latencies],
+            'cold_ms': round(latencies[0], 3),
+            'warm_median_ms': round(statistics.median(warm), 3),
+            'warm_max_ms': round(max(warm), 3),
+            'max_batch_ms': round(batch_latency, 3) if batch_latency is not None else None,
+        }
+        self.ready = True
+        
+        logger.info(f"Model warm-up complete: {self.warmup_stats}")
+        return self.warmup_stats
+    
+    async def shutdown(self) -> None:
+        """Stop the batch scheduler and executor pool."""
+        self.ready = False
+        if self.batch_scheduler is not None:
+            await self.batch_scheduler.stop()
+        self.executor.shutdown(wait=False)
+    
     def preprocess_image(self, image: Image.Image) -> np.ndarray:
-        """Preprocess image for model inference."""
+        """Preprocess image into a freshly allocated [1, H, W, 3] tensor (HWC for covid19_resnet)."""
         try:
-            # Resize to model input size
-            target_size = (settings.model_input_size, settings.model_input_size)
-            image = image.resize(target_size, Image.Resampling.LANCZOS)
-            
-            # Convert to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convert to numpy array
-            img_array = np.array(image, dtype=np.float32)
-            
-            # Normalize to [0, 1]
-            img_array = img_array / 255.0
-            
-            # Standard ImageNet normalization for ResNet models
-            mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-            std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-            img_array = (img_array - mean) / std
-            
-            # Add batch dimension - keep HWC format for covid19_resnet model
-            # Input shape: [1, height, width, channels] = [1, 256, 256, 3]
-            img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
-            
-            # Ensure float32 dtype and correct shape
-            img_array = img_array.astype(np.float32)
-            
-            # Verify shape matches expected input: [1, 256, 256, 3]
-            expected_shape = (1, settings.model_input_size, settings.model_input_size, 3)
-            if img_array.shape != expected_shape:
-                logger.warning(f"Input shape {img_array.shape} doesn't match expected {expected_shape}")
-            
-            return img_array
-            
+            return self.preprocessor.preprocess(image)
         except Exception as e:
             logger.error(f"Error in image preprocessing: {e}")
             raise
@@ -163,23 +341,101 @@ class ModelService:
             logger.error(f"Error in output postprocessing: {e}")
             raise
     
+    def run_batch(self, input_array: np.ndarray) -> np.ndarray:
+        """Run the session on a ``[N, H, W, C]`` batch and return the ``[N, classes]`` output."""
+        return self.session.run([self.output_name], {self.input_name: input_array})[0]
+    
+    def _load_image(self, source: Union[bytes, Image.Image]) -> Image.Image:
+        """Return the source image, decoding encoded bytes first."""
+        if isinstance(source, Image.Image):
+            return source
+        return self.preprocessor.decode(source)
+    
+    @staticmethod
+    def _original_size(image: Image.Image) -> List[int]:
+        """Get the image size before any reduced-size decoding."""
+        return list(image.info.get('original_size', image.size))
+    
+    def _preprocess_source(self, source: Union[bytes, Image.Image]) -> Tuple[np.ndarray, List[int]]:
+        """Decode and preprocess into a new tensor; executed in the inference pool."""
+        image = self._load_image(source)
+        return self.preprocess_image(image), self._original_size(image)
+    
+    def _preprocess_and_run(self, source: Union[bytes, Image.Image]) -> Tuple[np.ndarray, List[int]]:
+        """Decode, preprocess and run a single image; executed in the inference pool."""
+        image = self._load_image(source)
+        # The per-thread buffer is safe here because session.run consumes it before returning
+        output = self.run_batch(self.preprocessor.preprocess_reusable(image))
+        return output, self._original_size(image)
+    
     async def predict_from_image(self, image: Image.Image) -> Optional[Dict[str, Any]]:
-        """Predict pneumonia from PIL Image."""
+        """
+        Predict pneumonia from PIL Image.
+        
+        Raises:
+            InferenceSaturatedError: If the inference pool has no free slots
+        """
+        return await self._predict(image)
+    
+    async def predict_from_bytes(self, content: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Predict pneumonia from encoded image bytes (JPEG, PNG).
+        
+        Decoding happens in the inference pool, at reduced size for JPEGs
+        when PREPROCESS_FAST_DECODE is enabled.
+        
+        Raises:
+            InferenceSaturatedError: If the inference pool has no free slots
+        """
+        if self.result_cache is None or not self.is_loaded():
+            return await self._predict(content)
+        
+        start_time = time.time()
+        content_hash = await self.executor.run(self._content_hash, content)
+        key = self.result_cache.make_key(content_hash, self.model_version, self.preprocessor.signature)
+        
+        # Identical image under the same model and preprocessing: skip decode and inference
+        cached = await self.result_cache.get(key)
+        if cached is not None:
+            cached['inference_time'] = time.time() - start_time
+            cached['cache_hit'] = True
+            cached['content_hash'] = content_hash
+            logger.info(f"Prediction cache hit: {cached['prediction']} (confidence: {cached['confidence']:.4f})")
+            return cached
+        
+        result = await self._predict(content)
+        if result is not None:
+            await self.result_cache.set(key, result)
+            result['cache_hit'] = False
+            result['content_hash'] = content_hash
+        return result
+    
+    @staticmethod
+    def _content_hash(content: bytes) -> str:
+        """SHA-256 of the upload, matching FileHandler's file_hash."""
+        return hashlib.sha256(content).hexdigest()
+    
+    async def _predict(self, source: Union[bytes, Image.Image]) -> Optional[Dict[str, Any]]:
+        """Run the full prediction pipeline for an image or encoded bytes."""
         if not self.is_loaded():
             logger.error("Model not loaded")
             return None
         
         try:
-            start_time = time.time()
-            
-            # Preprocess image
-            input_array = self.preprocess_image(image)
-            
-            # Run inference
-            output = self.session.run([self.output_name], {self.input_name: input_array})
+            async with self.executor.admit():
+                start_time = time.time()
+                
+                # Decode/preprocess and run inference in the executor pool,
+                # sharing a batch with concurrent requests when enabled
+                if self.batch_scheduler is not None:
+                    input_array, image_size = await self.executor.run(self._preprocess_source, source)
+                    output = await self.batch_scheduler.submit(input_array)
+                else:
+                    output, image_size = await self.executor.run(self._preprocess_and_run, source)
             
             # Postprocess output
-            result = self.postprocess_output(output[0])
+            result = self.postprocess_output(output)
+            result['image_size'] = image_size
             
             # Add inference time
             inference_time = time.time() - start_time
@@ -189,6 +445,8 @@ class ModelService:
             
             return result
             
+        except InferenceSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"Error during prediction: {e}")
             return None
@@ -196,10 +454,13 @@ class ModelService:
     async def predict_from_file(self, file_path: str) -> Optional[Dict[str, Any]]:
         """Predict pneumonia from image file."""
         try:
-            # Load and validate image
-            image = Image.open(file_path)
-            return await self.predict_from_image(image)
+            # Load encoded image; decoding happens in the inference pool
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            return await self.predict_from_bytes(content)
             
+        except InferenceSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"Error loading image from file {file_path}: {e}")
             return None
@@ -209,10 +470,11 @@ class ModelService:
         try:
             # Decode base64
             image_data = base64.b64decode(base64_data)
-            image = Image.open(io.BytesIO(image_data))
             
-            return await self.predict_from_image(image)
+            return await self.predict_from_bytes(image_data)
             
+        except InferenceSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"Error processing base64 image: {e}")
             return None
@@ -221,18 +483,48 @@ class ModelService:
         """Get model information."""
         return {
             'loaded': self.is_loaded(),
+            'ready': self.is_ready(),
             'config': self.model_config,
             'class_names': self.class_names,
             'input_size': settings.model_input_size,
+            'preprocess_backend': self.preprocessor.backend,
+            'resize_filter': self.preprocessor.resize_filter,
+            'fast_decode': self.preprocessor.fast_decode,
             'confidence_threshold': settings.confidence_threshold,
-            'providers': self.session.get_providers() if self.session else None
+            'providers': self.session.get_providers() if self.session else None,
+            'session_options': {
+                'graph_optimization_level': settings.ort_graph_optimization_level,
+                'intra_op_num_threads': settings.ort_intra_op_num_threads,
+                'inter_op_num_threads': settings.ort_inter_op_num_threads,
+                'execution_mode': settings.ort_execution_mode,
+                'optimized_model_path': settings.ort_optimized_model_path
+            },
+            'batching': self.get_batching_metrics(),
+            'executor': self.executor.get_metrics(),
+            'warmup': self.warmup_stats,
+            'model_version': self.model_version,
+            'result_cache': self.get_cache_metrics()
         }
+    
+    def get_batching_metrics(self) -> Dict[str, Any]:
+        """Get batching scheduler metrics."""
+        if self.batch_scheduler is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.batch_scheduler.get_metrics()}
+
+    
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """Get prediction result cache metrics."""
+        if self.result_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.result_cache.get_metrics()}
 
 
-if __name__ == "__main__":
-    import asyncio
-    from app.core.config import settings
+# Global model service instance
+model_service = ModelService()
 
+
+if __name__ == "__main__":
     async def main():
         model_service = ModelService()
         success = await model_service.load_model()
@@ -0,0 +1,177 @@
+"""
+Image preprocessing engine for ONNX inference
+"""
+import io
+import logging
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+# Standard ImageNet normalization for ResNet models
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+PREPROCESS_BACKENDS = ("pil", "opencv")
+
+# Resize filters by name, as (PIL resampling filter, OpenCV interpolation flag name)
+RESIZE_FILTERS = {
+    "nearest": (Image.Resampling.NEAREST, "INTER_NEAREST"),
+    "bilinear": (Image.Resampling.BILINEAR, "INTER_LINEAR"),
+    "bicubic": (Image.Resampling.BICUBIC, "INTER_CUBIC"),
+    "lanczos": (Image.Resampling.LANCZOS, "INTER_LANCZOS4"),
+    "area": (Image.Resampling.BOX, "INTER_AREA"),
+}
+
+
+class ImagePreprocessor:
+    """
+    Resize and normalize images into ``[N, H, W, 3]`` float32 tensors.
+
+    ``(x / 255 - mean) / std`` is folded into one per-channel ``x * scale + bias``
+    that is written straight into the output buffer, so the only full-size
+    temporaries are the resized uint8 pixels and the float32 result.
+    Grayscale images are broadcast to three channels during normalization
+    instead of being converted to RGB first.
+
+    With ``fast_decode`` enabled, ``decode()`` asks the JPEG decoder to scale
+    in the DCT domain (PIL ``draft()``) so a 4096 px X-ray is decoded at
+    roughly 1/2, 1/4 or 1/8 size, never below the model input size. Other
+    formats such as PNG are decoded at full size.
+    """
+
+    def __init__(
+        self,
+        input_size: int,
+        mean: Sequence[float] = IMAGENET_MEAN,
+        std: Sequence[float] = IMAGENET_STD,
+        backend: str = "pil",
+        resize_filter: str = "lanczos",
+        fast_decode: bool = False,
+    ):
+        if backend not in PREPROCESS_BACKENDS:
+            raise ValueError(f"Unknown preprocessing backend: {backend}")
+        if resize_filter not in RESIZE_FILTERS:
+            raise ValueError(f"Unknown resize filter: {resize_filter}")
+        if backend == "opencv" and not CV2_AVAILABLE:
+            logger.warning("OpenCV not available, falling back to PIL preprocessing")
+            backend = "pil"
+
+        self.input_size = input_size
+        self.backend = backend
+        self.resize_filter = resize_filter
+        self.fast_decode = fast_decode
+        self._pil_filter = RESIZE_FILTERS[resize_filter][0]
+        self._cv2_interpolation = getattr(cv2, RESIZE_FILTERS[resize_filter][1]) if backend == "opencv" else None
+
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+        self.scale = (1.0 / (255.0 * std)).astype(np.float32)
+        self.bias = (-mean / std).astype(np.float32)
+
+        self._local = threading.local()
+
+    @property
+    def shape(self) -> tuple:
+        """Shape of a single preprocessed image without the batch dimension."""
+        return (self.input_size, self.input_size, 3)
+
+    @property
+    def signature(self) -> str:
+        """Identifier of everything that affects the produced tensor, for cache keys."""
+        decode = "fast" if self.fast_decode else "full"
+        return f"{self.backend}-{self.resize_filter}-{self.input_size}-{decode}"
+
+    def decode(self, content: bytes) -> Image.Image:
+        """
+        Open encoded image bytes, decoding JPEGs at reduced size when enabled.
+
+        The original ``(width, height)`` is kept in ``image.info["original_size"]``
+        because ``draft()`` changes ``image.size``.
+        """
+        image = Image.open(io.BytesIO(content))
+        image.info["original_size"] = image.size
+
+        if self.fast_decode and image.format == "JPEG":
+            mode = image.mode if image.mode in ("L", "RGB") else "RGB"
+            image.draft(mode, (self.input_size, self.input_size))
+
+        return image
+
+    def _resize(self, image: Image.Image) -> np.ndarray:
+        """Resize to the model input size, returning uint8 pixels as ``H x W`` or ``H x W x 3``."""
+        target_size = (self.input_size, self.input_size)
+
+        if self.backend == "opencv":
+            if image.mode not in ("L", "RGB"):
+                image = image.convert("RGB")
+            pixels = np.asarray(image)
+            return cv2.resize(pixels, target_size, interpolation=self._cv2_interpolation)
+
+        image = image.resize(target_size, self._pil_filter)
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        return np.asarray(image)
+
+    def preprocess_into(self, image: Image.Image, out: np.ndarray) -> np.ndarray:
+        """
+        Preprocess one image into ``out``, an ``H x W x 3`` float32 view.
+
+        Returns:
+            ``out`` for convenience
+        """
+        pixels = self._resize(image)
+        if pixels.ndim == 2:
+            pixels = pixels[:, :, np.newaxis]
+
+        np.multiply(pixels, self.scale, out=out, casting="unsafe")
+        np.add(out, self.bias, out=out)
+        return out
+
+    def preprocess(self, image: Image.Image, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Preprocess one image into a ``[1, H, W, 3]`` tensor.
+
+        Args:
+            image: PIL image in any mode
+            out: Optional preallocated ``[1, H, W, 3]`` float32 array to fill
+
+        Returns:
+            The filled tensor
+        """
+        if out is None:
+            out = np.empty((1,) + self.shape, dtype=np.float32)
+        self.preprocess_into(image, out[0])
+        return out
+
+    def preprocess_batch(self, images: Sequence[Image.Image], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Preprocess several images into one ``[N, H, W, 3]`` tensor."""
+        if out is None:
+            out = np.empty((len(images),) + self.shape, dtype=np.float32)
+        for index, image in enumerate(images):
+            self.preprocess_into(image, out[index])
+        return out[:len(images)]
+
+    def preprocess_reusable(self, image: Image.Image) -> np.ndarray:
+        """
+        Preprocess into a per-thread buffer that is reused on every call.
+
+        The returned array is only valid until the next call from the same
+        thread, so it must be consumed (e.g. passed to ``session.run``)
+        before the thread preprocesses another image.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = np.empty((1,) + self.shape, dtype=np.float32)
+            self._local.buffer = buffer
+        return self.preprocess(image, out=buffer)
@@ -0,0 +1,132 @@
+"""
+Content-addressed cache for prediction results
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Result fields worth caching; timings are per request
+CACHED_FIELDS = ('prediction', 'confidence', 'probabilities', 'image_size')
+
+
+class PredictionResultCache:
+    """
+    Two-tier cache of inference results keyed by image hash, model version
+    and preprocessing configuration.
+
+    The in-process tier is an LRU bounded by ``max_entries`` with per-entry
+    TTL. The optional Redis tier shares results across workers; Redis errors
+    are logged and treated as misses so they never fail a prediction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: int = 3600,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "prediction-cache",
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        self._redis = None
+        if redis_url:
+            if REDIS_AVAILABLE:
+                self._redis = aioredis.from_url(redis_url)
+            else:
+                logger.warning("redis package not installed; prediction cache is in-process only")
+
+        # Metrics
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.redis_errors = 0
+
+    def make_key(self, content_hash: str, model_version: str, preprocess_signature: str) -> str:
+        """Build the cache key for an image under a model/preprocessing configuration."""
+        return f"{self.key_prefix}:{model_version}:{preprocess_signature}:{content_hash}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached result, checking the local tier before Redis."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return dict(result)
+            del self._entries[key]
+            self.expirations += 1
+
+        if self._redis is not None:
+            try:
+                payload = await self._redis.get(key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Prediction cache Redis lookup failed: {e}")
+                payload = None
+            if payload is not None:
+                result = json.loads(payload)
+                self._store_local(key, result)
+                self.redis_hits += 1
+                return dict(result)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store the cacheable part of a prediction result in both tiers."""
+        cached = {field: result.get(field) for field in CACHED_FIELDS}
+        self._store_local(key, cached)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, json.dumps(cached), ex=self.ttl_seconds)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Prediction cache Redis store failed: {e}")
+
+    def _store_local(self, key: str, result: Dict[str, Any]) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries from the local tier."""
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit ratio and size metrics."""
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'redis_enabled': self._redis is not None,
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'redis_errors': self.redis_errors,
+        }
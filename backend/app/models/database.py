@@ -1,9 +1,12 @@
 """
 Database models for pneumonia detection system
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, Text, Boolean, ForeignKey, JSON, Index,
+    LargeBinary, UniqueConstraint, DDL, event, literal
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from datetime import datetime
 
@@ -30,6 +33,41 @@ class Patient(Base):
     
     # Relationships
     predictions = relationship("Prediction", back_populates="patient")
+    
+    __table_args__ = (
+        Index("ix_patients_created_at_id", "created_at", "id"),
+    )
+
+def patient_search_document():
+    """
+    Lower-cased names, patient ID and medical record number joined by spaces
+
+    The separators are rendered inline rather than as bound parameters so
+    queries repeat the indexed expression exactly, which PostgreSQL needs
+    to use the trigram index.
+    """
+    columns = Patient.__table__.c
+    empty = literal("", String, literal_execute=True)
+    space = literal(" ", String, literal_execute=True)
+    return func.lower(
+        func.coalesce(columns.first_name, empty) + space
+        + func.coalesce(columns.last_name, empty) + space
+        + func.coalesce(columns.patient_id, empty) + space
+        + func.coalesce(columns.medical_record_number, empty)
+    )
+
+# Trigram index for substring and prefix search (PostgreSQL only)
+Index(
+    "ix_patients_search_trgm",
+    patient_search_document().label("search_document"),
+    postgresql_using="gin",
+    postgresql_ops={"search_document": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+event.listen(
+    Patient.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
 
 class Prediction(Base):
     """Prediction model"""
@@ -53,6 +91,65 @@ class Prediction(Base):
     
     # Relationships
     patient = relationship("Patient", back_populates="predictions")
+    
+    # Newest-first (keyset) listings, per-type counts over a time range, patient history
+    __table_args__ = (
+        Index("ix_predictions_created_at_id", "created_at", "id"),
+        Index("ix_predictions_prediction_created_at", "prediction", "created_at"),
+        Index("ix_predictions_patient_id_created_at", "patient_id", "created_at"),
+    )
+
+class PredictionJob(Base):
+    """Queued asynchronous prediction request"""
+    __tablename__ = "prediction_jobs"
+    
+    id = Column(String(36), primary_key=True, index=True)  # UUID
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, completed, failed
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
+    image_filename = Column(String(255), nullable=False)
+    original_filename = Column(String(255))
+    image_path = Column(String(500), nullable=False)
+    image_data = deferred(Column(LargeBinary))  # Uploaded image until the job finishes; workers may run on other hosts
+    clinical_notes = Column(Text)
+    prediction_id = Column(String(36), ForeignKey("predictions.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String(100))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    
+    # Relationships
+    prediction = relationship("Prediction")
+
+class ExportJob(Base):
+    """Queued data export and the artifact it produced"""
+    __tablename__ = "export_jobs"
+    
+    id = Column(String(36), primary_key=True, index=True)  # UUID
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, completed, failed, expired
+    export_type = Column(String(30), nullable=False)  # patients_csv, predictions_excel, ...
+    parameters = Column(JSON)  # {start_date, end_date}
+    compress = Column(Boolean, default=False)
+    request_key = Column(String(64), nullable=False)  # Hash of type, parameters and data versions
+    filename = Column(String(255))
+    file_path = Column(String(500))
+    media_type = Column(String(100))
+    file_size = Column(Integer)
+    record_count = Column(Integer)
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String(100))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
+    
+    # Dedupe lookups and artifact garbage collection
+    __table_args__ = (
+        Index("ix_export_jobs_request_key_created_at", "request_key", "created_at"),
+        Index("ix_export_jobs_expires_at", "expires_at"),
+    )
 
 class AuditLog(Base):
     """Audit log for tracking user actions"""
@@ -67,13 +164,20 @@ class AuditLog(Base):
     ip_address = Column(String(45))
     user_agent = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Time-range listings and retention cleanup, optionally narrowed by user or action
+    __table_args__ = (
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_audit_logs_action_type_timestamp", "action_type", "timestamp"),
+    )
 
 class SystemStats(Base):
     """System statistics for dashboard"""
     __tablename__ = "system_stats"
     
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(DateTime(timezone=True), nullable=False)
+    date = Column(DateTime(timezone=True), nullable=False, index=True)
     total_patients = Column(Integer, default=0)
     total_predictions = Column(Integer, default=0)
     predictions_today = Column(Integer, default=0)
@@ -96,4 +200,31 @@ class WeeklyStats(Base):
     pneumonia_detected = Column(Integer, default=0)
     normal_cases = Column(Integer, default=0)
     unique_patients = Column(Integer, default=0)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PredictionRollup(Base):
+    """Prediction counters per day and per week, updated with every prediction write"""
+    __tablename__ = "prediction_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String(10), nullable=False)  # day, week (weeks start on Monday)
+    period_start = Column(Date, nullable=False)
+    predictions_count = Column(Integer, nullable=False, default=0)
+    pneumonia_count = Column(Integer, nullable=False, default=0)
+    normal_count = Column(Integer, nullable=False, default=0)
+    reviewed_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    patients_sketch = Column(LargeBinary)  # HyperLogLog of patient ids
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("period", "period_start", name="uq_prediction_rollups_period_start"),
+    )
+
+class DataVersion(Base):
+    """Write counter per data set, bumped in the same transaction as each write"""
+    __tablename__ = "data_versions"
+    
+    name = Column(String(50), primary_key=True)  # predictions, patients, system_stats
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
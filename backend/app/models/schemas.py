@@ -74,6 +74,17 @@ class PatientResponse(PatientBase):
     class Config:
         from_attributes = True
 
+class PatientSuggestion(BaseModel):
+    """Typeahead suggestion for a patient"""
+    id: int
+    patient_id: str
+    first_name: str
+    last_name: str
+    medical_record_number: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 # Prediction schemas
 class PredictionBase(BaseModel):
     clinical_notes: Optional[str] = None
@@ -103,6 +114,30 @@ class PredictionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PredictionJobStatusEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class PredictionJobResponse(BaseModel):
+    id: str
+    status: PredictionJobStatusEnum
+    patient_id: Optional[int] = None
+    original_filename: Optional[str] = None
+    prediction_id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    # Populated once the job has completed
+    prediction: Optional[PredictionResponse] = None
+    
+    class Config:
+        from_attributes = True
+
 # Statistics schemas
 class OverviewStats(BaseModel):
     total_patients: int
@@ -194,6 +229,52 @@ class ExportResponse(BaseModel):
     record_count: int
     created_at: datetime
 
+class ExportDatasetEnum(str, Enum):
+    patients = "patients"
+    predictions = "predictions"
+
+class ExportFormatEnum(str, Enum):
+    csv = "csv"
+    excel = "excel"
+
+class ExportJobStatusEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+    expired = "expired"
+
+class ExportJobCreate(BaseModel):
+    dataset: ExportDatasetEnum
+    format: ExportFormatEnum = ExportFormatEnum.csv
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    compress: bool = Field(False, description="gzip the artifact (CSV only; Excel files are already compressed)")
+
+class ExportJobResponse(BaseModel):
+    id: str
+    status: ExportJobStatusEnum
+    export_type: str
+    parameters: Optional[Dict[str, Any]] = None
+    compress: bool = False
+    filename: Optional[str] = None
+    file_size: Optional[int] = None
+    record_count: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    
+    # Set once the artifact can be downloaded
+    download_url: Optional[str] = None
+    # True when an identical recent request's job was returned instead of a new one
+    deduplicated: bool = False
+    
+    class Config:
+        from_attributes = True
+
 # Response wrappers
 class APIResponse(BaseModel):
     message: str
@@ -207,6 +288,23 @@ class PaginatedResponse(BaseModel, Generic[T]):
     size: int
     pages: int
 
+class PaginationModeEnum(str, Enum):
+    OFFSET = "offset"
+    CURSOR = "cursor"
+
+class TotalModeEnum(str, Enum):
+    NONE = "none"
+    ESTIMATE = "estimate"
+    EXACT = "exact"
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    size: int
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+    has_more: bool
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
 class ErrorResponse(BaseModel):
     message: str
     status: str = "error"
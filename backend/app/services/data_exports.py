@@ -0,0 +1,507 @@
+"""
+Streaming data exports
+
+Exports select only the columns they write and read them from a
+server-side cursor in batches of ``EXPORT_BATCH_SIZE`` rows, so memory
+stays constant however many rows are exported. Each batch is encoded and
+handed to the client before the next one is fetched.
+
+The generators open their own connection: a ``StreamingResponse`` body is
+produced after the endpoint has returned, when its request-scoped session
+is already closed. The connection is held until the download completes.
+
+Excel files cannot be sent before they are complete, so they are written
+row by row with openpyxl's write-only workbook (run it in a worker
+thread) to a temporary file that is then streamed from disk.
+
+Parquet and Arrow IPC exports of predictions keep column types for
+analytics pipelines. Each cursor batch becomes one Parquet row group or
+Arrow record batch and is sent as soon as it is encoded.
+"""
+import asyncio
+import csv
+import gzip
+import io
+import os
+import tempfile
+from datetime import datetime
+from typing import (
+    AsyncIterator, BinaryIO, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO
+)
+
+from sqlalchemy import Select, select
+
+from app.core.config import settings
+from app.core.database import async_engine, engine
+from app.models.database import Patient, Prediction
+from app.models.schemas import PredictionEnum
+from app.services.response_cache import PATIENTS_TAG, PREDICTIONS_TAG
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Rows inspected to size the Excel columns; write-only sheets need widths before any row
+EXCEL_WIDTH_SAMPLE_ROWS = 500
+EXCEL_MAX_COLUMN_WIDTH = 50
+
+PATIENT_EXPORT_HEADERS = [
+    'ID', 'Patient ID', 'First Name', 'Last Name', 'Age', 'Gender',
+    'Phone', 'Email', 'Medical Record Number', 'Created At'
+]
+
+PREDICTION_EXPORT_HEADERS = [
+    'Prediction ID', 'Patient ID', 'Patient Name', 'Image Filename',
+    'Prediction', 'Confidence', 'Inference Time', 'Clinical Notes',
+    'Reviewed', 'Reviewed By', 'Created At'
+]
+
+
+def _isoformat(value: Optional[datetime]) -> str:
+    return value.isoformat() if value else ""
+
+
+def patient_export_statement(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Select:
+    """Patient export columns, optionally limited to a creation date range."""
+    query = select(
+        Patient.id,
+        Patient.patient_id,
+        Patient.first_name,
+        Patient.last_name,
+        Patient.age,
+        Patient.gender,
+        Patient.phone,
+        Patient.email,
+        Patient.medical_record_number,
+        Patient.created_at,
+    ).order_by(Patient.id)
+    if start_date:
+        query = query.where(Patient.created_at >= start_date)
+    if end_date:
+        query = query.where(Patient.created_at <= end_date)
+    return query
+
+
+def patient_export_row(row) -> List:
+    """Values for one row of ``patient_export_statement``."""
+    return [*row[:-1], _isoformat(row.created_at)]
+
+
+def prediction_export_statement(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Select:
+    """Prediction export columns with the patient's name, oldest first."""
+    query = select(
+        Prediction.id,
+        Prediction.patient_id,
+        Patient.first_name,
+        Patient.last_name,
+        Prediction.original_filename,
+        Prediction.prediction,
+        Prediction.confidence,
+        Prediction.inference_time,
+        Prediction.clinical_notes,
+        Prediction.reviewed,
+        Prediction.reviewed_by,
+        Prediction.created_at,
+    ).outerjoin(Patient, Prediction.patient_id == Patient.id).order_by(Prediction.created_at)
+    if start_date:
+        query = query.where(Prediction.created_at >= start_date)
+    if end_date:
+        query = query.where(Prediction.created_at <= end_date)
+    return query
+
+
+def prediction_export_row(row) -> List:
+    """Values for one row of ``prediction_export_statement``."""
+    patient_name = f"{row.first_name} {row.last_name}" if row.first_name is not None else ""
+    return [
+        row.id,
+        row.patient_id,
+        patient_name,
+        row.original_filename,
+        row.prediction,
+        row.confidence,
+        row.inference_time,
+        row.clinical_notes,
+        row.reviewed,
+        row.reviewed_by,
+        _isoformat(row.created_at),
+    ]
+
+
+class ExportDataset(NamedTuple):
+    """Rows, columns and data dependencies of an exportable data set"""
+    title: str
+    statement: Callable[[Optional[datetime], Optional[datetime]], Select]
+    headers: Sequence[str]
+    format_row: Callable[[Sequence], Sequence]
+    # Data versions the exported rows depend on
+    tags: Sequence[str]
+
+
+EXPORT_DATASETS = {
+    'patients': ExportDataset(
+        "Patients", patient_export_statement, PATIENT_EXPORT_HEADERS, patient_export_row, (PATIENTS_TAG,)
+    ),
+    'predictions': ExportDataset(
+        "Predictions", prediction_export_statement, PREDICTION_EXPORT_HEADERS, prediction_export_row,
+        (PREDICTIONS_TAG, PATIENTS_TAG)
+    ),
+}
+
+# File formats an export can be written to: (media type, file extension)
+EXPORT_FILE_FORMATS = {
+    'csv': ("text/csv", ".csv"),
+    'excel': (EXCEL_MEDIA_TYPE, ".xlsx"),
+}
+
+
+async def stream_rows(statement: Select, batch_size: Optional[int] = None) -> AsyncIterator[Sequence]:
+    """Yield batches of rows of ``statement`` from a server-side cursor."""
+    async with async_engine.connect() as connection:
+        result = await connection.stream(
+            statement.execution_options(yield_per=batch_size or settings.export_batch_size)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+
+async def csv_chunks(
+    headers: Sequence[str],
+    format_row: Callable[[Sequence], Sequence],
+    batches: AsyncIterator[Sequence]
+) -> AsyncIterator[str]:
+    """Encode the header and then each batch of rows as a chunk of CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield buffer.getvalue()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(format_row(row) for row in rows)
+        yield buffer.getvalue()
+
+
+def iter_rows(statement: Select, batch_size: Optional[int] = None) -> Iterator[Sequence]:
+    """Blocking variant of ``stream_rows`` on the sync engine, for worker threads."""
+    with engine.connect() as connection:
+        result = connection.execute(
+            statement.execution_options(yield_per=batch_size or settings.export_batch_size)
+        )
+        yield from result.partitions()
+
+
+def write_csv(
+    output: TextIO,
+    headers: Sequence[str],
+    format_row: Callable[[Sequence], Sequence],
+    batches: Iterable[Sequence]
+) -> int:
+    """Write the header and batches of rows to ``output``; returns the number of data rows."""
+    writer = csv.writer(output)
+    writer.writerow(headers)
+    count = 0
+    for rows in batches:
+        writer.writerows(format_row(row) for row in rows)
+        count += len(rows)
+    return count
+
+
+def _column_widths(headers: Sequence[str], sample: Sequence[Sequence]) -> List[int]:
+    """Widths fitting the header and the longest sampled value, capped."""
+    widths = []
+    for index, header in enumerate(headers):
+        longest = max([len(str(header))] + [len(str(row[index])) for row in sample if row[index] is not None])
+        widths.append(min(longest + 2, EXCEL_MAX_COLUMN_WIDTH))
+    return widths
+
+
+def write_excel(
+    output: BinaryIO,
+    title: str,
+    headers: Sequence[str],
+    format_row: Callable[[Sequence], Sequence],
+    batches: Iterable[Sequence]
+) -> int:
+    """
+    Write batches of rows to ``output`` as a single-sheet workbook.
+
+    Uses a write-only workbook, so rows are serialized as they are appended
+    instead of being kept as cell objects. Column widths are estimated
+    from the first ``EXCEL_WIDTH_SAMPLE_ROWS`` rows.
+
+    Returns:
+        Number of data rows written
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+
+    batches = iter(batches)
+    sample = []
+    for rows in batches:
+        sample.extend(format_row(row) for row in rows)
+        if len(sample) >= EXCEL_WIDTH_SAMPLE_ROWS:
+            break
+
+    for index, width in enumerate(_column_widths(headers, sample[:EXCEL_WIDTH_SAMPLE_ROWS]), 1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal="center")
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    for row in sample:
+        sheet.append(row)
+    count = len(sample)
+    for rows in batches:
+        for row in rows:
+            sheet.append(format_row(row))
+        count += len(rows)
+
+    workbook.save(output)
+    return count
+
+
+def build_excel_export(
+    title: str,
+    headers: Sequence[str],
+    format_row: Callable[[Sequence], Sequence],
+    statement: Select
+) -> str:
+    """
+    Write the rows of ``statement`` to a temporary .xlsx file and return its path.
+
+    Blocking; run in a worker thread. The caller deletes the file.
+    """
+    handle, path = tempfile.mkstemp(suffix=".xlsx", prefix="export_")
+    try:
+        with os.fdopen(handle, "wb") as output:
+            write_excel(output, title, headers, format_row, iter_rows(statement))
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def write_export_file(
+    path: str,
+    dataset: str,
+    export_format: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    compress: bool = False
+) -> int:
+    """
+    Write a complete export of ``dataset`` to ``path``.
+
+    Blocking; run in a worker thread. ``compress`` gzips CSV output; other
+    formats are already compressed and ignore it.
+
+    Returns:
+        Number of data rows written
+    """
+    definition = EXPORT_DATASETS[dataset]
+    batches = iter_rows(definition.statement(start_date, end_date))
+    if export_format == "csv":
+        opener = gzip.open if compress else open
+        with opener(path, "wt", newline="", encoding="utf-8") as output:
+            return write_csv(output, definition.headers, definition.format_row, batches)
+    if export_format == "excel":
+        with open(path, "wb") as output:
+            return write_excel(output, definition.title, definition.headers, definition.format_row, batches)
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+
+# Columnar prediction exports
+
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def prediction_columnar_statement(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Select:
+    """
+    Prediction columns for typed exports, oldest first.
+
+    ``since`` is exclusive and ``until`` inclusive, so consecutive
+    incremental exports that pass the previous ``until`` as ``since``
+    neither skip nor repeat predictions.
+    """
+    query = select(
+        Prediction.id,
+        Prediction.patient_id,
+        Prediction.original_filename,
+        Prediction.prediction,
+        Prediction.confidence,
+        Prediction.confidence_scores,
+        Prediction.inference_time,
+        Prediction.image_size,
+        Prediction.reviewed,
+        Prediction.reviewed_by,
+        Prediction.reviewed_at,
+        Prediction.created_at,
+    ).order_by(Prediction.created_at, Prediction.id)
+    if start_date:
+        query = query.where(Prediction.created_at >= start_date)
+    if end_date:
+        query = query.where(Prediction.created_at <= end_date)
+    if since:
+        query = query.where(Prediction.created_at > since)
+    if until:
+        query = query.where(Prediction.created_at <= until)
+    return query
+
+
+# confidence_scores keys, one typed column each
+SCORE_CLASSES = [member.value for member in PredictionEnum]
+
+
+def _score_column(class_name: str) -> str:
+    return f"confidence_{class_name.lower()}"
+
+
+def prediction_arrow_schema() -> "pa.Schema":
+    """Arrow schema of the columnar prediction export; class scores become one column each."""
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("id", pa.string()),
+        ("patient_id", pa.int64()),
+        ("original_filename", pa.string()),
+        ("prediction", pa.dictionary(pa.int8(), pa.string())),
+        ("confidence", pa.float64()),
+        *((_score_column(name), pa.float64()) for name in SCORE_CLASSES),
+        ("inference_time", pa.float64()),
+        ("image_width", pa.int32()),
+        ("image_height", pa.int32()),
+        ("reviewed", pa.bool_()),
+        ("reviewed_by", pa.string()),
+        ("reviewed_at", timestamp),
+        ("created_at", timestamp),
+    ])
+
+
+def prediction_record_batch(rows: Sequence, schema: "pa.Schema") -> "pa.RecordBatch":
+    """Convert rows of ``prediction_columnar_statement`` to a record batch."""
+    columns = {field: [] for field in schema.names}
+    score_columns = [(name, _score_column(name)) for name in SCORE_CLASSES]
+    for row in rows:
+        scores = row.confidence_scores or {}
+        image_size = row.image_size or (None, None)
+        columns["id"].append(row.id)
+        columns["patient_id"].append(row.patient_id)
+        columns["original_filename"].append(row.original_filename)
+        columns["prediction"].append(row.prediction)
+        columns["confidence"].append(row.confidence)
+        for name, column in score_columns:
+            columns[column].append(scores.get(name))
+        columns["inference_time"].append(row.inference_time)
+        columns["image_width"].append(image_size[0])
+        columns["image_height"].append(image_size[1])
+        columns["reviewed"].append(row.reviewed)
+        columns["reviewed_by"].append(row.reviewed_by)
+        columns["reviewed_at"].append(row.reviewed_at)
+        columns["created_at"].append(row.created_at)
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that collects written bytes until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Writers record file offsets, so this must count every byte written
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _encode_batch(writer, sink: _ChunkSink, rows: Sequence, schema: "pa.Schema") -> bytes:
+    """Convert and encode one batch, returning the bytes it produced; blocking."""
+    writer.write_batch(prediction_record_batch(rows, schema))
+    return sink.drain()
+
+
+async def columnar_chunks(
+    export_format: str,
+    batches: AsyncIterator[Sequence],
+    rows_per_batch: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Encode ``prediction_columnar_statement`` rows as Parquet (one row
+    group per ``rows_per_batch`` rows, default EXPORT_ROW_GROUP_SIZE) or an
+    Arrow IPC stream (one record batch per ``rows_per_batch`` rows),
+    yielding the bytes produced by each.
+
+    ``batches`` should be small fetch batches, so reading rows never holds
+    the event loop for long. Building and encoding a record batch is
+    CPU-bound and runs in a worker thread, one at a time, so the writer is
+    never used concurrently.
+    """
+    rows_per_batch = rows_per_batch or settings.export_row_group_size
+    schema = prediction_arrow_schema()
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    if export_format == "parquet":
+        writer = pq.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+    try:
+        pending: List = []
+        async for rows in batches:
+            pending.extend(rows)
+            while len(pending) >= rows_per_batch:
+                group, pending = pending[:rows_per_batch], pending[rows_per_batch:]
+                chunk = await asyncio.to_thread(_encode_batch, writer, sink, group, schema)
+                if chunk:
+                    yield chunk
+        if pending:
+            chunk = await asyncio.to_thread(_encode_batch, writer, sink, pending, schema)
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,100 @@
+"""
+Data versions and HTTP conditional requests
+
+Each data set (predictions, patients, system stats) has a counter in
+``data_versions`` that every write increments in its own transaction.
+Responses that depend on a data set carry an ETag derived from those
+counters, the request URL and the current UTC day (several figures are
+relative to today). A request whose ``If-None-Match`` still matches is
+answered with 304 after one primary-key lookup, before the endpoint runs
+its query or serializes anything.
+
+Writes that bypass the API (scripts editing the tables directly) must
+call ``bump_versions`` as well, or clients may keep a stale response.
+"""
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import get_async_db, insert_if_missing
+from app.models.database import DataVersion
+
+# Clients may store responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump_versions(session: Session, names: Sequence[str]) -> None:
+    """Increment data versions in the session's current transaction."""
+    table = DataVersion.__table__
+    dialect_name = session.get_bind().dialect.name
+    for name in sorted(set(names)):
+        increment = update(table).where(table.c.name == name).values(
+            version=table.c.version + 1, updated_at=func.now()
+        )
+        if session.execute(increment).rowcount:
+            continue
+        # First write to this data set; a concurrent first write may win the insert
+        inserted = session.execute(insert_if_missing(dialect_name, table, {'name': name, 'version': 1}, ["name"]))
+        if not inserted.rowcount:
+            session.execute(increment)
+
+
+async def bump_data_versions(db: AsyncSession, *names: str) -> None:
+    """Increment data versions in the async session's current transaction."""
+    await db.run_sync(bump_versions, names)
+
+
+async def get_versions(db: AsyncSession, names: Sequence[str]) -> Dict[str, int]:
+    """Current version of each data set; data sets never written are at 0."""
+    versions = dict((await db.execute(
+        select(DataVersion.name, DataVersion.version).where(DataVersion.name.in_(names))
+    )).all())
+    return {name: versions.get(name, 0) for name in names}
+
+
+async def get_etag(db: AsyncSession, request: Request, names: Sequence[str]) -> str:
+    """Weak ETag for the response to ``request`` given the current data versions."""
+    versions = await get_versions(db, names)
+    parts = [
+        request.url.path,
+        repr(sorted(request.query_params.multi_items())),
+        datetime.utcnow().date().isoformat(),
+    ] + [f"{name}={versions[name]}" for name in names]
+    return f'W/"{hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def conditional_request(*names: str):
+    """
+    Route dependency answering 304 Not Modified when ``If-None-Match`` matches.
+
+    Otherwise sets the ETag and Cache-Control headers on the response.
+    Last-Modified is not used: a timestamp with one-second resolution
+    cannot tell apart two writes within the same second.
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db)
+    ) -> str:
+        etag = await get_etag(db, request, names)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        return etag
+    return dependency
@@ -0,0 +1,415 @@
+"""
+Background export jobs
+
+Large exports run outside the request: a POST stores a queued job row and
+returns its id, a worker writes the artifact to ``settings.export_dir`` and
+the client downloads it through the job once it has completed. The
+directory is not served statically, so the job's status and expiry
+checks are the only way to an artifact. Requests for the same
+export while the underlying data is unchanged share one artifact, and
+artifacts are deleted once their retention period has passed.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import ExportJob
+from app.services.data_exports import EXPORT_DATASETS, EXPORT_FILE_FORMATS, write_export_file
+from app.services.data_versions import get_versions
+
+logger = logging.getLogger(__name__)
+
+# Directory where export artifacts are written; never under the served uploads directory
+EXPORTS_DIR = settings.export_dir
+
+# Job statuses
+EXPORT_QUEUED = "queued"
+EXPORT_RUNNING = "running"
+EXPORT_COMPLETED = "completed"
+EXPORT_FAILED = "failed"
+EXPORT_EXPIRED = "expired"
+# Jobs whose artifact exists or is being produced
+REUSABLE_STATUSES = (EXPORT_QUEUED, EXPORT_RUNNING, EXPORT_COMPLETED)
+
+GZIP_MEDIA_TYPE = "application/gzip"
+
+
+def export_request_key(export_type: str, parameters: Dict[str, Any], compress: bool, versions: Dict[str, int]) -> str:
+    """Hash identifying an export of specific data: equal keys produce identical artifacts."""
+    payload = json.dumps([export_type, parameters, compress, versions], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class ExportJobQueue:
+    """
+    Export job queue backed by the ``export_jobs`` table.
+
+    Workers claim the oldest queued row with ``SELECT ... FOR UPDATE SKIP
+    LOCKED`` and build the artifact in a worker thread, reading rows from
+    a server-side cursor, so memory stays bounded for any export size. The
+    artifact is written under a temporary name and renamed when complete,
+    so a download never sees a partial file. File names include the
+    attempt, so a worker still finishing a job that was requeued never
+    shares files with the worker that claimed it next; only the current
+    attempt may complete the job. Workers also requeue jobs whose lease
+    expired and garbage-collect expired artifacts.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._workers: List[asyncio.Task] = []
+        self._in_flight: Dict[str, str] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_maintenance: Optional[float] = None
+
+    # Submission
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        dataset: str,
+        export_format: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        compress: bool = False
+    ) -> Tuple[ExportJob, bool]:
+        """
+        Queue an export, or return a recent job for the same export of unchanged data.
+
+        Returns:
+            Tuple of (job, deduplicated)
+        """
+        export_type = f"{dataset}_{export_format}"
+        compress = compress and export_format == "csv"
+        parameters = {
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+        }
+        versions = await get_versions(db, EXPORT_DATASETS[dataset].tags)
+        request_key = export_request_key(export_type, parameters, compress, versions)
+
+        now = datetime.now(timezone.utc)
+        existing = await db.scalar(
+            select(ExportJob).where(
+                ExportJob.request_key == request_key,
+                ExportJob.status.in_(REUSABLE_STATUSES),
+                ExportJob.created_at >= now - timedelta(seconds=settings.export_job_dedupe_seconds),
+                or_(ExportJob.expires_at.is_(None), ExportJob.expires_at > now)
+            ).order_by(ExportJob.created_at.desc()).limit(1)
+        )
+        if existing is not None:
+            return existing, True
+
+        job = ExportJob(
+            id=str(uuid.uuid4()),
+            status=EXPORT_QUEUED,
+            export_type=export_type,
+            parameters=parameters,
+            compress=compress,
+            request_key=request_key,
+            attempts=0,
+            created_at=now
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job, False
+
+    def notify(self) -> None:
+        """Wake an idle worker in this process after a job has been committed."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # Worker lifecycle
+
+    def start(self, workers: int) -> None:
+        """Start ``workers`` worker tasks on the running event loop."""
+        if workers <= 0:
+            logger.info("Export job workers disabled on this instance")
+            return
+        os.makedirs(EXPORTS_DIR, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        for index in range(workers):
+            self._workers.append(asyncio.create_task(self._run_worker(index)))
+        logger.info(f"Started {workers} export job worker(s) as {self.worker_id}")
+
+    async def stop(self) -> None:
+        """Cancel workers and hand their in-flight jobs back to the queue."""
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers.clear()
+
+        if self._in_flight:
+            await asyncio.to_thread(self._requeue, list(self._in_flight.values()))
+            self._in_flight.clear()
+
+    async def _run_worker(self, index: int) -> None:
+        """Claim and process jobs until cancelled."""
+        name = f"{self.worker_id}-{index}"
+        while True:
+            try:
+                await self._maybe_maintain()
+                job = await asyncio.to_thread(self._claim_next, name)
+                if job is None:
+                    await self._wait_for_work()
+                    continue
+
+                self._in_flight[name] = job['id']
+                try:
+                    # A cancelled worker leaves the thread to finish; the job is requeued on stop
+                    await asyncio.to_thread(self._process, job)
+                finally:
+                    self._in_flight.pop(name, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Export job worker {name} error: {e}")
+                await asyncio.sleep(settings.export_job_poll_interval)
+
+    async def _wait_for_work(self) -> None:
+        """Sleep until a job is submitted in this process or the poll interval elapses."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.export_job_poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _maybe_maintain(self) -> None:
+        """Periodically requeue interrupted jobs and delete expired artifacts."""
+        now = asyncio.get_running_loop().time()
+        if self._last_maintenance is not None and now - self._last_maintenance < settings.export_gc_interval_seconds:
+            return
+        self._last_maintenance = now
+        recovered = await asyncio.to_thread(self.recover_interrupted_jobs)
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted export job(s)")
+        removed = await asyncio.to_thread(self.collect_expired_artifacts)
+        if removed:
+            logger.info(f"Removed {removed} expired export artifact(s)")
+
+    # Work and database operations (run in worker threads)
+
+    def _process(self, job: Dict[str, Any]) -> None:
+        """Write the artifact for a claimed job and record the outcome."""
+        dataset, export_format = job['export_type'].rsplit("_", 1)
+        media_type, extension = EXPORT_FILE_FORMATS[export_format]
+        if job['compress']:
+            media_type, extension = GZIP_MEDIA_TYPE, f"{extension}.gz"
+        path = os.path.join(EXPORTS_DIR, f"{job['id']}-{job['attempts']}{extension}")
+        partial_path = f"{path}.part"
+
+        try:
+            os.makedirs(EXPORTS_DIR, exist_ok=True)
+            record_count = write_export_file(
+                partial_path, dataset, export_format,
+                _parse_datetime(job['parameters'].get('start_date')),
+                _parse_datetime(job['parameters'].get('end_date')),
+                job['compress']
+            )
+            os.replace(partial_path, path)
+        except Exception as e:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            self._fail(job, str(e))
+            return
+
+        filename = f"{dataset}_export_{job['created_at']:%Y%m%d_%H%M%S}{extension}"
+        if not self._complete(job, filename, path, media_type, os.path.getsize(path), record_count):
+            # The job was requeued and claimed again meanwhile
+            os.remove(path)
+            logger.info(f"Export job {job['id']} attempt {job['attempts']} superseded; discarded its artifact")
+            return
+        logger.info(f"Export job {job['id']} wrote {record_count} rows to {path}")
+
+    def _claim_next(self, worker_name: str) -> Optional[Dict[str, Any]]:
+        """Atomically mark the oldest queued job as running and return a snapshot of it."""
+        db = SessionLocal()
+        try:
+            job = db.query(ExportJob).filter(
+                ExportJob.status == EXPORT_QUEUED
+            ).order_by(ExportJob.created_at).with_for_update(skip_locked=True).first()
+            if job is None:
+                db.rollback()
+                return None
+
+            job.status = EXPORT_RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            job.attempts = (job.attempts or 0) + 1
+            job.worker_id = worker_name
+            snapshot = {
+                'id': job.id,
+                'export_type': job.export_type,
+                'parameters': job.parameters or {},
+                'compress': bool(job.compress),
+                'attempts': job.attempts,
+                'created_at': job.created_at or job.started_at,
+            }
+            db.commit()
+            return snapshot
+        finally:
+            db.close()
+
+    def _complete(
+        self,
+        job: Dict[str, Any],
+        filename: str,
+        path: str,
+        media_type: str,
+        file_size: int,
+        record_count: int
+    ) -> bool:
+        """
+        Mark a job completed and start its artifact's retention period.
+
+        Returns:
+            False if the job is no longer running this attempt
+        """
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            completed = _current_attempt(db, job).update({
+                ExportJob.status: EXPORT_COMPLETED,
+                ExportJob.filename: filename,
+                ExportJob.file_path: path,
+                ExportJob.media_type: media_type,
+                ExportJob.file_size: file_size,
+                ExportJob.record_count: record_count,
+                ExportJob.error: None,
+                ExportJob.finished_at: now,
+                ExportJob.expires_at: now + timedelta(seconds=settings.export_artifact_retention_seconds)
+            }, synchronize_session=False)
+            db.commit()
+            return bool(completed)
+        finally:
+            db.close()
+
+    def _fail(self, job: Dict[str, Any], error: str) -> None:
+        """Requeue a failed job, or mark it failed after the last attempt."""
+        final = job['attempts'] >= settings.export_job_max_attempts
+        db = SessionLocal()
+        try:
+            _current_attempt(db, job).update({
+                ExportJob.status: EXPORT_FAILED if final else EXPORT_QUEUED,
+                ExportJob.error: error,
+                ExportJob.finished_at: datetime.now(timezone.utc) if final else None
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        logger.warning(f"Export job {job['id']} attempt {job['attempts']} failed: {error}")
+
+    def _requeue(self, job_ids: List[str]) -> None:
+        """Put running jobs back in the queue."""
+        db = SessionLocal()
+        try:
+            db.query(ExportJob).filter(
+                ExportJob.id.in_(job_ids),
+                ExportJob.status == EXPORT_RUNNING
+            ).update({ExportJob.status: EXPORT_QUEUED, ExportJob.worker_id: None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def recover_interrupted_jobs(self) -> int:
+        """
+        Requeue jobs stuck in ``running`` past their lease, failing those
+        that have used all attempts.
+
+        Returns:
+            Number of jobs recovered or failed
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.export_job_lease_seconds)
+        db = SessionLocal()
+        try:
+            stale = db.query(ExportJob).filter(
+                ExportJob.status == EXPORT_RUNNING,
+                ExportJob.started_at < cutoff
+            )
+            exhausted = stale.filter(
+                ExportJob.attempts >= settings.export_job_max_attempts
+            ).update({
+                ExportJob.status: EXPORT_FAILED,
+                ExportJob.error: "Worker lease expired",
+                ExportJob.finished_at: datetime.now(timezone.utc)
+            }, synchronize_session=False)
+            requeued = stale.update({
+                ExportJob.status: EXPORT_QUEUED,
+                ExportJob.worker_id: None
+            }, synchronize_session=False)
+            db.commit()
+            return exhausted + requeued
+        finally:
+            db.close()
+
+    def collect_expired_artifacts(self) -> int:
+        """
+        Delete artifacts past their retention period and mark their jobs
+        expired. Files in the exports directory older than any live
+        artifact (left by crashed workers) are removed as well.
+
+        Returns:
+            Number of files removed
+        """
+        now = datetime.now(timezone.utc)
+        removed = 0
+        db = SessionLocal()
+        try:
+            expired = db.query(ExportJob.id, ExportJob.file_path).filter(
+                ExportJob.status == EXPORT_COMPLETED,
+                ExportJob.expires_at < now
+            ).all()
+            for job_id, path in expired:
+                if path and os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+            if expired:
+                db.query(ExportJob).filter(ExportJob.id.in_([job_id for job_id, _ in expired])).update({
+                    ExportJob.status: EXPORT_EXPIRED,
+                    ExportJob.file_path: None
+                }, synchronize_session=False)
+                db.commit()
+        finally:
+            db.close()
+
+        if os.path.isdir(EXPORTS_DIR):
+            max_age = max(settings.export_artifact_retention_seconds, settings.export_job_lease_seconds)
+            cutoff = time.time() - max_age
+            for entry in os.scandir(EXPORTS_DIR):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
+
+
+def _current_attempt(db, job: Dict[str, Any]):
+    """Query for the job row while it is still running the claimed attempt."""
+    return db.query(ExportJob).filter(
+        ExportJob.id == job['id'],
+        ExportJob.status == EXPORT_RUNNING,
+        ExportJob.attempts == job['attempts']
+    )
+
+
+# Global export job queue instance
+export_job_queue = ExportJobQueue()
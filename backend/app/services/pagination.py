@@ -0,0 +1,135 @@
+"""
+Keyset (cursor) pagination for list endpoints
+
+Pages are ordered newest first on ``(timestamp column, id)`` and each page
+continues strictly after the last row of the previous one, so reading page
+N costs the same as reading page 1 and rows inserted meanwhile do not shift
+or duplicate results. The cursor is an opaque URL-safe token; clients pass
+``next_cursor`` back unchanged.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import desc, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import count_rows
+from app.models.schemas import TotalModeEnum
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(sort_value: datetime, row_id: Any) -> str:
+    """Encode the position of a row as an opaque cursor."""
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Decode a cursor produced by ``encode_cursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), row_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def explain_statement(statement, dialect) -> Tuple[str, Any]:
+    """
+    SQL and driver parameters for ``EXPLAIN (FORMAT JSON)`` of a select statement.
+
+    Parameters compiled after execution starts (expanding IN lists,
+    ``literal_execute`` literals) are rendered into the SQL, so the text
+    runs as is through ``exec_driver_sql``.
+    """
+    compiled = statement.order_by(None).compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    values = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(values[name] for name in compiled.positiontup)
+    else:
+        params = values
+    return f"EXPLAIN (FORMAT JSON) {compiled}", params
+
+
+async def estimate_rows(db: AsyncSession, statement) -> Optional[int]:
+    """
+    Planner row estimate for a select statement.
+
+    Only PostgreSQL exposes an estimate; returns None on other databases.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return None
+
+    connection = await db.connection()
+    sql, params = explain_statement(statement, connection.dialect)
+    plan = (await connection.exec_driver_sql(sql, params)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate_keyset(
+    db: AsyncSession,
+    query,
+    sort_column,
+    id_column,
+    size: int,
+    cursor: Optional[str] = None,
+    total_mode: TotalModeEnum = TotalModeEnum.NONE,
+) -> Dict[str, Any]:
+    """
+    Fetch one page of ``query`` ordered by ``(sort_column, id_column)`` descending.
+
+    Args:
+        query: Filtered select of an ORM entity, optionally with extra columns
+            (items are then rows with the entity first); any existing
+            ordering is replaced
+        size: Page size
+        cursor: ``next_cursor`` from the previous page, or None for the first page
+        total_mode: Skip the total, use the planner estimate (exact count where
+            no estimate is available) or count exactly
+
+    Returns:
+        Keyword arguments for ``CursorPage``
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded
+    """
+    page_query = query.order_by(None).order_by(desc(sort_column), desc(id_column))
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        page_query = page_query.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+
+    # One extra row tells whether another page exists without counting
+    result = await db.execute(page_query.limit(size + 1))
+    single_entity = len(page_query.column_descriptions) == 1
+    rows = result.scalars().all() if single_entity else result.all()
+    has_more = len(rows) > size
+    items = rows[:size]
+
+    next_cursor = None
+    if has_more:
+        last = items[-1] if single_entity else items[-1][0]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    total = None
+    total_is_estimate = False
+    if total_mode == TotalModeEnum.ESTIMATE:
+        total = await estimate_rows(db, query)
+        total_is_estimate = total is not None
+    if total_mode == TotalModeEnum.EXACT or (total_mode == TotalModeEnum.ESTIMATE and total is None):
+        total = await count_rows(db, query)
+
+    return {
+        'items': items,
+        'size': size,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'total': total,
+        'total_is_estimate': total_is_estimate,
+    }
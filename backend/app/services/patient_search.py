@@ -0,0 +1,92 @@
+"""
+Indexed patient search
+
+All search filters match against ``patient_search_document()``, the
+lower-cased names, patient ID and medical record number joined by spaces.
+On PostgreSQL a pg_trgm GIN index on exactly that expression serves both
+substring (``LIKE '%term%'``) and word-prefix patterns, so neither needs a
+sequential scan; terms shorter than three characters have no trigrams and
+fall back to scanning. Other databases evaluate the same filters without
+the index, which keeps the previous case-insensitive substring behaviour.
+
+Multi-word queries match patients containing every word, in any column.
+"""
+from typing import List
+
+from sqlalchemy import Select, and_, case, func, or_, select, true
+
+from app.models.database import Patient, patient_search_document
+
+
+def search_terms(text: str) -> List[str]:
+    """Lower-cased whitespace-separated words of a search query."""
+    return text.lower().split()
+
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input matches literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def contains_filter(text: str):
+    """Every word of ``text`` occurs somewhere in the search document."""
+    document = patient_search_document()
+    return and_(true(), *(
+        document.like(f"%{_escape_like(term)}%", escape="\\")
+        for term in search_terms(text)
+    ))
+
+
+def prefix_filter(text: str):
+    """Every word of ``text`` starts a word of the search document."""
+    document = patient_search_document()
+    clauses = []
+    for term in search_terms(text):
+        escaped = _escape_like(term)
+        clauses.append(or_(
+            document.like(f"{escaped}%", escape="\\"),
+            document.like(f"% {escaped}%", escape="\\"),
+        ))
+    return and_(true(), *clauses)
+
+
+def rank_order(text: str, dialect_name: str) -> list:
+    """
+    Best matches first: exact patient ID or record number, then word-prefix
+    matches, then (PostgreSQL) trigram word similarity, then by name.
+    """
+    normalized = " ".join(search_terms(text))
+    exact = or_(
+        func.lower(Patient.patient_id) == normalized,
+        func.lower(Patient.medical_record_number) == normalized,
+    )
+    order = [case((exact, 0), (prefix_filter(text), 1), else_=2)]
+    if dialect_name == "postgresql":
+        order.append(func.word_similarity(normalized, patient_search_document()).desc())
+    return order + [Patient.last_name, Patient.first_name, Patient.id]
+
+
+def search_statement(text: str, dialect_name: str, limit: int) -> Select:
+    """Ranked substring search over patients."""
+    return (
+        select(Patient)
+        .where(contains_filter(text))
+        .order_by(*rank_order(text, dialect_name))
+        .limit(limit)
+    )
+
+
+def typeahead_statement(text: str, dialect_name: str, limit: int) -> Select:
+    """Ranked word-prefix matches, projecting only the columns a suggestion shows."""
+    return (
+        select(
+            Patient.id,
+            Patient.patient_id,
+            Patient.first_name,
+            Patient.last_name,
+            Patient.medical_record_number,
+        )
+        .where(prefix_filter(text))
+        .order_by(*rank_order(text, dialect_name))
+        .limit(limit)
+    )
@@ -0,0 +1,387 @@
+"""
+Durable asynchronous prediction job queue
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import AuditLog, Prediction, PredictionJob
+from app.ml.executor import InferenceSaturatedError
+from app.ml.model_service import model_service
+from app.services.prediction_persistence import build_prediction_records
+from app.services.data_versions import bump_versions
+from app.services.response_cache import PREDICTIONS_TAG
+from app.services.stats_rollups import RollupChanges
+from app.utils.image_storage import save_prediction_image
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = {JOB_COMPLETED, JOB_FAILED}
+
+# Redis list used to wake idle workers in other processes
+REDIS_WAKEUP_KEY = "prediction-jobs:wakeup"
+
+
+class PredictionJobQueue:
+    """
+    Prediction job queue backed by the ``prediction_jobs`` table.
+
+    The table is the durable source of truth: workers claim the oldest
+    queued row with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of
+    API or worker processes can share it. When the Redis backend is
+    selected, Redis only carries wake-up signals so idle workers in other
+    processes start immediately instead of waiting for the next poll.
+
+    Jobs left ``running`` by a crashed or restarted worker are requeued
+    once their lease (``prediction_job_lease_seconds``) has expired.
+
+    The uploaded image travels in the job row, so workers need only the
+    database and not the API's ``uploads`` directory. It is cleared once
+    the job has finished.
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._workers: List[asyncio.Task] = []
+        self._in_flight: Dict[str, str] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_recovery: Optional[float] = None
+
+        self._redis = None
+        if settings.prediction_job_queue_backend == "redis":
+            if not settings.redis_url:
+                logger.warning("PREDICTION_JOB_QUEUE_BACKEND=redis but REDIS_URL is not set; polling the database")
+            elif not REDIS_AVAILABLE:
+                logger.warning("redis package not installed; polling the database for prediction jobs")
+            else:
+                self._redis = aioredis.from_url(settings.redis_url)
+
+    # Submission
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        content: bytes,
+        original_filename: Optional[str],
+        patient_id: Optional[int] = None,
+        clinical_notes: Optional[str] = None
+    ) -> PredictionJob:
+        """Store the image, also in a queued job row; the job id becomes the prediction id."""
+        job_id, filename, file_path = await asyncio.to_thread(save_prediction_image, content, original_filename)
+        job = PredictionJob(
+            id=job_id,
+            status=JOB_QUEUED,
+            patient_id=patient_id,
+            image_filename=filename,
+            original_filename=original_filename,
+            image_path=file_path,
+            image_data=content,
+            clinical_notes=clinical_notes,
+            attempts=0
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    async def notify(self) -> None:
+        """Wake an idle worker after a job has been committed."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._redis is not None:
+            try:
+                await self._redis.rpush(REDIS_WAKEUP_KEY, 1)
+            except Exception as e:
+                logger.warning(f"Failed to publish prediction job wake-up: {e}")
+
+    # Worker lifecycle
+
+    def start(self, workers: int) -> None:
+        """Start ``workers`` worker tasks on the running event loop."""
+        if workers <= 0:
+            logger.info("Prediction job workers disabled on this instance")
+            return
+        self._wakeup = asyncio.Event()
+        for index in range(workers):
+            self._workers.append(asyncio.create_task(self._run_worker(index)))
+        logger.info(f"Started {workers} prediction job worker(s) as {self.worker_id}")
+
+    async def stop(self) -> None:
+        """Cancel workers and hand their in-flight jobs back to the queue."""
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers.clear()
+
+        if self._in_flight:
+            await asyncio.to_thread(self._requeue, list(self._in_flight.values()))
+            self._in_flight.clear()
+
+    async def _run_worker(self, index: int) -> None:
+        """Claim and process jobs until cancelled."""
+        name = f"{self.worker_id}-{index}"
+        while True:
+            try:
+                await self._maybe_recover()
+                job = await asyncio.to_thread(self._claim_next, name)
+                if job is None:
+                    await self._wait_for_work()
+                    continue
+
+                self._in_flight[name] = job['id']
+                try:
+                    await self._process(job)
+                finally:
+                    self._in_flight.pop(name, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Prediction job worker {name} error: {e}")
+                await asyncio.sleep(settings.prediction_job_poll_interval)
+
+    async def _wait_for_work(self) -> None:
+        """Sleep until a wake-up signal arrives or the poll interval elapses."""
+        timeout = settings.prediction_job_poll_interval
+        if self._redis is not None:
+            try:
+                await self._redis.blpop(REDIS_WAKEUP_KEY, timeout=max(1, int(timeout)))
+                return
+            except Exception as e:
+                logger.warning(f"Redis wake-up wait failed, falling back to polling: {e}")
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        """Run inference for a claimed job and persist the outcome."""
+        if not model_service.is_loaded() and not await model_service.load_model():
+            await asyncio.to_thread(self._fail, job, "Failed to load model")
+            return
+
+        try:
+            content = job['image_data']
+            if content is None:
+                # Queued before images were stored in the job row
+                content = await asyncio.to_thread(_read_file, job['image_path'])
+            result = await model_service.predict_from_bytes(content)
+        except InferenceSaturatedError:
+            # Interactive requests have priority; retry later without spending an attempt
+            await asyncio.to_thread(self._requeue, [job['id']], True)
+            await asyncio.sleep(settings.prediction_job_poll_interval)
+            return
+        except OSError as e:
+            await asyncio.to_thread(self._fail, job, f"Image not readable: {e}")
+            return
+
+        if result is None:
+            await asyncio.to_thread(self._fail, job, "Prediction failed")
+            return
+
+        try:
+            completed = await asyncio.to_thread(self._complete, job, result)
+        except Exception as e:
+            await asyncio.to_thread(self._fail, job, f"Saving prediction failed: {e}")
+            return
+        if not completed:
+            logger.warning(f"Prediction job {job['id']} attempt {job['attempts']} was superseded; result discarded")
+
+    async def _maybe_recover(self) -> None:
+        """Periodically requeue jobs whose worker lease has expired."""
+        now = asyncio.get_running_loop().time()
+        if self._last_recovery is not None and now - self._last_recovery < settings.prediction_job_lease_seconds / 2:
+            return
+        self._last_recovery = now
+        recovered = await asyncio.to_thread(self.recover_interrupted_jobs)
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted prediction job(s)")
+
+    # Database operations (run in worker threads)
+
+    def _claim_next(self, worker_name: str) -> Optional[Dict[str, Any]]:
+        """Atomically mark the oldest queued job as running and return a snapshot of it."""
+        db = SessionLocal()
+        try:
+            job = db.query(PredictionJob).options(undefer(PredictionJob.image_data)).filter(
+                PredictionJob.status == JOB_QUEUED
+            ).order_by(PredictionJob.created_at).with_for_update(skip_locked=True).first()
+            if job is None:
+                db.rollback()
+                return None
+
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            job.attempts = (job.attempts or 0) + 1
+            job.worker_id = worker_name
+            snapshot = {
+                'id': job.id,
+                'patient_id': job.patient_id,
+                'image_filename': job.image_filename,
+                'original_filename': job.original_filename,
+                'image_path': job.image_path,
+                'image_data': job.image_data,
+                'clinical_notes': job.clinical_notes,
+                'attempts': job.attempts,
+                'worker_id': worker_name,
+            }
+            db.commit()
+            return snapshot
+        finally:
+            db.close()
+
+    def _complete(self, job: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        """
+        Create the prediction and audit rows and mark the job completed in one transaction.
+
+        Returns:
+            False when the attempt was superseded (its lease expired and the job was requeued)
+        """
+        db = SessionLocal()
+        try:
+            # Claim the completion first; a superseded attempt must not insert the prediction
+            completed = _current_attempt(db, job).update({
+                PredictionJob.status: JOB_COMPLETED,
+                PredictionJob.image_data: None,
+                PredictionJob.error: None,
+                PredictionJob.finished_at: datetime.now(timezone.utc)
+            }, synchronize_session=False)
+            if not completed:
+                db.rollback()
+                return False
+
+            prediction_row, audit_row = build_prediction_records(
+                prediction_id=job['id'],
+                filename=job['image_filename'],
+                original_filename=job['original_filename'],
+                image_path=job['image_path'],
+                result=result,
+                patient_id=job['patient_id'],
+                clinical_notes=job['clinical_notes'],
+                audit_details={"job_id": job['id']}
+            )
+            db.execute(insert(Prediction), [prediction_row])
+            db.execute(insert(AuditLog), [audit_row])
+            RollupChanges.for_new_predictions([prediction_row]).apply(db)
+            bump_versions(db, [PREDICTIONS_TAG])
+            db.query(PredictionJob).filter(PredictionJob.id == job['id']).update(
+                {PredictionJob.prediction_id: job['id']}, synchronize_session=False
+            )
+            db.commit()
+            return True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _fail(self, job: Dict[str, Any], error: str) -> None:
+        """Requeue a failed job, or mark it failed after the last attempt."""
+        final = job['attempts'] >= settings.prediction_job_max_attempts
+        values = {
+            PredictionJob.status: JOB_FAILED if final else JOB_QUEUED,
+            PredictionJob.error: error,
+            PredictionJob.finished_at: datetime.now(timezone.utc) if final else None
+        }
+        if final:
+            values[PredictionJob.image_data] = None
+        db = SessionLocal()
+        try:
+            _current_attempt(db, job).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        logger.warning(f"Prediction job {job['id']} attempt {job['attempts']} failed: {error}")
+
+    def _requeue(self, job_ids: List[str], refund_attempt: bool = False) -> None:
+        """Put running jobs back in the queue."""
+        db = SessionLocal()
+        try:
+            values = {PredictionJob.status: JOB_QUEUED, PredictionJob.worker_id: None}
+            if refund_attempt:
+                values[PredictionJob.attempts] = PredictionJob.attempts - 1
+            db.query(PredictionJob).filter(
+                PredictionJob.id.in_(job_ids),
+                PredictionJob.status == JOB_RUNNING
+            ).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def recover_interrupted_jobs(self) -> int:
+        """
+        Requeue jobs stuck in ``running`` past their lease, failing those
+        that have used all attempts.
+
+        Returns:
+            Number of jobs recovered or failed
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.prediction_job_lease_seconds)
+        db = SessionLocal()
+        try:
+            stale = db.query(PredictionJob).filter(
+                PredictionJob.status == JOB_RUNNING,
+                PredictionJob.started_at < cutoff
+            )
+            exhausted = stale.filter(
+                PredictionJob.attempts >= settings.prediction_job_max_attempts
+            ).update({
+                PredictionJob.status: JOB_FAILED,
+                PredictionJob.error: "Worker lease expired",
+                PredictionJob.image_data: None,
+                PredictionJob.finished_at: datetime.now(timezone.utc)
+            }, synchronize_session=False)
+            requeued = stale.update({
+                PredictionJob.status: JOB_QUEUED,
+                PredictionJob.worker_id: None
+            }, synchronize_session=False)
+            db.commit()
+            return exhausted + requeued
+        finally:
+            db.close()
+
+
+def _read_file(path: str) -> bytes:
+    """Read a stored job image."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _current_attempt(db, job: Dict[str, Any]):
+    """Query for the job row while this worker is still running the claimed attempt."""
+    return db.query(PredictionJob).filter(
+        PredictionJob.id == job['id'],
+        PredictionJob.status == JOB_RUNNING,
+        PredictionJob.worker_id == job['worker_id'],
+        PredictionJob.attempts == job['attempts']
+    )
+
+
+# Global prediction job queue instance
+prediction_job_queue = PredictionJobQueue()
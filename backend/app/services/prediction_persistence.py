@@ -0,0 +1,283 @@
+"""
+Prediction persistence with atomic audit records and optional group commit
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.ml.batching import collect_batch
+from app.models.database import AuditLog, Prediction
+from app.models.schemas import PredictionResponse
+from app.services.data_versions import bump_data_versions
+from app.services.response_cache import PREDICTIONS_TAG
+from app.services.stats_rollups import RollupChanges, apply_rollup_changes
+
+logger = logging.getLogger(__name__)
+
+
+def build_prediction_records(
+    prediction_id: str,
+    filename: str,
+    original_filename: Optional[str],
+    image_path: str,
+    result: Dict[str, Any],
+    patient_id: Optional[int] = None,
+    clinical_notes: Optional[str] = None,
+    audit_details: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build the prediction row and its audit row from an inference result.
+
+    Timestamps are set here rather than by the database so the response can
+    be built from the row without reading it back after the commit.
+
+    Returns:
+        ``(prediction_row, audit_row)`` column dicts
+    """
+    now = datetime.now(timezone.utc)
+    prediction_row = {
+        'id': prediction_id,
+        'patient_id': patient_id,
+        'image_filename': filename,
+        'original_filename': original_filename,
+        'image_path': image_path,
+        'prediction': result['prediction'],
+        'confidence': result['confidence'],
+        'confidence_scores': result['probabilities'],
+        'inference_time': result.get('inference_time'),
+        'image_size': result.get('image_size'),
+        'clinical_notes': clinical_notes,
+        'reviewed': False,
+        'created_at': now,
+    }
+
+    details = {
+        "prediction": result['prediction'],
+        "confidence": result['confidence'],
+        "filename": original_filename,
+        "cache_hit": result.get('cache_hit', False),
+    }
+    if patient_id is not None:
+        details["patient_id"] = patient_id
+    details.update(audit_details or {})
+
+    audit_row = {
+        'user_id': "system",
+        'action_type': "PREDICTION",
+        'entity_type': "Prediction",
+        'entity_id': prediction_id,
+        'details': details,
+        'timestamp': now,
+    }
+    return prediction_row, audit_row
+
+
+def prediction_response(prediction_row: Dict[str, Any], patient_info: Optional[Dict[str, Any]] = None) -> PredictionResponse:
+    """Build the API response for a prediction row that has not been read back."""
+    return PredictionResponse(**prediction_row, patient_info=patient_info)
+
+
+async def persist_prediction(db: AsyncSession, prediction_row: Dict[str, Any], audit_row: Dict[str, Any]) -> None:
+    """Insert a prediction, its audit record and its rollup counts in one transaction."""
+    try:
+        await db.execute(insert(Prediction), [prediction_row])
+        await db.execute(insert(AuditLog), [audit_row])
+        await apply_rollup_changes(db, RollupChanges.for_new_predictions([prediction_row]))
+        await bump_data_versions(db, PREDICTIONS_TAG)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+
+@dataclass
+class _PendingWrite:
+    """A prediction and audit row waiting for the next group commit."""
+    prediction_row: Dict[str, Any]
+    audit_row: Dict[str, Any]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class GroupCommitWriter:
+    """
+    Buffer prediction and audit rows from concurrent requests and commit
+    them together.
+
+    A batch is committed when ``max_batch_size`` writes are waiting or the
+    oldest has waited ``max_wait_ms``. ``write()`` only returns once the
+    transaction containing its rows has committed, so callers keep the
+    same durability guarantee as a direct commit while sharing one fsync.
+    Each prediction is committed together with its audit row. If a batch
+    fails, its writes are retried one by one so a bad row only fails its
+    own request. ``stop()`` lets every queued and in-flight write commit
+    before the background task ends.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self.writes_total = 0
+        self.commits_total = 0
+        self.errors_total = 0
+        self._commit_time_total = 0.0
+
+    def _ensure_worker(self) -> None:
+        """Start the commit task on the running event loop if needed."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def write(self, prediction_row: Dict[str, Any], audit_row: Dict[str, Any]) -> None:
+        """Queue rows for the next group commit and wait until they are durable."""
+        if self._stopping:
+            # Shutting down: commit on its own instead of joining a batch
+            async with AsyncSessionLocal() as db:
+                await persist_prediction(db, prediction_row, audit_row)
+            return
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingWrite(prediction_row, audit_row, future, time.perf_counter()))
+        await future
+
+    async def _run(self) -> None:
+        """Background loop that commits batches until cancelled."""
+        while True:
+            batch = await collect_batch(self._queue, self.max_batch_size, self.max_wait)
+            try:
+                started = time.perf_counter()
+                errors = await self._commit(batch)
+                self._commit_time_total += time.perf_counter() - started
+                self.writes_total += len(batch)
+            except Exception as e:
+                logger.error(f"Group commit of {len(batch)} predictions failed: {e}")
+                errors = [e] * len(batch)
+
+            for pending, error in zip(batch, errors):
+                if pending.future.done():
+                    continue
+                if error is None:
+                    pending.future.set_result(None)
+                else:
+                    self.errors_total += 1
+                    pending.future.set_exception(error)
+
+            # stop() waits until every queued write has been resolved
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _commit(self, batch: List[_PendingWrite]) -> List[Optional[Exception]]:
+        """Commit a batch in one transaction, falling back to per-write transactions on failure."""
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(insert(Prediction), [pending.prediction_row for pending in batch])
+                await db.execute(insert(AuditLog), [pending.audit_row for pending in batch])
+                # One rollup update per period for the whole batch
+                await apply_rollup_changes(
+                    db, RollupChanges.for_new_predictions(pending.prediction_row for pending in batch)
+                )
+                await bump_data_versions(db, PREDICTIONS_TAG)
+                await db.commit()
+                self.commits_total += 1
+                return [None] * len(batch)
+            except Exception as e:
+                await db.rollback()
+                if len(batch) == 1:
+                    logger.error(f"Prediction write failed: {e}")
+                    return [e]
+                logger.warning(f"Group commit of {len(batch)} predictions failed, retrying individually: {e}")
+
+            errors: List[Optional[Exception]] = []
+            for pending in batch:
+                try:
+                    await persist_prediction(db, pending.prediction_row, pending.audit_row)
+                    self.commits_total += 1
+                    errors.append(None)
+                except Exception as e:
+                    logger.error(f"Prediction write failed: {e}")
+                    errors.append(e)
+            return errors
+
+    async def stop(self) -> None:
+        """
+        Commit every queued and in-flight write, then stop the background task.
+
+        Writes arriving meanwhile are committed on their own. Writes the
+        task could not commit (it died) are failed rather than left waiting.
+        """
+        self._stopping = True
+        try:
+            if self._worker is not None and not self._worker.done():
+                drained = asyncio.create_task(self._queue.join())
+                await asyncio.wait({drained, self._worker}, return_when=asyncio.FIRST_COMPLETED)
+                drained.cancel()
+
+            # The task is now idle waiting for the next write, or has died
+            if self._worker is not None:
+                self._worker.cancel()
+                try:
+                    await self._worker
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    logger.error(f"Group commit writer failed: {e}")
+                self._worker = None
+
+            if self._queue is not None:
+                while not self._queue.empty():
+                    pending = self._queue.get_nowait()
+                    if not pending.future.done():
+                        self.errors_total += 1
+                        pending.future.set_exception(RuntimeError("Group commit writer stopped"))
+                self._queue = None
+        finally:
+            self._stopping = False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get write, commit and batch size metrics."""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'writes_total': self.writes_total,
+            'commits_total': self.commits_total,
+            'errors_total': self.errors_total,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'average_writes_per_commit': self.writes_total / self.commits_total if self.commits_total else 0.0,
+            'average_commit_time_ms': (self._commit_time_total / self.commits_total * 1000.0) if self.commits_total else 0.0,
+        }
+
+
+# Global group commit writer; used when PREDICTION_GROUP_COMMIT_ENABLED is set
+prediction_writer = GroupCommitWriter(
+    max_batch_size=settings.prediction_group_commit_max_size,
+    max_wait_ms=settings.prediction_group_commit_max_wait_ms,
+)
+
+
+async def save_prediction(db: AsyncSession, prediction_row: Dict[str, Any], audit_row: Dict[str, Any]) -> None:
+    """
+    Durably store a prediction and its audit record.
+
+    Uses the shared group commit writer when enabled, otherwise commits on
+    the request session. Either way the rows are committed atomically
+    before this returns.
+    """
+    if settings.prediction_group_commit_enabled:
+        await prediction_writer.write(prediction_row, audit_row)
+    else:
+        await persist_prediction(db, prediction_row, audit_row)
@@ -0,0 +1,58 @@
+"""
+Prediction queries that carry the patient projection
+
+Listings need five patient columns per prediction for ``patient_info``.
+Selecting them through an outer join returns everything in one round trip
+and never touches the ``Prediction.patient`` relationship, so the number
+of queries per page does not depend on the page size.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from app.models.database import Patient, Prediction
+
+# Patient columns exposed as PredictionResponse.patient_info
+PATIENT_INFO_COLUMNS = (
+    Patient.patient_id,
+    Patient.first_name,
+    Patient.last_name,
+    Patient.age,
+    Patient.gender,
+)
+PATIENT_INFO_KEYS = tuple(column.key for column in PATIENT_INFO_COLUMNS)
+
+
+def with_patient_info(query):
+    """
+    Add the patient projection to a ``select(Prediction)`` statement.
+
+    Rows come back as ``(Prediction, patient_pk, *PATIENT_INFO_COLUMNS)``;
+    pass them to ``predictions_from_rows``.
+    """
+    return query.add_columns(
+        Patient.id.label("patient_pk"),
+        *(column.label(f"patient_{column.key}") for column in PATIENT_INFO_COLUMNS)
+    ).outerjoin(Patient, Prediction.patient_id == Patient.id)
+
+
+def select_predictions_with_patient_info():
+    """Select predictions with their patient projection."""
+    return with_patient_info(select(Prediction))
+
+
+def patient_info_from_row(row) -> Optional[Dict[str, Any]]:
+    """``patient_info`` for one row of ``with_patient_info``, or None without a patient."""
+    if row[1] is None:
+        return None
+    return dict(zip(PATIENT_INFO_KEYS, row[2:]))
+
+
+def predictions_from_rows(rows: Iterable) -> List[Prediction]:
+    """Unpack ``with_patient_info`` rows into predictions with ``patient_info`` set."""
+    predictions = []
+    for row in rows:
+        prediction = row[0]
+        prediction.patient_info = patient_info_from_row(row)
+        predictions.append(prediction)
+    return predictions
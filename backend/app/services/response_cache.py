@@ -0,0 +1,244 @@
+"""
+Response cache for read-mostly stats and dashboard endpoints
+"""
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.data_versions import get_versions
+from app.utils.single_flight import SingleFlight
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Data sets responses depend on; names of the versions in ``data_versions``
+PREDICTIONS_TAG = "predictions"
+PATIENTS_TAG = "patients"
+SYSTEM_STATS_TAG = "system_stats"
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """
+    TTL cache of JSON-encoded endpoint responses keyed by data versions,
+    with request coalescing.
+
+    The current ``data_versions`` counter of every tag is part of the
+    cache key. Every write bumps those counters in its own transaction,
+    whichever process makes it, so a write makes all dependent entries
+    unreachable at once; they then age out of the LRU tier. The ETags
+    from ``conditional_request`` come from the same counters, so a cached
+    body is never served under an ETag of newer data. With Redis the
+    entries are shared by all workers. Concurrent misses for the same key
+    wait for a single computation. Redis errors are logged and bypass the
+    cache so they never fail a request.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 256,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "response-cache",
+    ):
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._single_flight = SingleFlight()
+
+        self._redis = None
+        if redis_url:
+            if REDIS_AVAILABLE:
+                self._redis = aioredis.from_url(redis_url)
+            else:
+                logger.warning("redis package not installed; response cache is in-process only")
+
+        # Metrics
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.redis_errors = 0
+        self.endpoint_hits: Dict[str, int] = {}
+        self.endpoint_misses: Dict[str, int] = {}
+
+    async def _generation(self, db: AsyncSession, tags: Sequence[str]) -> str:
+        """Current data version of each tag, joined into a key component."""
+        versions = await get_versions(db, tags)
+        return ".".join(str(versions[tag]) for tag in tags)
+
+    def make_key(self, name: str, params: Dict[str, Any], generation: str) -> str:
+        """Build the cache key for an endpoint call."""
+        encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{self.key_prefix}:{name}:{generation}:{encoded}"
+
+    async def _lookup(self, key: str, ttl_seconds: float) -> Any:
+        """Cached value from the local tier, then Redis, or ``_MISSING``."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        if self._redis is not None:
+            try:
+                payload = await self._redis.get(key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Response cache Redis lookup failed: {e}")
+                payload = None
+            if payload is not None:
+                value = json.loads(payload)
+                self._store_local(key, value, ttl_seconds)
+                self.redis_hits += 1
+                return value
+
+        return _MISSING
+
+    async def _store(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """Store an encoded response in both tiers."""
+        self._store_local(key, value, ttl_seconds)
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, json.dumps(value), ex=max(1, int(ttl_seconds)))
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Response cache Redis store failed: {e}")
+
+    def _store_local(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries."""
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        name: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        tags: Sequence[str],
+        db: AsyncSession,
+    ) -> Any:
+        """
+        Return the cached response for ``name`` and ``params``, computing it on a miss.
+
+        Args:
+            name: Endpoint name used in the key and per-endpoint metrics
+            params: Request parameters that change the response
+            compute: Coroutine function producing the response
+            ttl_seconds: Lifetime of the cached response
+            tags: Data sets the response depends on
+            db: Session used to read the data versions
+
+        Returns:
+            The JSON-compatible encoding of the response
+        """
+        if not self.enabled or ttl_seconds <= 0:
+            return jsonable_encoder(await compute())
+
+        try:
+            generation = await self._generation(db, tags)
+        except Exception as e:
+            logger.warning(f"Response cache data version lookup failed: {e}")
+            return jsonable_encoder(await compute())
+
+        key = self.make_key(name, params, generation)
+        value = await self._lookup(key, ttl_seconds)
+        if value is not _MISSING:
+            self.endpoint_hits[name] = self.endpoint_hits.get(name, 0) + 1
+            return value
+
+        async def compute_and_store() -> Any:
+            encoded = jsonable_encoder(await compute())
+            await self._store(key, encoded, ttl_seconds)
+            return encoded
+
+        # Concurrent misses for this key share one computation
+        value, shared = await self._single_flight.run(key, compute_and_store)
+        if shared:
+            self.coalesced += 1
+            self.endpoint_hits[name] = self.endpoint_hits.get(name, 0) + 1
+        else:
+            self.misses += 1
+            self.endpoint_misses[name] = self.endpoint_misses.get(name, 0) + 1
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries from the local tier."""
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit ratio, coalescing and eviction metrics."""
+        hits = self.local_hits + self.redis_hits
+        lookups = hits + self.misses + self.coalesced
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'redis_enabled': self._redis is not None,
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': (hits + self.coalesced) / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'redis_errors': self.redis_errors,
+            'endpoints': {
+                name: {'hits': self.endpoint_hits.get(name, 0), 'misses': self.endpoint_misses.get(name, 0)}
+                for name in sorted(set(self.endpoint_hits) | set(self.endpoint_misses))
+            },
+        }
+
+
+# Global response cache
+response_cache = ResponseCache(
+    enabled=settings.response_cache_enabled,
+    max_entries=settings.response_cache_max_entries,
+    redis_url=settings.redis_url if settings.response_cache_use_redis else None,
+)
+
+
+def cached_response(name: str, ttl_seconds: float, tags: Sequence[str]):
+    """
+    Cache an endpoint's response in ``response_cache``.
+
+    Apply below the router decorator; the endpoint must take an
+    ``AsyncSession``, which is used to read the data versions. Keyword
+    arguments other than database sessions form the cache key; exceptions
+    are not cached.
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            params = {key: value for key, value in kwargs.items() if not isinstance(value, AsyncSession)}
+            db = next(value for value in kwargs.values() if isinstance(value, AsyncSession))
+            return await response_cache.get_or_compute(
+                name, params, lambda: endpoint(*args, **kwargs), ttl_seconds, tags, db
+            )
+        return wrapper
+    return decorator
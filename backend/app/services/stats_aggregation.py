@@ -0,0 +1,103 @@
+"""
+Dashboard aggregates computed with conditional aggregation
+
+The overview endpoints need a handful of counts over the same tables
+(total, today, this week, this month, per prediction type) plus the
+average confidence. Instead of one COUNT query per figure, each table is
+scanned once with ``COUNT(CASE WHEN ... THEN 1 END)`` columns, and both
+scans are sent as a single statement.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, distinct, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import Patient, Prediction
+from app.utils.date_ranges import day_range, day_start
+
+
+@dataclass
+class OverviewAggregates:
+    """Patient and prediction figures shown on the overview dashboards."""
+    total_patients: int
+    patients_this_week: int
+    patients_this_month: int
+    total_predictions: int
+    predictions_today: int
+    predictions_this_week: int
+    predictions_this_month: int
+    pneumonia_cases: int
+    normal_cases: int
+    average_confidence: float
+    unique_patients: Optional[int] = None
+
+
+def count_where(condition):
+    """COUNT of the rows matching ``condition``; portable form of COUNT(*) FILTER (WHERE ...)."""
+    return func.count(case((condition, 1)))
+
+
+def overview_statement(today: date, unique_patients: bool = False):
+    """
+    Build the single statement behind ``get_overview_aggregates``.
+
+    Weeks start on Monday; all windows end now.
+    """
+    today_start, today_end = day_range(today)
+    week_start = day_start(today - timedelta(days=today.weekday()))
+    month_start = day_start(today.replace(day=1))
+
+    prediction_columns = [
+        func.count().label("total_predictions"),
+        count_where(
+            (Prediction.created_at >= today_start) & (Prediction.created_at < today_end)
+        ).label("predictions_today"),
+        count_where(Prediction.created_at >= week_start).label("predictions_this_week"),
+        count_where(Prediction.created_at >= month_start).label("predictions_this_month"),
+        count_where(Prediction.prediction == "PNEUMONIA").label("pneumonia_cases"),
+        count_where(Prediction.prediction == "NORMAL").label("normal_cases"),
+        func.avg(Prediction.confidence).label("average_confidence"),
+    ]
+    if unique_patients:
+        prediction_columns.append(func.count(distinct(Prediction.patient_id)).label("unique_patients"))
+
+    predictions = select(*prediction_columns).subquery("prediction_aggregates")
+    patients = select(
+        func.count().label("total_patients"),
+        count_where(Patient.created_at >= week_start).label("patients_this_week"),
+        count_where(Patient.created_at >= month_start).label("patients_this_month"),
+    ).subquery("patient_aggregates")
+
+    # Both single-row aggregates joined into one result row
+    return select(predictions, patients).select_from(predictions.join(patients, true()))
+
+
+async def get_overview_aggregates(
+    db: AsyncSession,
+    today: Optional[date] = None,
+    unique_patients: bool = False,
+) -> OverviewAggregates:
+    """
+    Compute the overview figures in one round trip (one scan per table).
+
+    Args:
+        today: Day treated as today; defaults to the current UTC date
+        unique_patients: Also count distinct patients with predictions
+    """
+    today = today or datetime.utcnow().date()
+    row = (await db.execute(overview_statement(today, unique_patients))).one()
+    return OverviewAggregates(
+        total_patients=row.total_patients,
+        patients_this_week=row.patients_this_week,
+        patients_this_month=row.patients_this_month,
+        total_predictions=row.total_predictions,
+        predictions_today=row.predictions_today,
+        predictions_this_week=row.predictions_this_week,
+        predictions_this_month=row.predictions_this_month,
+        pneumonia_cases=row.pneumonia_cases,
+        normal_cases=row.normal_cases,
+        average_confidence=float(row.average_confidence) if row.average_confidence else 0.0,
+        unique_patients=row.unique_patients if unique_patients else None,
+    )
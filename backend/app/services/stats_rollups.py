@@ -0,0 +1,278 @@
+"""
+Incrementally maintained prediction statistics rollups
+
+Every prediction insert, review and delete adjusts one ``day`` and one
+``week`` row of ``prediction_rollups`` in the same transaction as the
+write itself, so the rollups never disagree with committed predictions.
+Daily and weekly dashboards then read one row per period instead of
+scanning ``predictions``.
+
+Counters are updated with ``column = column + delta`` so concurrent
+writers do not lose increments. Distinct patients are tracked with a
+HyperLogLog sketch; sketches cannot forget a value, so deleting a
+prediction does not lower the unique patient estimate until the rollups
+are rebuilt with ``rebuild_rollups``.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import insert_if_missing
+from app.models.database import Prediction, PredictionRollup
+from app.models.schemas import WeeklyStatsResponse
+from app.utils.date_ranges import day_start, week_start
+from app.utils.hyperloglog import HyperLogLog
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+
+COUNTER_COLUMNS = ["predictions_count", "pneumonia_count", "normal_count", "reviewed_count", "confidence_sum"]
+
+REBUILD_BATCH_SIZE = 10000
+
+
+def _utc_date(timestamp: Optional[datetime]) -> date:
+    """UTC calendar day of a timestamp; naive timestamps are already UTC."""
+    if timestamp is None:
+        return datetime.utcnow().date()
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date()
+
+
+@dataclass
+class _Delta:
+    """Pending change to one rollup row."""
+    predictions_count: int = 0
+    pneumonia_count: int = 0
+    normal_count: int = 0
+    reviewed_count: int = 0
+    confidence_sum: float = 0.0
+    patient_ids: Set[int] = field(default_factory=set)
+
+
+class RollupChanges:
+    """
+    Rollup deltas for the prediction writes of one transaction.
+
+    Record each write, then call ``apply`` (sync sessions) or
+    ``apply_rollup_changes`` (async sessions) before committing.
+    """
+
+    def __init__(self):
+        self._deltas: Dict[Tuple[str, date], _Delta] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._deltas)
+
+    @classmethod
+    def for_new_predictions(cls, prediction_rows: Iterable[Dict[str, Any]]) -> "RollupChanges":
+        """Changes for inserting the given prediction column dicts."""
+        changes = cls()
+        for row in prediction_rows:
+            changes.add_prediction(
+                row.get('created_at'), row['prediction'], row['confidence'],
+                patient_id=row.get('patient_id'), reviewed=bool(row.get('reviewed'))
+            )
+        return changes
+
+    def _period_deltas(self, created_at: Optional[datetime]) -> List[_Delta]:
+        """The day and week deltas a prediction created at ``created_at`` counts towards."""
+        day = _utc_date(created_at)
+        deltas = []
+        for key in [(PERIOD_DAY, day), (PERIOD_WEEK, week_start(day))]:
+            if key not in self._deltas:
+                self._deltas[key] = _Delta()
+            deltas.append(self._deltas[key])
+        return deltas
+
+    def _count(self, created_at, prediction: str, confidence: float, reviewed: bool, sign: int) -> List[_Delta]:
+        deltas = self._period_deltas(created_at)
+        for delta in deltas:
+            delta.predictions_count += sign
+            delta.pneumonia_count += sign if prediction == "PNEUMONIA" else 0
+            delta.normal_count += sign if prediction == "NORMAL" else 0
+            delta.reviewed_count += sign if reviewed else 0
+            delta.confidence_sum += sign * (confidence or 0.0)
+        return deltas
+
+    def add_prediction(
+        self,
+        created_at: Optional[datetime],
+        prediction: str,
+        confidence: float,
+        patient_id: Optional[int] = None,
+        reviewed: bool = False,
+    ) -> None:
+        """Count a new prediction."""
+        for delta in self._count(created_at, prediction, confidence, reviewed, 1):
+            if patient_id is not None:
+                delta.patient_ids.add(patient_id)
+
+    def remove_prediction(self, created_at: Optional[datetime], prediction: str, confidence: float, reviewed: bool) -> None:
+        """Uncount a deleted prediction."""
+        self._count(created_at, prediction, confidence, reviewed, -1)
+
+    def add_review(self, created_at: Optional[datetime]) -> None:
+        """Count a prediction that has just been marked reviewed."""
+        for delta in self._period_deltas(created_at):
+            delta.reviewed_count += 1
+
+    def _ensure_row(self, session: Session, period: str, period_start: date) -> None:
+        """Create the rollup row if it does not exist yet."""
+        table = PredictionRollup.__table__
+        values = {'period': period, 'period_start': period_start, 'confidence_sum': 0.0}
+        values.update({name: 0 for name in COUNTER_COLUMNS if name != 'confidence_sum'})
+
+        dialect_name = session.get_bind().dialect.name
+        if dialect_name not in ("postgresql", "sqlite") and session.scalar(
+            select(table.c.id).where(table.c.period == period, table.c.period_start == period_start)
+        ) is not None:
+            return
+        session.execute(insert_if_missing(dialect_name, table, values, ["period", "period_start"]))
+
+    def apply(self, session: Session) -> None:
+        """
+        Write the deltas in the session's current transaction.
+
+        Rows are updated in key order so concurrent transactions lock them
+        in the same order. The transaction holds the row locks until it
+        commits, so apply the changes as the last step before the commit.
+        """
+        table = PredictionRollup.__table__
+        for (period, period_start), delta in sorted(self._deltas.items()):
+            self._ensure_row(session, period, period_start)
+            key = (table.c.period == period) & (table.c.period_start == period_start)
+
+            values = {name: table.c[name] + getattr(delta, name) for name in COUNTER_COLUMNS if getattr(delta, name)}
+            if delta.patient_ids:
+                # Read-modify-write of the sketch needs the row lock
+                sketch = HyperLogLog.from_bytes(
+                    session.scalar(select(table.c.patients_sketch).where(key).with_for_update())
+                )
+                sketch.update(delta.patient_ids)
+                values['patients_sketch'] = sketch.to_bytes()
+            if values:
+                values['updated_at'] = func.now()
+                session.execute(update(table).where(key).values(**values))
+        self._deltas.clear()
+
+
+async def apply_rollup_changes(db: AsyncSession, changes: RollupChanges) -> None:
+    """Write rollup changes in the async session's current transaction."""
+    if changes:
+        await db.run_sync(changes.apply)
+
+
+def average_confidence(rollup: PredictionRollup) -> float:
+    """Mean prediction confidence of a rollup period."""
+    return rollup.confidence_sum / rollup.predictions_count if rollup.predictions_count else 0.0
+
+
+def unique_patients(rollup: PredictionRollup) -> int:
+    """Estimated distinct patients with predictions in a rollup period."""
+    return HyperLogLog.from_bytes(rollup.patients_sketch).cardinality()
+
+
+async def get_daily_rollups(db: AsyncSession, first_day: date, last_day: date) -> List[PredictionRollup]:
+    """Day rollups with predictions from ``first_day`` through ``last_day``, oldest first."""
+    return (await db.scalars(select(PredictionRollup).where(
+        PredictionRollup.period == PERIOD_DAY,
+        PredictionRollup.period_start >= first_day,
+        PredictionRollup.period_start <= last_day,
+        PredictionRollup.predictions_count > 0
+    ).order_by(PredictionRollup.period_start))).all()
+
+
+async def get_weekly_rollups(db: AsyncSession, weeks: int, today: Optional[date] = None) -> List[PredictionRollup]:
+    """Week rollups with predictions for the last ``weeks`` weeks including the current one, newest first."""
+    today = today or datetime.utcnow().date()
+    first_week = week_start(today) - timedelta(weeks=weeks - 1)
+    return (await db.scalars(select(PredictionRollup).where(
+        PredictionRollup.period == PERIOD_WEEK,
+        PredictionRollup.period_start >= first_week,
+        PredictionRollup.predictions_count > 0
+    ).order_by(PredictionRollup.period_start.desc()))).all()
+
+
+def weekly_stats_response(rollup: PredictionRollup) -> WeeklyStatsResponse:
+    """API representation of a week rollup."""
+    return WeeklyStatsResponse(
+        week_start=day_start(rollup.period_start),
+        week_end=day_start(rollup.period_start + timedelta(days=6)),
+        predictions_count=rollup.predictions_count,
+        accuracy_rate=average_confidence(rollup),
+        pneumonia_detected=rollup.pneumonia_count,
+        normal_cases=rollup.normal_count,
+        unique_patients=unique_patients(rollup),
+    )
+
+
+@dataclass
+class RollupTotals:
+    """All-time prediction figures summed from the day rollups."""
+    total_predictions: int
+    predictions_today: int
+    pneumonia_cases: int
+    normal_cases: int
+    reviewed_predictions: int
+    average_confidence: float
+
+
+async def get_rollup_totals(db: AsyncSession, today: Optional[date] = None) -> RollupTotals:
+    """Sum the day rollups in one statement (one row per day with predictions)."""
+    today = today or datetime.utcnow().date()
+    row = (await db.execute(select(
+        func.coalesce(func.sum(PredictionRollup.predictions_count), 0).label("total_predictions"),
+        func.coalesce(func.sum(case(
+            (PredictionRollup.period_start == today, PredictionRollup.predictions_count), else_=0
+        )), 0).label("predictions_today"),
+        func.coalesce(func.sum(PredictionRollup.pneumonia_count), 0).label("pneumonia_cases"),
+        func.coalesce(func.sum(PredictionRollup.normal_count), 0).label("normal_cases"),
+        func.coalesce(func.sum(PredictionRollup.reviewed_count), 0).label("reviewed_predictions"),
+        func.coalesce(func.sum(PredictionRollup.confidence_sum), 0.0).label("confidence_sum"),
+    ).where(PredictionRollup.period == PERIOD_DAY))).one()
+    return RollupTotals(
+        total_predictions=row.total_predictions,
+        predictions_today=row.predictions_today,
+        pneumonia_cases=row.pneumonia_cases,
+        normal_cases=row.normal_cases,
+        reviewed_predictions=row.reviewed_predictions,
+        average_confidence=float(row.confidence_sum) / row.total_predictions if row.total_predictions else 0.0,
+    )
+
+
+def rebuild_rollups(session: Session, since: Optional[date] = None) -> int:
+    """
+    Recompute rollups from the predictions table.
+
+    Args:
+        since: Only rebuild periods from the week containing this day
+            onwards; rebuilds everything when omitted
+
+    Returns:
+        Number of predictions counted
+    """
+    first_day = week_start(since) if since else None
+
+    clear = delete(PredictionRollup)
+    source = select(
+        Prediction.created_at, Prediction.prediction, Prediction.confidence,
+        Prediction.patient_id, Prediction.reviewed
+    )
+    if first_day is not None:
+        clear = clear.where(PredictionRollup.period_start >= first_day)
+        source = source.where(Prediction.created_at >= day_start(first_day))
+    session.execute(clear)
+
+    changes = RollupChanges()
+    counted = 0
+    for row in session.execute(source.execution_options(yield_per=REBUILD_BATCH_SIZE)):
+        changes.add_prediction(row.created_at, row.prediction, row.confidence, row.patient_id, bool(row.reviewed))
+        counted += 1
+    changes.apply(session)
+    return counted
@@ -0,0 +1,216 @@
+"""
+PDF summary report
+
+The report needs a handful of figures over a date range plus the ten
+latest predictions. The figures come from one aggregate statement and the
+latest predictions from a bounded query on the ``created_at`` index, so
+the database work does not grow with the length of the range. Rendering
+with reportlab is CPU-bound and runs in a worker thread.
+
+Rendered reports are cached per date range and the current versions of
+the data they read, so a cached report is reused until a prediction or
+patient write changes the data.
+"""
+import asyncio
+import io
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.database import Patient, Prediction
+from app.services.data_versions import get_versions
+from app.services.response_cache import PATIENTS_TAG, PREDICTIONS_TAG
+from app.services.stats_aggregation import count_where
+from app.utils.single_flight import SingleFlight
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+# Latest predictions listed in the report
+RECENT_PREDICTIONS_LIMIT = 10
+# Data sets the report reads; a write to either invalidates cached reports
+REPORT_TAGS = (PREDICTIONS_TAG, PATIENTS_TAG)
+
+
+@dataclass
+class ReportSummary:
+    """Figures and latest predictions shown in the summary report."""
+    start_date: datetime
+    end_date: datetime
+    total_patients: int
+    total_predictions: int
+    pneumonia_cases: int
+    normal_cases: int
+    average_confidence: float
+    # (created_at, patient name, prediction, confidence), newest first
+    recent_predictions: List[Tuple[datetime, str, str, float]]
+
+
+def summary_statement(start_date: datetime, end_date: datetime):
+    """Patient and prediction figures for the range as one result row."""
+    in_range = (Prediction.created_at >= start_date) & (Prediction.created_at <= end_date)
+    predictions = select(
+        func.count().label("total_predictions"),
+        count_where(Prediction.prediction == "PNEUMONIA").label("pneumonia_cases"),
+        count_where(Prediction.prediction == "NORMAL").label("normal_cases"),
+        func.avg(Prediction.confidence).label("average_confidence"),
+    ).where(in_range).subquery("prediction_aggregates")
+    patients = select(
+        func.count().label("total_patients"),
+    ).where(Patient.created_at >= start_date, Patient.created_at <= end_date).subquery("patient_aggregates")
+    return select(predictions, patients).select_from(predictions.join(patients, true()))
+
+
+def recent_predictions_statement(start_date: datetime, end_date: datetime, limit: int = RECENT_PREDICTIONS_LIMIT):
+    """Latest predictions in the range with the patient's name."""
+    return select(
+        Prediction.created_at,
+        Patient.first_name,
+        Patient.last_name,
+        Prediction.prediction,
+        Prediction.confidence,
+    ).outerjoin(Patient, Prediction.patient_id == Patient.id).where(
+        Prediction.created_at >= start_date,
+        Prediction.created_at <= end_date
+    ).order_by(Prediction.created_at.desc()).limit(limit)
+
+
+async def get_report_summary(db: AsyncSession, start_date: datetime, end_date: datetime) -> ReportSummary:
+    """Compute the report figures with two bounded statements."""
+    row = (await db.execute(summary_statement(start_date, end_date))).one()
+    recent = (await db.execute(recent_predictions_statement(start_date, end_date))).all()
+    return ReportSummary(
+        start_date=start_date,
+        end_date=end_date,
+        total_patients=row.total_patients,
+        total_predictions=row.total_predictions,
+        pneumonia_cases=row.pneumonia_cases,
+        normal_cases=row.normal_cases,
+        average_confidence=float(row.average_confidence) if row.average_confidence else 0.0,
+        recent_predictions=[
+            (
+                created_at,
+                f"{first_name} {last_name}" if first_name is not None else "Unknown",
+                prediction,
+                confidence
+            )
+            for created_at, first_name, last_name, prediction, confidence in recent
+        ],
+    )
+
+
+def _table_style(header_font_size: int) -> "TableStyle":
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+def render_summary_pdf(summary: ReportSummary) -> bytes:
+    """Render the summary report; blocking, run in a worker thread."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    story = []
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+
+    story.append(Paragraph("Pneumonia Detection System Report", title_style))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"Report Period: {summary.start_date} to {summary.end_date}", styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    story.append(Paragraph("Summary Statistics", styles['Heading2']))
+    stats_table = Table([
+        ['Metric', 'Value'],
+        ['Total Patients', str(summary.total_patients)],
+        ['Total Predictions', str(summary.total_predictions)],
+        ['Pneumonia Cases', str(summary.pneumonia_cases)],
+        ['Normal Cases', str(summary.normal_cases)],
+        ['Average Confidence', f"{summary.average_confidence:.1%}"],
+    ])
+    stats_table.setStyle(_table_style(14))
+    story.append(stats_table)
+    story.append(Spacer(1, 20))
+
+    if summary.recent_predictions:
+        story.append(Paragraph("Recent Predictions", styles['Heading2']))
+        pred_data = [['Date', 'Patient', 'Prediction', 'Confidence']]
+        for created_at, patient_name, prediction, confidence in summary.recent_predictions:
+            pred_data.append([created_at.strftime('%Y-%m-%d'), patient_name, prediction, f"{confidence:.1%}"])
+        pred_table = Table(pred_data)
+        pred_table.setStyle(_table_style(12))
+        story.append(pred_table)
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+class SummaryReportCache:
+    """
+    LRU cache of rendered reports keyed by date range and data versions.
+
+    Keys change whenever the data does, so entries never need explicit
+    invalidation; outdated ones fall out of the LRU. Concurrent requests
+    for the same report wait for a single rendering.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_report(self, db: AsyncSession, start_date: datetime, end_date: datetime) -> bytes:
+        """Rendered PDF for the range, from the cache when the data has not changed."""
+        versions = await get_versions(db, REPORT_TAGS)
+        key = (start_date.isoformat(), end_date.isoformat(), tuple(sorted(versions.items())))
+
+        pdf = self._entries.get(key)
+        if pdf is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf
+
+        async def render() -> bytes:
+            summary = await get_report_summary(db, start_date, end_date)
+            rendered = await asyncio.to_thread(render_summary_pdf, summary)
+            self._entries[key] = rendered
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return rendered
+
+        pdf, shared = await self._single_flight.run(key, render)
+        if shared:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return pdf
+
+
+# Global summary report cache
+summary_report_cache = SummaryReportCache(max_entries=settings.report_cache_max_entries)
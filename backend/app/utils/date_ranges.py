@@ -0,0 +1,30 @@
+"""
+Timestamp bounds for calendar-day filters
+
+Filtering with ``func.date(column) == day`` wraps the column in a function,
+so the database cannot use an index on it. Comparing the raw column with
+half-open bounds keeps the filter index-friendly and matches the same rows.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Tuple
+
+
+def day_start(day: date) -> datetime:
+    """Midnight at the start of ``day``."""
+    return datetime.combine(day, time.min)
+
+
+def day_range(day: date) -> Tuple[datetime, datetime]:
+    """``[start, end)`` bounds covering one calendar day."""
+    start = day_start(day)
+    return start, start + timedelta(days=1)
+
+
+def days_range(first_day: date, last_day: date) -> Tuple[datetime, datetime]:
+    """``[start, end)`` bounds covering ``first_day`` through ``last_day`` inclusive."""
+    return day_start(first_day), day_start(last_day) + timedelta(days=1)
+
+
+def week_start(day: date) -> date:
+    """Monday of the week containing ``day``."""
+    return day - timedelta(days=day.weekday())
@@ -0,0 +1,70 @@
+"""
+HyperLogLog cardinality sketch
+
+Estimates the number of distinct values added with a fixed amount of
+memory: ``2 ** precision`` one-byte registers (1 KiB at the default
+precision, about 3% standard error). Sketches merge by taking the register
+maximum, so per-period sketches can be combined without the raw values.
+Values cannot be removed once added.
+"""
+import hashlib
+import math
+from typing import Any, Iterable, Optional
+
+DEFAULT_PRECISION = 10
+
+
+class HyperLogLog:
+    """Distinct-count sketch serialisable to a compact byte string."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("register count does not match precision")
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> "HyperLogLog":
+        """Load a sketch written by ``to_bytes``; empty data gives an empty sketch."""
+        if not data:
+            return cls()
+        return cls(precision=data[0], registers=data[1:])
+
+    def to_bytes(self) -> bytes:
+        """Precision byte followed by the registers."""
+        return bytes([self.precision]) + bytes(self.registers)
+
+    def add(self, value: Any) -> None:
+        """Add one value (compared by its string form)."""
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        remainder_bits = 64 - self.precision
+        remainder = hashed & ((1 << remainder_bits) - 1)
+        rank = remainder_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]) -> None:
+        """Add several values."""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def cardinality(self) -> int:
+        """Estimated number of distinct values added."""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size ** 2 / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Linear counting is more accurate while many registers are empty
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
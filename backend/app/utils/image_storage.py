@@ -0,0 +1,36 @@
+"""
+Storage for uploaded prediction images
+"""
+import os
+import uuid
+from typing import Optional, Tuple
+
+# Directory where prediction images are stored
+PREDICTIONS_UPLOAD_DIR = "uploads/predictions"
+
+
+def save_prediction_image(
+    content: bytes,
+    original_filename: Optional[str],
+    upload_dir: str = PREDICTIONS_UPLOAD_DIR
+) -> Tuple[str, str, str]:
+    """
+    Save prediction image bytes under a new UUID.
+    
+    Args:
+        content: Encoded image bytes
+        original_filename: Client-supplied filename, used for the extension
+        upload_dir: Directory to store the image in
+    
+    Returns:
+        Tuple of (file_id, filename, file_path)
+    """
+    file_id = str(uuid.uuid4())
+    file_extension = os.path.splitext(original_filename)[1] if original_filename else ".jpg"
+    filename = f"{file_id}{file_extension}"
+    file_path = os.path.join(upload_dir, filename)
+    
+    with open(file_path, "wb") as f:
+        f.write(content)
+    
+    return file_id, filename, file_path
@@ -0,0 +1,55 @@
+"""
+Request coalescing for expensive computations
+
+When several requests miss a cache for the same key at once, only the
+first computes the value; the others wait for its result (or exception)
+instead of repeating the work.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time and share its outcome."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Compute the value for ``key``, or wait for the computation already running.
+
+        The computation runs in the first caller's task. If that caller is
+        cancelled, a waiting caller takes over and computes the value itself.
+
+        Returns:
+            Tuple of (value, shared); ``shared`` is True when another caller computed it
+        """
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                # Shielded so a cancelled waiter does not cancel the computation
+                return await asyncio.shield(inflight), True
+            except asyncio.CancelledError:
+                # The computing request was cancelled, not this one: compute it here instead
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            future.set_result(value)
+            return value, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; retrieving it here avoids "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
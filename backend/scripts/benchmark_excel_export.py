@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark Excel exports: in-memory workbook vs write-only streaming workbook
+
+Seeds synthetic predictions into DATABASE_URL with timestamps in a
+reserved date range, then exports the first N rows of that range with
+each engine and reports wall time and peak resident memory. Every run
+happens in a fresh process so peak RSS is not shared between runs. The
+in-memory engine reproduces the previous export (ORM-free rows, full
+workbook, per-cell width scan) and is skipped above --legacy-max-rows.
+All seeded rows are deleted afterwards.
+
+Usage:
+    python scripts/benchmark_excel_export.py [--rows 100000 1000000] [--legacy-max-rows 100000]
+"""
+import sys
+import os
+import argparse
+import io
+import multiprocessing
+import resource
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert
+
+from app.core.database import SessionLocal, create_tables, engine
+from app.models.database import Prediction
+from app.services.data_exports import (
+    PREDICTION_EXPORT_HEADERS, build_excel_export, prediction_export_row, prediction_export_statement
+)
+
+MARKER = "excel-export-benchmark"
+# Seeded rows live in a range no real prediction uses
+RANGE_START = datetime(2002, 1, 1)
+
+
+def seed(count: int, chunk_size: int):
+    """Insert predictions one second apart from RANGE_START."""
+    db = SessionLocal()
+    try:
+        for start in range(0, count, chunk_size):
+            db.execute(insert(Prediction), [
+                {
+                    'id': str(uuid.uuid4()),
+                    'image_filename': f"{MARKER}-{i}.jpg",
+                    'original_filename': f"{MARKER}-{i}.jpg",
+                    'prediction': "PNEUMONIA" if i % 3 else "NORMAL",
+                    'confidence': 0.5 + (i % 50) / 100,
+                    'confidence_scores': {"NORMAL": 0.2, "PNEUMONIA": 0.8},
+                    'inference_time': 0.02,
+                    'reviewed': False,
+                    'created_at': RANGE_START + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + chunk_size, count))
+            ])
+            db.commit()
+            print(f"  seeded {min(start + chunk_size, count):,}/{count:,}", end="\r")
+        print()
+    finally:
+        db.close()
+
+
+def cleanup():
+    """Delete seeded rows."""
+    db = SessionLocal()
+    try:
+        db.execute(delete(Prediction).where(Prediction.image_filename.like(f"{MARKER}-%")))
+        db.commit()
+    finally:
+        db.close()
+
+
+def in_memory_export(statement) -> int:
+    """The previous approach: every row as cells of a full workbook, then a width scan."""
+    import openpyxl
+
+    with engine.connect() as connection:
+        rows = connection.execute(statement).all()
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Predictions"
+    for col, header in enumerate(PREDICTION_EXPORT_HEADERS, 1):
+        sheet.cell(row=1, column=col, value=header)
+    for row_number, row in enumerate(rows, 2):
+        for col, value in enumerate(prediction_export_row(row), 1):
+            sheet.cell(row=row_number, column=col, value=value)
+    for column in sheet.columns:
+        width = max(len(str(cell.value)) for cell in column)
+        sheet.column_dimensions[column[0].column_letter].width = min(width + 2, 50)
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.tell()
+
+
+def write_only_export(statement) -> int:
+    """The streaming export used by the endpoints."""
+    path = build_excel_export("Predictions", PREDICTION_EXPORT_HEADERS, prediction_export_row, statement)
+    try:
+        return os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+
+def run_export(mode: str, rows: int, results):
+    """Child process: run one export and report time, size and peak RSS."""
+    statement = prediction_export_statement(RANGE_START, RANGE_START + timedelta(seconds=rows - 1))
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = (in_memory_export if mode == "in-memory" else write_only_export)(statement)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux
+    results.put((elapsed, size, baseline / 1024, peak / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Excel export engines")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000], help="Export sizes")
+    parser.add_argument("--legacy-max-rows", type=int, default=100_000,
+                        help="Largest export to run with the in-memory engine")
+    parser.add_argument("--chunk-size", type=int, default=20_000, help="Rows inserted per seeding transaction")
+    args = parser.parse_args()
+
+    create_tables()
+    context = multiprocessing.get_context("spawn")
+    try:
+        print(f"Seeding {max(args.rows):,} predictions...")
+        seed(max(args.rows), args.chunk_size)
+        engine.dispose()
+
+        for rows in sorted(args.rows):
+            for mode in ("in-memory", "write-only"):
+                if mode == "in-memory" and rows > args.legacy_max_rows:
+                    print(f"{mode:<11} {rows:>9,} rows   skipped (--legacy-max-rows {args.legacy_max_rows:,})")
+                    continue
+                results = context.Queue()
+                process = context.Process(target=run_export, args=(mode, rows, results))
+                process.start()
+                elapsed, size, baseline, peak = results.get()
+                process.join()
+                print(f"{mode:<11} {rows:>9,} rows {elapsed:>8.1f} s   peak RSS {peak:>8.1f} MB "
+                      f"(+{peak - baseline:.1f} MB)   file {size / 1024 / 1024:.1f} MB")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
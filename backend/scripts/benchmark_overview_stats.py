@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark overview statistics: one COUNT query per figure vs the single
+conditional-aggregation statement
+
+Seeds N synthetic predictions (default 1,000,000) into DATABASE_URL,
+times both strategies and reports p50/p95 latency. All seeded rows are
+deleted afterwards.
+
+Usage:
+    python scripts/benchmark_overview_stats.py [--rows 1000000] [--iterations 20]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine, create_tables
+from app.models.database import Patient, Prediction
+from app.services.stats_aggregation import get_overview_aggregates
+from app.utils.date_ranges import day_range, day_start
+
+MARKER = "overview-benchmark"
+CHUNK_SIZE = 10000
+
+
+def seed(rows: int):
+    """Bulk insert predictions spread over the last year."""
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        for offset in range(0, rows, CHUNK_SIZE):
+            batch = []
+            for _ in range(min(CHUNK_SIZE, rows - offset)):
+                prediction_id = str(uuid.uuid4())
+                confidence = random.random()
+                batch.append({
+                    'id': prediction_id,
+                    'image_filename': f"{prediction_id}.jpg",
+                    'original_filename': MARKER,
+                    'prediction': "PNEUMONIA" if confidence >= 0.5 else "NORMAL",
+                    'confidence': confidence,
+                    'created_at': now - timedelta(seconds=random.randint(0, 365 * 86400)),
+                })
+            db.execute(insert(Prediction), batch)
+            db.commit()
+            print(f"\rseeded {offset + len(batch):,}/{rows:,}", end="", flush=True)
+        print()
+    finally:
+        db.close()
+
+
+def cleanup():
+    """Delete seeded rows."""
+    db = SessionLocal()
+    try:
+        db.query(Prediction).filter(Prediction.original_filename == MARKER).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def separate_queries(db):
+    """The previous dashboard path: one query per figure."""
+    today = datetime.utcnow().date()
+    today_start, today_end = day_range(today)
+    week_start = day_start(today - timedelta(days=today.weekday()))
+    month_start = day_start(today.replace(day=1))
+    count = select(func.count(Prediction.id))
+    return [
+        await db.scalar(select(func.count(Patient.id))),
+        await db.scalar(select(func.count(Patient.id)).where(Patient.created_at >= week_start)),
+        await db.scalar(select(func.count(Patient.id)).where(Patient.created_at >= month_start)),
+        await db.scalar(count),
+        await db.scalar(count.where(Prediction.created_at >= today_start, Prediction.created_at < today_end)),
+        await db.scalar(count.where(Prediction.created_at >= week_start)),
+        await db.scalar(count.where(Prediction.created_at >= month_start)),
+        await db.scalar(count.where(Prediction.prediction == "PNEUMONIA")),
+        await db.scalar(count.where(Prediction.prediction == "NORMAL")),
+        await db.scalar(select(func.avg(Prediction.confidence))),
+    ]
+
+
+async def single_statement(db):
+    """The shared conditional-aggregation service."""
+    return await get_overview_aggregates(db)
+
+
+async def time_strategy(strategy, iterations: int):
+    """Latencies in ms of ``iterations`` calls after one warm-up."""
+    latencies = []
+    async with AsyncSessionLocal() as db:
+        await strategy(db)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            await strategy(db)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+    return np.array(latencies)
+
+
+async def run(iterations: int):
+    for name, strategy in [("separate queries", separate_queries), ("single statement", single_statement)]:
+        latencies = await time_strategy(strategy, iterations)
+        print(f"{name:<18} p50 {np.percentile(latencies, 50):>9.1f} ms   p95 {np.percentile(latencies, 95):>9.1f} ms")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark overview statistics queries")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Predictions to seed")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    create_tables()
+    try:
+        seed(args.rows)
+        asyncio.run(run(args.iterations))
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
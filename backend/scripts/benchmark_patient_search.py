@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark patient search: the previous OR of ILIKE clauses vs the indexed
+search document, and word-prefix typeahead
+
+Seeds N synthetic patients into DATABASE_URL, times each query shape for a
+few search terms and reports p50/p95 latency. On PostgreSQL the indexed
+queries need the trigram index from migration 0006; without it they scan
+like the legacy query. All patients created by the benchmark are deleted
+afterwards.
+
+Usage:
+    python scripts/benchmark_patient_search.py [--patients 1000000] [--repeat 20]
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, inspect, insert, or_, select, text
+
+from app.core.database import SessionLocal, create_tables, engine
+from app.models.database import Patient
+from app.services.data_versions import bump_versions
+from app.services.patient_search import search_statement, typeahead_statement
+from app.services.response_cache import PATIENTS_TAG
+
+MARKER = "BENCH-SEARCH-"
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson"]
+
+
+def seed(db, count: int, chunk_size: int):
+    """Insert synthetic patients in chunks."""
+    rng = random.Random(42)
+    for start in range(0, count, chunk_size):
+        rows = [
+            {
+                'patient_id': f"{MARKER}{number:08d}",
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': f"{rng.choice(LAST_NAMES)}{rng.randint(0, 9999)}",
+                'medical_record_number': f"MRN{rng.randint(0, 10 ** 9):09d}",
+            }
+            for number in range(start, min(start + chunk_size, count))
+        ]
+        db.execute(insert(Patient), rows)
+        db.commit()
+        print(f"  seeded {min(start + chunk_size, count):,}/{count:,}", end="\r")
+    print()
+
+
+def legacy_statement(query: str, limit: int):
+    """The query patient search used before the indexed search document."""
+    term = f"%{query}%"
+    return select(Patient).where(or_(
+        Patient.first_name.ilike(term),
+        Patient.last_name.ilike(term),
+        Patient.patient_id.ilike(term),
+        Patient.medical_record_number.ilike(term),
+    )).limit(limit)
+
+
+def measure(db, build, repeat: int):
+    """Latencies in milliseconds of running ``build()`` ``repeat`` times."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(build()).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings):
+    """Print p50/p95 for one query shape."""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"    {name:<12} p50 {statistics.median(ordered):>9.2f} ms   p95 {p95:>9.2f} ms")
+
+
+def cleanup(db):
+    """Delete benchmark patients."""
+    db.rollback()
+    db.execute(delete(Patient).where(Patient.patient_id.like(f"{MARKER}%")))
+    bump_versions(db, [PATIENTS_TAG])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark patient search queries")
+    parser.add_argument("--patients", type=int, default=1_000_000, help="Synthetic patients to seed")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query and term")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--terms", nargs="+", default=["garcia12", "mary", "00001234", "mrn12345", "jo smi"])
+    args = parser.parse_args()
+
+    create_tables()
+    dialect_name = engine.dialect.name
+    if dialect_name == "postgresql":
+        indexes = {index["name"] for index in inspect(engine).get_indexes("patients")}
+        if "ix_patients_search_trgm" not in indexes:
+            print("⚠️  ix_patients_search_trgm is missing; run `alembic upgrade head` first")
+    else:
+        print(f"⚠️  {dialect_name} has no trigram index; indexed queries scan like the legacy one")
+
+    db = SessionLocal()
+    try:
+        print(f"Seeding {args.patients:,} patients...")
+        seed(db, args.patients, args.chunk_size)
+        if dialect_name == "postgresql":
+            # Fresh statistics so the planner sees the seeded table size
+            db.execute(text("ANALYZE patients"))
+            db.commit()
+        for query in args.terms:
+            print(f"  '{query}'")
+            report("legacy", measure(db, lambda: legacy_statement(query, args.limit), args.repeat))
+            report("search", measure(db, lambda: search_statement(query, dialect_name, args.limit), args.repeat))
+            report("typeahead", measure(db, lambda: typeahead_statement(query, dialect_name, args.limit), args.repeat))
+    finally:
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark prediction persistence: legacy two-commit path vs single
+transaction vs group commit
+
+Writes N synthetic predictions with their audit records to DATABASE_URL
+using each strategy and reports transactions and predictions per second.
+All rows written by the benchmark are deleted afterwards.
+
+Usage:
+    python scripts/benchmark_prediction_writes.py [--count 500] [--concurrency 16]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine, create_tables
+from app.models.database import AuditLog, Prediction
+from app.services.prediction_persistence import (
+    GroupCommitWriter, build_prediction_records, persist_prediction
+)
+from app.services.data_versions import bump_versions
+from app.services.response_cache import PREDICTIONS_TAG
+from app.services.stats_rollups import rebuild_rollups
+
+RESULT = {
+    'prediction': 'PNEUMONIA',
+    'confidence': 0.91,
+    'probabilities': {'NORMAL': 0.09, 'PNEUMONIA': 0.91},
+    'inference_time': 0.02,
+    'image_size': [1024, 1024],
+}
+
+
+def make_records(ids):
+    """Build synthetic prediction/audit row pairs."""
+    return [
+        build_prediction_records(
+            prediction_id=prediction_id,
+            filename=f"{prediction_id}.jpg",
+            original_filename="benchmark.jpg",
+            image_path=f"uploads/predictions/{prediction_id}.jpg",
+            result=RESULT,
+            audit_details={"benchmark": True}
+        )
+        for prediction_id in ids
+    ]
+
+
+async def legacy_writes(records):
+    """The original endpoint path: commit, refresh, then commit the audit row."""
+    async with AsyncSessionLocal() as db:
+        for prediction_row, audit_row in records:
+            prediction = Prediction(**prediction_row)
+            db.add(prediction)
+            await db.commit()
+            await db.refresh(prediction)
+            db.add(AuditLog(**audit_row))
+            await db.commit()
+    return 2 * len(records)
+
+
+async def single_transaction_writes(records):
+    """One transaction per prediction containing both rows."""
+    async with AsyncSessionLocal() as db:
+        for prediction_row, audit_row in records:
+            await persist_prediction(db, prediction_row, audit_row)
+    return len(records)
+
+
+async def group_commit_writes(records, concurrency: int, max_batch_size: int, max_wait_ms: float):
+    """Concurrent writers sharing transactions through GroupCommitWriter."""
+    writer = GroupCommitWriter(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def write(prediction_row, audit_row):
+        async with semaphore:
+            await writer.write(prediction_row, audit_row)
+
+    await asyncio.gather(*(write(*record) for record in records))
+    await writer.stop()
+    return writer.commits_total
+
+
+def report(name: str, count: int, commits: int, elapsed: float):
+    """Print throughput for one strategy."""
+    print(f"{name:<22} {count / elapsed:>10.1f} predictions/s {commits / elapsed:>10.1f} commits/s "
+          f"{commits:>6} commits {elapsed:>8.2f} s")
+
+
+def cleanup(ids):
+    """Delete benchmark rows."""
+    db = SessionLocal()
+    try:
+        db.query(AuditLog).filter(AuditLog.entity_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Prediction).filter(Prediction.id.in_(ids)).delete(synchronize_session=False)
+        # The rows were counted into today's rollups
+        rebuild_rollups(db, since=datetime.utcnow().date())
+        bump_versions(db, [PREDICTIONS_TAG])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(args, all_ids):
+    """Run each strategy on fresh rows."""
+    ids = [str(uuid.uuid4()) for _ in range(args.count)]
+    all_ids.extend(ids)
+    start = time.perf_counter()
+    commits = await legacy_writes(make_records(ids))
+    report("legacy (2 commits)", args.count, commits, time.perf_counter() - start)
+
+    ids = [str(uuid.uuid4()) for _ in range(args.count)]
+    all_ids.extend(ids)
+    start = time.perf_counter()
+    commits = await single_transaction_writes(make_records(ids))
+    report("single transaction", args.count, commits, time.perf_counter() - start)
+
+    ids = [str(uuid.uuid4()) for _ in range(args.count)]
+    all_ids.extend(ids)
+    records = make_records(ids)
+    start = time.perf_counter()
+    commits = await group_commit_writes(records, args.concurrency, args.batch_size, args.max_wait_ms)
+    report(f"group commit (x{args.concurrency})", args.count, commits, time.perf_counter() - start)
+
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prediction persistence strategies")
+    parser.add_argument("--count", type=int, default=500, help="Predictions written per strategy")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent writers for group commit")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    create_tables()
+    all_ids = []
+
+    try:
+        asyncio.run(run(args, all_ids))
+    finally:
+        cleanup(all_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark image preprocessing: legacy ModelService pipeline vs ImagePreprocessor
+
+Reports per-image time and peak traced memory for each pipeline.
+
+Usage:
+    python scripts/benchmark_preprocessing.py [image ...] [--iterations N] [--size 256]
+"""
+import sys
+import os
+import argparse
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from app.ml.preprocessing import ImagePreprocessor, CV2_AVAILABLE, IMAGENET_MEAN, IMAGENET_STD
+
+
+def legacy_preprocess(image: Image.Image, input_size: int) -> np.ndarray:
+    """The original ModelService.preprocess_image pipeline, kept as the baseline."""
+    image = image.resize((input_size, input_size), Image.Resampling.LANCZOS)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    img_array = np.array(image, dtype=np.float32)
+    img_array = img_array / 255.0
+    mean = np.array(IMAGENET_MEAN, dtype=np.float32)
+    std = np.array(IMAGENET_STD, dtype=np.float32)
+    img_array = (img_array - mean) / std
+    img_array = np.expand_dims(img_array, axis=0)
+    return img_array.astype(np.float32)
+
+
+def load_images(paths, count: int):
+    """Load benchmark images, or synthesize X-ray sized grayscale images."""
+    if paths:
+        images = [Image.open(path) for path in paths]
+        for image in images:
+            image.load()
+        return images
+
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 256, (2048, 2048), dtype=np.uint8), mode='L')
+        for _ in range(count)
+    ]
+
+
+def measure(name: str, func, images, iterations: int) -> np.ndarray:
+    """Time ``func`` over all images and report peak memory of a single call."""
+    result = func(images[0])  # warm caches before timing
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for image in images:
+            result = func(image)
+    elapsed = time.perf_counter() - start
+    per_image_ms = elapsed / (iterations * len(images)) * 1000.0
+
+    tracemalloc.start()
+    func(images[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<28} {per_image_ms:>10.3f} ms/image {peak / 1024 / 1024:>10.2f} MiB peak")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing pipelines")
+    parser.add_argument("images", nargs="*", help="Image files to benchmark (default: synthetic 2048px)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--count", type=int, default=4, help="Number of synthetic images")
+    parser.add_argument("--size", type=int, default=256, help="Model input size")
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.count)
+    print(f"{len(images)} images, {args.iterations} iterations, input size {args.size}\n")
+
+    baseline = measure("legacy", lambda image: legacy_preprocess(image, args.size), images, args.iterations)
+
+    pil = ImagePreprocessor(args.size, backend="pil")
+    result = measure("pil (fresh output)", pil.preprocess, images, args.iterations)
+    print(f"{'':<28} max abs diff vs legacy: {np.abs(result - baseline).max():.2e}")
+    measure("pil (reusable buffer)", pil.preprocess_reusable, images, args.iterations)
+
+    if CV2_AVAILABLE:
+        opencv = ImagePreprocessor(args.size, backend="opencv")
+        result = measure("opencv (reusable buffer)", opencv.preprocess_reusable, images, args.iterations)
+        print(f"{'':<28} max abs diff vs legacy: {np.abs(result - baseline).max():.2e}")
+    else:
+        print("opencv not installed, skipping")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Check that streaming CSV exports run in constant memory
+
+Seeds N synthetic predictions (default 1,000,000) into DATABASE_URL with
+timestamps in a reserved date range, exports that range through the same
+generators the /exports/predictions/csv endpoint streams, and traces
+Python memory while consuming the chunks. Fails if peak memory after the
+first 10% of rows grows by more than the tolerance, i.e. if memory scales
+with the number of rows exported. All seeded rows are deleted afterwards.
+
+Usage:
+    python scripts/check_export_memory.py [--rows 1000000] [--tolerance 0.25]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert
+
+from app.core.database import SessionLocal, async_engine, create_tables
+from app.models.database import Prediction
+from app.services.data_exports import (
+    PREDICTION_EXPORT_HEADERS, csv_chunks, prediction_export_row, prediction_export_statement, stream_rows
+)
+
+MARKER = "export-memory-check"
+# Seeded rows live in a range no real prediction uses
+RANGE_START = datetime(2001, 1, 1)
+
+
+def seed(count: int, chunk_size: int):
+    """Insert predictions one second apart from RANGE_START."""
+    db = SessionLocal()
+    try:
+        for start in range(0, count, chunk_size):
+            db.execute(insert(Prediction), [
+                {
+                    'id': str(uuid.uuid4()),
+                    'image_filename': f"{MARKER}-{i}.jpg",
+                    'original_filename': MARKER,
+                    'prediction': "PNEUMONIA" if i % 3 else "NORMAL",
+                    'confidence': 0.5 + (i % 50) / 100,
+                    'confidence_scores': {"NORMAL": 0.2, "PNEUMONIA": 0.8},
+                    'inference_time': 0.02,
+                    'reviewed': False,
+                    'created_at': RANGE_START + timedelta(seconds=i),
+                }
+                for i in range(start, min(start + chunk_size, count))
+            ])
+            db.commit()
+            print(f"  seeded {min(start + chunk_size, count):,}/{count:,}", end="\r")
+        print()
+    finally:
+        db.close()
+
+
+def cleanup():
+    """Delete seeded rows."""
+    db = SessionLocal()
+    try:
+        db.execute(delete(Prediction).where(Prediction.original_filename == MARKER))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def export(count: int):
+    """Consume the CSV export of the seeded range; returns rows, bytes and peak memory before/after warm-up."""
+    statement = prediction_export_statement(RANGE_START, RANGE_START + timedelta(seconds=count))
+    warmup_rows = count // 10
+    rows = 0
+    size = 0
+    warmup_peak = None
+
+    async def counted(batches):
+        nonlocal rows
+        async for batch in batches:
+            rows += len(batch)
+            yield batch
+
+    tracemalloc.start()
+    try:
+        async for chunk in csv_chunks(PREDICTION_EXPORT_HEADERS, prediction_export_row, counted(stream_rows(statement))):
+            size += len(chunk)
+            if warmup_peak is None and rows >= warmup_rows:
+                warmup_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.reset_peak()
+        final_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        await async_engine.dispose()
+    return rows, size, warmup_peak or final_peak, final_peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert constant memory for streaming CSV exports")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Predictions to seed and export")
+    parser.add_argument("--chunk-size", type=int, default=20_000, help="Rows inserted per seeding transaction")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed growth of peak memory after the first 10%% of rows")
+    args = parser.parse_args()
+
+    create_tables()
+    try:
+        print(f"Seeding {args.rows:,} predictions...")
+        seed(args.rows, args.chunk_size)
+        start = time.perf_counter()
+        rows, size, warmup_peak, final_peak = asyncio.run(export(args.rows))
+        elapsed = time.perf_counter() - start
+    finally:
+        cleanup()
+
+    mb = 1024 * 1024
+    print(f"Exported {rows:,} rows ({size / mb:.1f} MB of CSV) in {elapsed:.1f} s")
+    print(f"Peak traced memory: first 10% {warmup_peak / mb:.2f} MB, remaining rows {final_peak / mb:.2f} MB")
+
+    if rows != args.rows:
+        print(f"FAIL  expected {args.rows:,} rows")
+        sys.exit(1)
+    if final_peak > warmup_peak * (1 + args.tolerance):
+        print(f"FAIL  memory grew by more than {args.tolerance:.0%} while streaming")
+        sys.exit(1)
+    print("ok    export memory is independent of the number of rows")
+
+
+if __name__ == "__main__":
+    main()
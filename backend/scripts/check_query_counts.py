@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Check that prediction listing, single fetch, export and the overview
+dashboards run a fixed number of SQL statements regardless of page size
+
+Seeds synthetic patients and predictions into DATABASE_URL, calls the
+endpoints in-process and counts the statements each request executes.
+Fails if the count changes with the page size or exceeds the expected
+count. All seeded rows are deleted afterwards.
+
+Usage:
+    python scripts/check_query_counts.py [--predictions 120]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, async_engine, create_tables
+from app.main_db import app
+from app.models.database import Patient, Prediction
+
+MARKER = "query-count-check"
+PAGE_SIZES = [5, 25, 100]
+
+# Statements expected per request: offset listing runs COUNT + page; the
+# dashboards run one aggregate statement plus their non-count lookups.
+# Endpoints answering conditional requests add one data version lookup,
+# and cached responses one more for the cache key.
+EXPECTED = {
+    'list (offset)': 3,
+    'list (cursor)': 2,
+    'single fetch': 1,
+    'csv export': 1,
+    'stats overview': 4,  # + latest system stats row
+    'predictions overview': 2,
+    'prediction stats': 2,
+    'audit dashboard': 4,  # + recent predictions
+}
+
+
+class StatementCounter:
+    """Count statements executed on the async engine."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed(count: int):
+    """Insert patients and predictions; every fifth prediction has no patient."""
+    db = SessionLocal()
+    try:
+        patients = [
+            Patient(patient_id=f"QC-{uuid.uuid4().hex[:12]}", first_name="Query", last_name=f"Count{i}",
+                    medical_record_number=MARKER)
+            for i in range(count // 5)
+        ]
+        db.add_all(patients)
+        db.flush()
+
+        now = datetime.now(timezone.utc)
+        prediction_ids = []
+        for i in range(count):
+            prediction_id = str(uuid.uuid4())
+            prediction_ids.append(prediction_id)
+            db.add(Prediction(
+                id=prediction_id,
+                patient_id=None if i % 5 == 0 else patients[i % len(patients)].id,
+                image_filename=f"{prediction_id}.jpg",
+                original_filename=MARKER,
+                prediction="PNEUMONIA" if i % 2 else "NORMAL",
+                confidence=0.9,
+                confidence_scores={"NORMAL": 0.1, "PNEUMONIA": 0.9},
+                created_at=now - timedelta(seconds=i),
+            ))
+        db.commit()
+        return prediction_ids
+    finally:
+        db.close()
+
+
+def cleanup():
+    """Delete seeded rows."""
+    db = SessionLocal()
+    try:
+        db.query(Prediction).filter(Prediction.original_filename == MARKER).delete(synchronize_session=False)
+        db.query(Patient).filter(Patient.medical_record_number == MARKER).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def measure(client: httpx.AsyncClient, counter: StatementCounter, method: str, url: str, **kwargs) -> int:
+    """Statements executed by one request."""
+    counter.count = 0
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return counter.count
+
+
+async def run(prediction_ids):
+    counter = StatementCounter()
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+        base = "/api/v1/predictions/predictions"
+        results['list (offset)'] = [
+            await measure(client, counter, "GET", base, params={'size': size}) for size in PAGE_SIZES
+        ]
+        results['list (cursor)'] = [
+            await measure(client, counter, "GET", base, params={'size': size, 'pagination': 'cursor'})
+            for size in PAGE_SIZES
+        ]
+        results['single fetch'] = [
+            await measure(client, counter, "GET", f"{base}/{prediction_id}") for prediction_id in prediction_ids[:2]
+        ]
+        results['csv export'] = [
+            await measure(client, counter, "POST", "/api/v1/exports/predictions/csv", json={})
+        ]
+        for name, url in [
+            ('stats overview', "/api/v1/stats/overview"),
+            ('predictions overview', "/api/v1/predictions/stats/overview"),
+            ('prediction stats', "/api/v1/predictions/stats/predictions"),
+            ('audit dashboard', "/api/v1/audit/dashboard/stats"),
+        ]:
+            results[name] = [await measure(client, counter, "GET", url)]
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert fixed query counts for prediction reads")
+    parser.add_argument("--predictions", type=int, default=120, help="Predictions to seed")
+    args = parser.parse_args()
+
+    create_tables()
+    try:
+        prediction_ids = seed(args.predictions)
+        results = asyncio.run(run(prediction_ids))
+    finally:
+        cleanup()
+
+    failures = 0
+    for name, counts in results.items():
+        ok = len(set(counts)) == 1 and counts[0] <= EXPECTED[name]
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<5} {name:<20} statements {counts} (expected {EXPECTED[name]})")
+
+    if failures:
+        sys.exit(1)
+    print(f"\nStatement counts are fixed for page sizes {PAGE_SIZES}")
+
+
+if __name__ == "__main__":
+    main()
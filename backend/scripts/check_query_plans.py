@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Check that the hot prediction, patient and audit log queries use their indexes
+
+Runs EXPLAIN for each query against DATABASE_URL (PostgreSQL or SQLite) and
+fails if the plan does not mention one of the expected indexes. On
+PostgreSQL sequential scans are disabled for the session so the check does
+not depend on table size; run `alembic upgrade head` first.
+
+Usage:
+    python scripts/check_query_plans.py [--verbose]
+"""
+import sys
+import os
+import argparse
+import json
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import desc, func, select, tuple_
+
+from app.core.database import engine
+from app.models.database import AuditLog, Patient, Prediction
+from app.utils.date_ranges import day_range, day_start
+
+
+def build_checks():
+    """(name, statement, acceptable index names) for each access path."""
+    today = datetime.utcnow().date()
+    today_start, today_end = day_range(today)
+    week_start = day_start(today - timedelta(days=7))
+
+    return [
+        ("predictions newest first",
+         select(Prediction).order_by(desc(Prediction.created_at)).limit(50),
+         {"ix_predictions_created_at_id"}),
+        ("predictions today",
+         select(func.count(Prediction.id)).where(
+             Prediction.created_at >= today_start, Prediction.created_at < today_end),
+         {"ix_predictions_created_at_id"}),
+        ("predictions by type since",
+         select(func.count(Prediction.id)).where(
+             Prediction.prediction == "PNEUMONIA", Prediction.created_at >= week_start),
+         {"ix_predictions_prediction_created_at"}),
+        ("patient prediction history",
+         select(Prediction).where(Prediction.patient_id == 1).order_by(desc(Prediction.created_at)),
+         {"ix_predictions_patient_id_created_at"}),
+        ("audit logs in range",
+         select(AuditLog).where(AuditLog.timestamp >= week_start).order_by(desc(AuditLog.timestamp)).limit(50),
+         {"ix_audit_logs_timestamp_id"}),
+        ("audit logs by user",
+         select(AuditLog).where(AuditLog.user_id == "system", AuditLog.timestamp >= week_start)
+         .order_by(desc(AuditLog.timestamp)).limit(50),
+         {"ix_audit_logs_user_id_timestamp"}),
+        ("audit logs by action",
+         select(AuditLog).where(AuditLog.action_type == "PREDICTION", AuditLog.timestamp >= week_start)
+         .order_by(desc(AuditLog.timestamp)).limit(50),
+         {"ix_audit_logs_action_type_timestamp"}),
+        ("audit log retention cleanup",
+         select(func.count(AuditLog.id)).where(AuditLog.timestamp < week_start),
+         {"ix_audit_logs_timestamp_id"}),
+        ("predictions keyset page",
+         select(Prediction).where(
+             tuple_(Prediction.created_at, Prediction.id) < tuple_(today_start, "ffffffff-ffff-ffff-ffff-ffffffffffff"))
+         .order_by(desc(Prediction.created_at), desc(Prediction.id)).limit(51),
+         {"ix_predictions_created_at_id"}),
+        ("audit logs keyset page",
+         select(AuditLog).where(tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(today_start, 2 ** 31 - 1))
+         .order_by(desc(AuditLog.timestamp), desc(AuditLog.id)).limit(51),
+         {"ix_audit_logs_timestamp_id"}),
+        ("patients created this week",
+         select(func.count(Patient.id)).where(Patient.created_at >= week_start),
+         {"ix_patients_created_at_id"}),
+    ]
+
+
+def explain(connection, statement) -> str:
+    """Return the query plan as text."""
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+        return json.dumps(plan)
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert index usage of hot queries")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    failures = 0
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET enable_seqscan = off")
+
+        for name, statement, indexes in build_checks():
+            plan = explain(connection, statement)
+            used = sorted(index for index in indexes if index in plan)
+            status = "ok" if used else "FAIL"
+            if not used:
+                failures += 1
+            print(f"{status:<5} {name:<32} expected {', '.join(sorted(indexes))}")
+            if args.verbose or not used:
+                print(f"      {plan}")
+
+    if failures:
+        print(f"\n{failures} queries do not use their index")
+        sys.exit(1)
+    print("\nAll queries use their indexes")
+
+
+if __name__ == "__main__":
+    main()
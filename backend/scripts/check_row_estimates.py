@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Check that cursor-paginated listings can report planner row estimates
+
+Compiles the EXPLAIN statement behind ``total_mode=estimate`` for patient
+searches and filtered listings with every PostgreSQL driver and fails if
+the SQL still holds post-compile placeholders or its parameters do not
+match the placeholders. Then calls the patient listing in-process with a
+search in estimate mode against DATABASE_URL; on PostgreSQL the total
+must be a planner estimate, elsewhere the exact count is the fallback.
+
+Usage:
+    python scripts/check_row_estimates.py [--search "smi jo"]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg, psycopg2
+
+from app.core.database import async_engine, create_tables
+from app.main_db import app
+from app.models.database import Patient
+from app.services.pagination import explain_statement
+from app.services.patient_search import contains_filter
+
+DIALECTS = {
+    'psycopg2': psycopg2.dialect(),
+    'psycopg': psycopg.dialect(),
+    'asyncpg': asyncpg.dialect(),
+}
+
+
+def build_statements(search: str):
+    """(name, statement) for the listings that support estimate totals."""
+    return [
+        ("patient search", select(Patient).where(contains_filter(search))),
+        ("patient search by gender", select(Patient).where(contains_filter(search), Patient.gender == "F")),
+        ("patients by gender", select(Patient).where(Patient.gender == "F")),
+    ]
+
+
+def placeholder_errors(sql: str, params) -> list:
+    """Problems with the driver parameters of a compiled EXPLAIN statement."""
+    errors = []
+    if "POSTCOMPILE" in sql:
+        errors.append("post-compile placeholders left in SQL")
+    if isinstance(params, tuple):
+        numbers = {int(number) for number in re.findall(r"\$(\d+)", sql)}
+        if numbers != set(range(1, len(params) + 1)):
+            errors.append(f"{len(params)} parameters for placeholders {sorted(numbers)}")
+    else:
+        names = set(re.findall(r"%\((\w+)\)s", sql))
+        if names != set(params):
+            errors.append(f"parameters {sorted(params)} for placeholders {sorted(names)}")
+    return errors
+
+
+async def list_patients(search: str):
+    """Patient listing with a search, cursor pagination and an estimated total."""
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+            return await client.get("/api/v1/patients/", params={
+                'search': search, 'pagination': "cursor", 'total_mode': "estimate"
+            })
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert estimate totals work for patient searches")
+    parser.add_argument("--search", default="smi jo", help="Search text to list patients with")
+    args = parser.parse_args()
+
+    failures = 0
+    for name, statement in build_statements(args.search):
+        for driver, dialect in DIALECTS.items():
+            sql, params = explain_statement(statement, dialect)
+            errors = placeholder_errors(sql, params)
+            if errors:
+                failures += 1
+            print(f"{'FAIL' if errors else 'ok':<5} {name:<26} {driver:<9} {'; '.join(errors)}")
+
+    create_tables()
+    response = asyncio.run(list_patients(args.search))
+    body = response.json()
+    expect_estimate = async_engine.dialect.name == "postgresql"
+    ok = response.status_code == 200 and body.get('total_is_estimate') == expect_estimate
+    if not ok:
+        failures += 1
+    print(f"{'ok' if ok else 'FAIL':<5} patient listing in estimate mode: HTTP {response.status_code}, "
+          f"total {body.get('total')} (estimate: {body.get('total_is_estimate')}, "
+          f"expected {expect_estimate} on {async_engine.dialect.name})")
+
+    if failures:
+        print(f"\n{failures} checks failed")
+        sys.exit(1)
+    print("\nEstimate totals work for patient searches")
+
+
+if __name__ == "__main__":
+    main()
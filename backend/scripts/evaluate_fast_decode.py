@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Measure the accuracy and speed impact of reduced-size JPEG decoding
+
+Runs a fixed image set through the current full-decode pipeline and the
+fast-decode pipeline (PIL draft()), then reports decode time, tensor
+differences and, when a model is given, prediction agreement.
+
+Usage:
+    python scripts/evaluate_fast_decode.py IMAGE_DIR [--model model/covid19_resnet.onnx]
+        [--size 256] [--filter lanczos]
+"""
+import sys
+import os
+import argparse
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.ml.preprocessing import ImagePreprocessor, RESIZE_FILTERS
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise softmax."""
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def run_pipeline(preprocessor: ImagePreprocessor, contents):
+    """Decode and preprocess every image, returning tensors and per-image time."""
+    tensors = np.empty((len(contents),) + preprocessor.shape, dtype=np.float32)
+    start = time.perf_counter()
+    for index, content in enumerate(contents):
+        preprocessor.preprocess_into(preprocessor.decode(content), tensors[index])
+    elapsed = time.perf_counter() - start
+    return tensors, elapsed / len(contents) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate fast JPEG decoding against full decoding")
+    parser.add_argument("image_dir", help="Directory with a fixed set of X-ray images")
+    parser.add_argument("--model", help="ONNX model to compare predictions with")
+    parser.add_argument("--size", type=int, default=256, help="Model input size")
+    parser.add_argument("--filter", default="lanczos", choices=sorted(RESIZE_FILTERS))
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not paths:
+        print(f"No images found in {args.image_dir}")
+        sys.exit(1)
+    contents = [p.read_bytes() for p in paths]
+
+    full = ImagePreprocessor(args.size, resize_filter=args.filter, fast_decode=False)
+    fast = ImagePreprocessor(args.size, resize_filter=args.filter, fast_decode=True)
+
+    full_tensors, full_ms = run_pipeline(full, contents)
+    fast_tensors, fast_ms = run_pipeline(fast, contents)
+
+    diff = np.abs(full_tensors - fast_tensors).reshape(len(paths), -1)
+    print(f"Images: {len(paths)} ({sum(p.suffix.lower() in ('.jpg', '.jpeg') for p in paths)} JPEG)")
+    print(f"Decode + preprocess: full {full_ms:.2f} ms/image, fast {fast_ms:.2f} ms/image "
+          f"({full_ms / fast_ms:.2f}x)")
+    print(f"Tensor abs diff: mean {diff.mean():.4f}, max {diff.max():.4f}")
+
+    if not args.model:
+        return
+
+    import onnxruntime as ort
+    session = ort.InferenceSession(args.model, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+
+    def predict(tensors):
+        return np.concatenate([
+            softmax(session.run(None, {input_name: tensors[i:i + 1]})[0])
+            for i in range(len(tensors))
+        ])
+
+    full_probs = predict(full_tensors)
+    fast_probs = predict(fast_tensors)
+    agreement = (full_probs.argmax(axis=1) == fast_probs.argmax(axis=1)).mean()
+    prob_delta = np.abs(full_probs - fast_probs).max(axis=1)
+
+    print(f"Prediction agreement: {agreement:.2%}")
+    print(f"Probability delta: mean {prob_delta.mean():.4f}, max {prob_delta.max():.4f}")
+    for path, delta in sorted(zip(paths, prob_delta), key=lambda item: -item[1])[:5]:
+        print(f"  {path.name}: {delta:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,10 @@ import uuid
 from faker import Faker
 
 from app.core.database import SessionLocal, create_tables
-from app.models.database import Patient, Prediction, AuditLog, SystemStats, WeeklyStats
+from app.models.database import Patient, Prediction, AuditLog, SystemStats, WeeklyStats, PredictionRollup
+from app.services.data_versions import bump_versions
+from app.services.response_cache import PATIENTS_TAG, PREDICTIONS_TAG, SYSTEM_STATS_TAG
+from app.services.stats_rollups import rebuild_rollups
 
 fake = Faker()
 
@@ -218,6 +221,11 @@ def generate_predictions(db: Session, count: int = 2000):
         db.commit()
     
     print(f"✅ Generated {count} predictions successfully")
+    
+    # Bulk inserts bypass the rollup updates, so rebuild them once
+    rebuild_rollups(db)
+    db.commit()
+    print("✅ Rebuilt prediction statistics rollups")
 
 def generate_audit_logs(db: Session, count: int = 5000):
     """Generate mock audit logs"""
@@ -377,6 +385,7 @@ def main():
                 # Clear existing data
                 print("🗑️  Clearing existing data...")
                 db.query(WeeklyStats).delete()
+                db.query(PredictionRollup).delete()
                 db.query(SystemStats).delete()
                 db.query(AuditLog).delete()
                 db.query(Prediction).delete()
@@ -394,6 +403,10 @@ def main():
         generate_system_stats(db, 90)
         generate_weekly_stats(db, 24)
         
+        # Invalidate ETags handed out for the previous data
+        bump_versions(db, [PREDICTIONS_TAG, PATIENTS_TAG, SYSTEM_STATS_TAG])
+        db.commit()
+        
         # Final statistics
         final_patients = db.query(Patient).count()
         final_predictions = db.query(Prediction).count()
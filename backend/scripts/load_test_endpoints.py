@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load test the list and statistics endpoints of a running API
+
+Sends requests to each endpoint from N concurrent clients and reports
+requests/sec and latency percentiles. Save a run with --output and pass it
+to --compare on a later run (e.g. before and after a change) to print the
+difference.
+
+Usage:
+    python scripts/load_test_endpoints.py [--base-url http://localhost:8000]
+        [--concurrency 50] [--requests 1000] [--output run.json] [--compare baseline.json]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+ENDPOINTS = [
+    "/api/v1/patients/?page=1&size=50",
+    "/api/v1/predictions/predictions?page=1&size=50",
+    "/api/v1/stats/overview",
+    "/api/v1/predictions/stats/overview",
+]
+
+
+async def load_endpoint(client: httpx.AsyncClient, path: str, concurrency: int, total: int):
+    """Issue ``total`` GETs with ``concurrency`` in flight and collect latencies."""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+    }
+
+
+async def run(args):
+    """Warm up, then load each endpoint in turn."""
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30.0) as client:
+        results = {}
+        for path in ENDPOINTS:
+            await load_endpoint(client, path, min(args.concurrency, 4), 20)
+            results[path] = await load_endpoint(client, path, args.concurrency, args.requests)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test list and stats endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from a previous run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{args.concurrency} concurrent clients, {args.requests} requests per endpoint\n")
+    print(f"{'endpoint':<50} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for path, result in results.items():
+        print(f"{path:<50} {result['requests_per_second']:>10.1f} {result['p50_ms']:>10.1f} "
+              f"{result['p99_ms']:>10.1f} {result['errors']:>8}")
+        if baseline and path in baseline:
+            before = baseline[path]
+            print(f"{'  vs baseline':<50} {result['requests_per_second'] / before['requests_per_second']:>9.2f}x "
+                  f"{'':>10} {result['p99_ms'] / before['p99_ms']:>9.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
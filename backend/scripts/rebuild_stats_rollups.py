@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rebuild the prediction statistics rollups from the predictions table
+
+Prediction writes keep the rollups current; run this once after the
+rollup migration, after bulk changes made directly in the database, or
+to drop deleted patients from the unique patient estimates.
+
+Usage:
+    python scripts/rebuild_stats_rollups.py [--since YYYY-MM-DD]
+"""
+import sys
+import os
+import argparse
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal, create_tables
+from app.services.stats_rollups import rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild prediction statistics rollups")
+    parser.add_argument("--since", type=date.fromisoformat,
+                        help="Only rebuild weeks from the one containing this day (default: everything)")
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        counted = rebuild_rollups(db, since=args.since)
+        db.commit()
+        print(f"✅ Rebuilt rollups from {counted:,} predictions")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Standalone export job worker
+
+Produces queued export artifacts outside the API processes, and requeues
+interrupted jobs and deletes expired artifacts while idle. Run API
+instances with EXPORT_JOB_WORKERS=0 so only dedicated workers consume the
+queue; the API and workers must share the uploads directory.
+
+Usage:
+    python scripts/run_export_worker.py [--workers N]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import logging
+import signal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.database import create_tables
+from app.services.export_jobs import export_job_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run(workers: int):
+    """Start workers and wait for a termination signal."""
+    create_tables()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    export_job_queue.start(workers)
+    await stop.wait()
+
+    logger.info("Stopping export job workers...")
+    await export_job_queue.stop()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued export jobs")
+    parser.add_argument("--workers", type=int, default=max(1, settings.export_job_workers),
+                        help="Concurrent exports to process (default: EXPORT_JOB_WORKERS)")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Standalone prediction job worker
+
+Runs the inference tier separately from the API: loads and warms the model,
+then processes queued prediction jobs until interrupted. Run API instances
+with PREDICTION_JOB_WORKERS=0 so only dedicated workers consume the queue.
+
+Usage:
+    python scripts/run_prediction_worker.py [--workers N]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import logging
+import signal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.database import create_tables
+from app.ml.model_service import model_service
+from app.services.prediction_jobs import prediction_job_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run(workers: int):
+    """Load the model, start workers and wait for a termination signal."""
+    create_tables()
+
+    if not await model_service.load_model():
+        logger.error("Model failed to load; exiting")
+        return 1
+    await model_service.warmup(settings.model_warmup_iterations)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    prediction_job_queue.start(workers)
+    await stop.wait()
+
+    logger.info("Stopping prediction job workers...")
+    await prediction_job_queue.stop()
+    await model_service.shutdown()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued prediction jobs")
+    parser.add_argument("--workers", type=int, default=max(1, settings.prediction_job_workers),
+                        help="Concurrent jobs to process (default: PREDICTION_JOB_WORKERS)")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.workers)))
+
+
+if __name__ == "__main__":
+    main()